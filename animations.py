@@ -0,0 +1,19 @@
+# animations.py — the animations tree_scheduler.py rotates through
+#
+# Kept free of third-party imports so tools like startup_bench.py can
+# read the list without pulling in the scheduler's dependencies.
+
+# Filenames inside the scheduler's ANIMATION_DIR
+ANIMATIONS = [
+    "wind_swirl.py",
+    "double_helix.py",
+    "snake.py",
+    "matrix_rain.py",
+    "fireworks.py",
+    "contagious.py",
+    "candy_cane.py",
+    "light_beams.py",
+    "top_to_bottom.py",
+    "random_plane.py",
+    "zones.py"
+]
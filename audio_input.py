@@ -0,0 +1,337 @@
+# audio_input.py — streaming audio features for music-reactive animations
+#
+# A background thread pulls small blocks (HOP samples) from a source
+# into a ring buffer, runs an FFT over the last WINDOW samples
+# (overlapping windows), and publishes a new AudioFeatures snapshot per
+# block.  Publishing is a single reference assignment of an immutable
+# tuple, so the render loop reads `audio.features` without any lock.
+#
+# Sources:
+#   WavSource  — plays a .wav file in real time (for testing off-device)
+#   AlsaSource — live capture; needs pyalsaaudio (pip install pyalsaaudio)
+#
+# Latency: every snapshot carries the time its newest sample arrived.
+# Render from one snapshot and show it with audio.show(strip, features)
+# instead of strip.show().  The latency is then measured from that
+# snapshot to the moment the frame is on the wire.  For led_output's
+# threaded wrappers, that moment is when their output thread has pushed it.
+# The frame period is measured between successive show() calls, so it
+# covers render + show + sleep.  While the smoothed latency stays above
+# one frame period, the analysis thread halves its hop (down to MIN_HOP)
+# and skips the FFT for blocks that were already queued when read.  Only
+# the newest block is analyzed, so features never describe stale audio.
+# Skipping stops again once the latency is back under the period.
+#
+# Run this file on a .wav to print live features:
+#     python3 audio_input.py song.wav
+
+import sys
+import time
+import wave
+import threading
+from collections import namedtuple
+import numpy as np
+
+SAMPLE_RATE = 44100
+WINDOW      = 1024     # FFT size (samples)
+HOP         = 256      # new samples per analysis step (~5.8 ms)
+MIN_HOP     = 64       # smallest hop the latency control shrinks to (~1.5 ms)
+NUM_BANDS   = 8        # log-spaced bands from BAND_MIN_HZ to Nyquist
+BAND_MIN_HZ = 40
+
+BEAT_HISTORY   = 1.0   # seconds of spectral flux used for the onset threshold
+BEAT_THRESHOLD = 1.5   # onset when flux > mean + BEAT_THRESHOLD * std
+BEAT_MIN_GAP   = 0.12  # seconds between two reported beats
+AGC_DECAY      = 0.999 # per-block decay of the running peak used to normalize
+
+LATE_FRAMES    = 30    # consecutive frames over the period before tightening
+PERIOD_SMOOTHING = 0.05  # weight of each new show() interval in the measured period
+QUEUED_FRACTION = 0.5  # a read returning in under this share of its block was queued
+
+AudioFeatures = namedtuple("AudioFeatures", [
+    "timestamp",   # perf_counter() when the newest sample was captured
+    "level",       # overall loudness, 0..1
+    "bands",       # tuple of NUM_BANDS energies, 0..1, low -> high
+    "beat",        # True if this block contains an onset
+    "beats",       # running onset count (lets a slow renderer spot missed beats)
+])
+
+SILENCE = AudioFeatures(0.0, 0.0, (0.0,) * NUM_BANDS, False, 0)
+
+
+# ---------------------------------------------------
+# Sources
+# ---------------------------------------------------
+class WavSource:
+    """Reads a .wav file as mono float32, paced to real time."""
+
+    def __init__(self, path, loop=True, realtime=True):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self._wav = wave.open(path, "rb")
+        self.samplerate = self._wav.getframerate()
+        self._channels = self._wav.getnchannels()
+        self._width = self._wav.getsampwidth()
+        self._next_time = None
+
+    def read(self, n):
+        raw = self._wav.readframes(n)
+        if len(raw) < n * self._channels * self._width:
+            if not self.loop:
+                return None
+            self._wav.rewind()
+            raw += self._wav.readframes(n - len(raw) // (self._channels * self._width))
+
+        if self._width == 1:
+            data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif self._width == 2:
+            data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+        else:
+            data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+        data = data.reshape(-1, self._channels).mean(axis=1)
+
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_time is None:
+                self._next_time = now
+            self._next_time += len(data) / self.samplerate
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+        return data
+
+    def close(self):
+        self._wav.close()
+
+
+class AlsaSource:
+    """
+    Live capture from an ALSA device (mono, 16-bit).  The device delivers
+    `period` samples per read; read(n) joins periods until it has n.
+    """
+
+    def __init__(self, device="default", samplerate=SAMPLE_RATE, period=MIN_HOP):
+        import alsaaudio    # optional dependency, only needed for live input
+
+        self.samplerate = samplerate
+        self._pcm = alsaaudio.PCM(
+            alsaaudio.PCM_CAPTURE, alsaaudio.PCM_NORMAL, device=device,
+            channels=1, rate=samplerate, format=alsaaudio.PCM_FORMAT_S16_LE,
+            periodsize=period
+        )
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def read(self, n):
+        parts, have = [self._pending], len(self._pending)
+        while have < n:
+            length, raw = self._pcm.read()
+            if length <= 0:
+                continue    # overrun: the device drops the period, keep reading
+            part = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+            parts.append(part)
+            have += len(part)
+        data = np.concatenate(parts)
+        self._pending = data[n:]
+        return data[:n]
+
+    def close(self):
+        self._pcm.close()
+
+
+def open_source(spec):
+    """'alsa', 'alsa:<device>' or a path to a .wav file."""
+    if spec == "alsa":
+        return AlsaSource()
+    if spec.startswith("alsa:"):
+        return AlsaSource(device=spec[5:])
+    return WavSource(spec)
+
+
+# ---------------------------------------------------
+# Analysis thread
+# ---------------------------------------------------
+class AudioInput:
+    def __init__(self, source, frame_period=None):
+        """
+        source       : object with .samplerate and .read(n) -> float32 array
+        frame_period : fixed frame period in seconds (default: measured
+                       between show() calls)
+        """
+        self.source = source
+        self.frame_period = frame_period
+        self._fixed_period = frame_period is not None
+        self._last_show = None
+        self.features = SILENCE
+
+        self.hop = HOP
+        self.latency = None          # smoothed input-to-light latency (s)
+        self.skipped = 0             # queued blocks not analyzed
+        self._late_frames = 0
+        self._drop_queued = False
+        self._warned = False
+
+        rate = source.samplerate
+        self._ring = np.zeros(WINDOW, dtype=np.float32)
+        self._pos = 0
+        self._hann = np.hanning(WINDOW).astype(np.float32)
+
+        freqs = np.fft.rfftfreq(WINDOW, 1.0 / rate)
+        edges_hz = np.geomspace(BAND_MIN_HZ, rate / 2, NUM_BANDS + 1)
+        self._band_starts = np.searchsorted(freqs, edges_hz[:-1])
+        self._band_starts = np.minimum(self._band_starts, len(freqs) - 1)
+
+        self._flux = None
+        self._flux_hop = None
+        self._prev_mag = np.zeros(len(freqs), dtype=np.float32)
+        self._peak_bands = np.full(NUM_BANDS, 1e-6, dtype=np.float32)
+        self._peak_level = 1e-6
+        self._last_beat = 0.0
+        self._beats = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.source.close()
+
+    def show(self, strip, features):
+        """strip.show() for a frame rendered from `features`, timing its latency."""
+        now = time.perf_counter()
+        if self._last_show is not None and not self._fixed_period:
+            period = now - self._last_show
+            if self.frame_period is None:
+                self.frame_period = period
+            else:
+                self.frame_period += PERIOD_SMOOTHING * (period - self.frame_period)
+        self._last_show = now
+
+        if getattr(strip, "ASYNC_SHOW", False):
+            strip.show(on_pushed=lambda: self.frame_shown(features.timestamp))
+        else:
+            strip.show()
+            self.frame_shown(features.timestamp)
+
+    def frame_shown(self, captured):
+        """The frame rendered from the snapshot taken at `captured` is on the strip."""
+        if not captured:
+            return
+        latency = time.perf_counter() - captured
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += 0.05 * (latency - self.latency)
+
+        if not self.frame_period or self.latency <= self.frame_period:
+            self._late_frames = 0
+            self._drop_queued = False
+            return
+        self._late_frames += 1
+        if self._late_frames < LATE_FRAMES:
+            return
+        self._late_frames = 0
+        self._drop_queued = True
+        if self.hop > MIN_HOP:
+            self.hop //= 2
+            print(f"[Audio] input-to-light latency {self.latency * 1000:.1f} ms "
+                  f"over frame period {self.frame_period * 1000:.1f} ms: "
+                  f"hop {self.hop} samples, skipping queued blocks")
+        elif not self._warned:
+            self._warned = True
+            print(f"[Audio] input-to-light latency {self.latency * 1000:.1f} ms "
+                  f"still over frame period {self.frame_period * 1000:.1f} ms at "
+                  f"hop {self.hop}: rendering and output take longer than a frame")
+
+    # ---- background thread ----
+    def _run(self):
+        rate = self.source.samplerate
+        skipped_run = 0
+        while self._running:
+            hop = self.hop
+            if hop != self._flux_hop:
+                history = max(4, int(BEAT_HISTORY * rate / hop))
+                self._flux = np.zeros(history, dtype=np.float32)
+                self._flux_pos = 0
+                self._flux_hop = hop
+
+            requested = time.perf_counter()
+            block = self.source.read(hop)
+            if block is None:
+                break
+            if len(block) == 0:
+                continue
+            captured = time.perf_counter()
+            self._push(block)
+
+            # returned at once: the samples were waiting, a newer block follows
+            # (at most a window's worth in a row, so features keep moving)
+            queued = captured - requested < QUEUED_FRACTION * len(block) / rate
+            if self._drop_queued and queued and skipped_run < WINDOW // hop:
+                self.skipped += 1
+                skipped_run += 1
+                continue
+            skipped_run = 0
+            self.features = self._analyze(captured)
+
+    def _push(self, block):
+        block = block[-WINDOW:]
+        n = len(block)
+        end = self._pos + n
+        if end <= WINDOW:
+            self._ring[self._pos:end] = block
+        else:
+            split = WINDOW - self._pos
+            self._ring[self._pos:] = block[:split]
+            self._ring[:n - split] = block[split:]
+        self._pos = end % WINDOW
+
+    def _analyze(self, captured):
+        # unroll the ring so the newest sample is last
+        window = np.concatenate((self._ring[self._pos:], self._ring[:self._pos]))
+        mag = np.abs(np.fft.rfft(window * self._hann)).astype(np.float32)
+        power = mag * mag
+
+        bands = np.add.reduceat(power, self._band_starts)
+        self._peak_bands = np.maximum(bands, self._peak_bands * AGC_DECAY)
+        bands = bands / self._peak_bands
+
+        level = float(np.sqrt(np.mean(window * window)))
+        self._peak_level = max(level, self._peak_level * AGC_DECAY)
+        level = level / self._peak_level
+
+        # spectral flux onset detection
+        flux = float(np.sum(np.maximum(mag - self._prev_mag, 0)))
+        self._prev_mag = mag
+        threshold = self._flux.mean() + BEAT_THRESHOLD * self._flux.std()
+        self._flux[self._flux_pos] = flux
+        self._flux_pos = (self._flux_pos + 1) % len(self._flux)
+
+        beat = flux > threshold and captured - self._last_beat >= BEAT_MIN_GAP
+        if beat:
+            self._last_beat = captured
+            self._beats += 1
+
+        return AudioFeatures(captured, level, tuple(bands.tolist()), beat, self._beats)
+
+
+if __name__ == "__main__":
+    audio = AudioInput(open_source(sys.argv[1] if len(sys.argv) > 1 else "alsa")).start()
+    last_beats = 0
+    try:
+        while True:
+            f = audio.features
+            marker = "BEAT" if f.beats != last_beats else ""
+            last_beats = f.beats
+            bars = " ".join(f"{b:4.2f}" for b in f.bands)
+            print(f"level {f.level:4.2f} | {bars} {marker}")
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        audio.stop()
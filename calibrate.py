@@ -0,0 +1,413 @@
+# calibrate.py — camera-based refinement of tree_coords.json
+#
+# tree_coords.json is the ideal helix from compute_coords.py.  This tool
+# measures where the LEDs really are:
+#
+#   1. capture  — for each camera view (walk around the tree, e.g. every
+#                 90 degrees) light LEDs and grab images.
+#                   --mode single : one LED per frame, like one_by_one.py (N frames)
+#                   --mode binary : frame k lights every LED whose index has
+#                                   bit k set (log2(N) frames + 2 reference frames)
+#   2. solve    — locate every LED in every view (blob detection, one view
+#                 or image chunk per worker process), then triangulate 3D
+#                 positions across views and write a refined coords file.
+#   3. selftest — renders synthetic views of a perturbed tree and checks
+#                 that `solve` recovers it (also run by tests/test_calibrate.py).
+#
+# Views use an orthographic model: a camera at angle `a` (degrees, around
+# the tree axis) sees an LED at image column u ~ -x sin(a) + y cos(a) and
+# image row v ~ -z.  Pixel scale and offsets per view are fitted against
+# the ideal coordinates, so only the angles need to be known.
+#
+# Capture layout (one directory per view):
+#     <out>/<view>/view.json         {"angle": 90, "mode": "binary", "led_count": 500}
+#     <out>/<view>/background.png    everything off
+#     <out>/<view>/all.png           everything on          (binary mode)
+#     <out>/<view>/bit_00.png ...    one frame per index bit (binary mode)
+#     <out>/<view>/led_0000.png ...  one frame per LED       (single mode)
+# Images may also be stored as .npy arrays (used by selftest).
+#
+# Usage:
+#     python3 calibrate.py capture --view front --angle 0 --mode binary
+#     python3 calibrate.py solve calib/front calib/right calib/back calib/left \
+#         --out tree_coords_calibrated.json
+#     python3 calibrate.py selftest
+
+import os
+import sys
+import json
+import time
+import math
+import argparse
+import tempfile
+from multiprocessing import Pool
+import numpy as np
+
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+COORDS_JSON = os.path.join(BASE_DIR, "tree_coords.json")
+
+# ----------------------------------------------------
+# Detection parameters
+# ----------------------------------------------------
+BLOB_RADIUS     = 3       # px; peaks closer than this merge into one blob
+BLOB_THRESHOLD  = 0.15    # fraction of the brightest blob that counts as lit
+CAPTURE_COLOR   = (80, 80, 80)   # dim white keeps blobs small on camera
+SETTLE_TIME     = 0.15    # s to wait after show() before grabbing a frame
+SELFTEST_MAX_ERROR = 0.2  # in; median error selftest must reach (ideal is ~0.6)
+
+
+def load_coords(path=COORDS_JSON):
+    with open(path) as f:
+        return np.asarray(json.load(f), dtype=np.float64)
+
+
+def bit_count(led_count):
+    return max(1, math.ceil(math.log2(led_count)))
+
+
+# ----------------------------------------------------
+# Image IO
+# ----------------------------------------------------
+def load_image(path_no_ext):
+    """Grayscale float32 image from <path>.npy or <path>.png."""
+    if os.path.exists(path_no_ext + ".npy"):
+        return np.load(path_no_ext + ".npy").astype(np.float32)
+
+    import cv2    # only needed for real camera images
+    img = cv2.imread(path_no_ext + ".png", cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(path_no_ext + ".png")
+    return img.astype(np.float32)
+
+
+# ----------------------------------------------------
+# Vectorized blob detection
+# ----------------------------------------------------
+def box_blur(img, r):
+    """Mean over a (2r+1)^2 box, via cumulative sums."""
+    k = 2 * r + 1
+    p = np.pad(img, r, mode="edge")
+    c = np.cumsum(np.cumsum(p, axis=0), axis=1)
+    c = np.pad(c, ((1, 0), (1, 0)))
+    return (c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]) / (k * k)
+
+
+def window_max(img, r):
+    """Max over a (2r+1)^2 box (separable)."""
+    from numpy.lib.stride_tricks import sliding_window_view
+    p = np.pad(img, r, mode="constant", constant_values=-np.inf)
+    rows = sliding_window_view(p, 2 * r + 1, axis=1).max(axis=-1)
+    return sliding_window_view(rows, 2 * r + 1, axis=0).max(axis=-1)
+
+
+def centroids(img, ys, xs, r, floor):
+    """Brightness-weighted sub-pixel centers of the windows around (ys, xs)."""
+    d = np.arange(-r, r + 1)
+    yy = np.clip(ys[:, None, None] + d[None, :, None], 0, img.shape[0] - 1)
+    xx = np.clip(xs[:, None, None] + d[None, None, :], 0, img.shape[1] - 1)
+    w = np.maximum(img[yy, xx] - floor, 0)
+    total = w.sum(axis=(1, 2)) + 1e-9
+    return (w * yy).sum(axis=(1, 2)) / total, (w * xx).sum(axis=(1, 2)) / total
+
+
+def find_blobs(img, r=BLOB_RADIUS, threshold=BLOB_THRESHOLD):
+    """
+    Blob peaks in a background-subtracted image.
+    Returns (ys, xs, strength) with integer peak pixels and blurred strength.
+    """
+    smooth = box_blur(img, 1)
+    # tiny ramp makes every pixel unique, so saturated plateaus give one peak
+    smooth = smooth + np.arange(smooth.size, dtype=np.float64).reshape(smooth.shape) * 1e-9
+    peak = smooth.max()
+    if peak <= 0:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+
+    is_peak = (smooth == window_max(smooth, r)) & (smooth > threshold * peak)
+    ys, xs = np.nonzero(is_peak)
+    return ys, xs, smooth[ys, xs]
+
+
+# ----------------------------------------------------
+# Per-view LED location (runs in worker processes)
+# ----------------------------------------------------
+def locate_binary_view(view_dir):
+    """{led_index: (u, v)} for one binary-coded view."""
+    with open(os.path.join(view_dir, "view.json")) as f:
+        meta = json.load(f)
+    nbits = bit_count(meta["led_count"])
+
+    background = load_image(os.path.join(view_dir, "background"))
+    lit = load_image(os.path.join(view_dir, "all")) - background
+    ys, xs, strength = find_blobs(lit)
+    cy, cx = centroids(lit, ys, xs, BLOB_RADIUS, BLOB_THRESHOLD * strength.max(initial=0))
+
+    # read each blob's brightness in every bit frame -> its LED index
+    codes = np.zeros(len(ys), dtype=np.int64)
+    for bit in range(nbits):
+        frame = box_blur(load_image(os.path.join(view_dir, f"bit_{bit:02d}")) - background, 1)
+        codes |= (frame[ys, xs] > 0.5 * strength).astype(np.int64) << bit
+
+    # drop codes that are out of range or claimed by more than one blob
+    found = {}
+    valid = codes < meta["led_count"]
+    ids, counts = np.unique(codes[valid], return_counts=True)
+    unique_ids = set(ids[counts == 1].tolist())
+    for code, u, v in zip(codes.tolist(), cx.tolist(), cy.tolist()):
+        if code in unique_ids:
+            found[code] = (u, v)
+    return found
+
+
+def locate_single_chunk(job):
+    """{led_index: (u, v)} for a chunk of one-LED-per-frame images."""
+    view_dir, indices = job
+    background = load_image(os.path.join(view_dir, "background"))
+    found = {}
+    for idx in indices:
+        img = load_image(os.path.join(view_dir, f"led_{idx:04d}")) - background
+        smooth = box_blur(img, 1)
+        y, x = np.unravel_index(np.argmax(smooth), smooth.shape)
+        if smooth[y, x] <= 0:
+            continue    # not visible from this side
+        cy, cx = centroids(img, np.array([y]), np.array([x]), BLOB_RADIUS,
+                           BLOB_THRESHOLD * smooth[y, x])
+        found[idx] = (float(cx[0]), float(cy[0]))
+    return found
+
+
+def locate_views(view_dirs, workers=None):
+    """[(angle_deg, {led: (u, v)})] for every view, using a process pool."""
+    metas = []
+    for view_dir in view_dirs:
+        with open(os.path.join(view_dir, "view.json")) as f:
+            metas.append(json.load(f))
+
+    with Pool(workers) as pool:
+        binary = [d for d, m in zip(view_dirs, metas) if m["mode"] == "binary"]
+        binary_results = dict(zip(binary, pool.map(locate_binary_view, binary)))
+
+        jobs, owners = [], []
+        for d, m in zip(view_dirs, metas):
+            if m["mode"] == "single":
+                for chunk in np.array_split(np.arange(m["led_count"]), 16):
+                    jobs.append((d, chunk.tolist()))
+                    owners.append(d)
+        single_results = {d: {} for d in owners}
+        for d, found in zip(owners, pool.map(locate_single_chunk, jobs)):
+            single_results[d].update(found)
+
+    views = []
+    for d, m in zip(view_dirs, metas):
+        found = binary_results[d] if m["mode"] == "binary" else single_results[d]
+        views.append((m["angle"], found))
+    return views
+
+
+# ----------------------------------------------------
+# Triangulation
+# ----------------------------------------------------
+def triangulate(views, ideal):
+    """
+    Refined (N, 3) coordinates from per-view detections.
+    LEDs seen in < 2 views keep their ideal x/y; LEDs never seen keep all three.
+    """
+    n = len(ideal)
+    sum_z = np.zeros(n)
+    seen = np.zeros(n, dtype=int)
+    ata = np.zeros((n, 2, 2))
+    atb = np.zeros((n, 2))
+
+    for angle, found in views:
+        if len(found) < 3:
+            continue
+        a = math.radians(angle)
+        axis = np.array([-math.sin(a), math.cos(a)])
+        idx = np.fromiter(found.keys(), dtype=int)
+        uv = np.array([found[i] for i in idx])
+
+        # per-view scale and offsets, fitted against the ideal geometry
+        z_ideal = ideal[idx, 2]
+        slope, cv = np.polyfit(z_ideal, uv[:, 1], 1)
+        scale = -slope
+        h_ideal = ideal[idx, :2] @ axis
+        cu = np.median(uv[:, 0] - scale * h_ideal)
+
+        sum_z[idx] += (cv - uv[:, 1]) / scale
+        seen[idx] += 1
+        h = (uv[:, 0] - cu) / scale
+        ata[idx] += np.outer(axis, axis)
+        atb[idx] += axis * h[:, None]
+
+    refined = ideal.copy()
+    visible = seen > 0
+    refined[visible, 2] = sum_z[visible] / seen[visible]
+
+    solvable = np.abs(np.linalg.det(ata)) > 1e-6
+    refined[solvable, :2] = np.linalg.solve(ata[solvable], atb[solvable][..., None])[..., 0]
+
+    print(f"[Calibrate] {solvable.sum()} LEDs triangulated, "
+          f"{(visible & ~solvable).sum()} height only, {(~visible).sum()} not seen")
+    return refined
+
+
+# ----------------------------------------------------
+# Capture (runs on the Pi)
+# ----------------------------------------------------
+def capture(args):
+    import cv2
+    from rpi_ws281x import PixelStrip, Color
+
+    coords = load_coords()
+    led_count = len(coords)
+    r, g, b = CAPTURE_COLOR
+    on = Color(g, r, b)    # WS2811 GRB
+
+    strip = PixelStrip(led_count, 18, 800000, 10, False, 255, 0)
+    strip.begin()
+    camera = cv2.VideoCapture(args.camera)
+
+    view_dir = os.path.join(args.out, args.view)
+    os.makedirs(view_dir, exist_ok=True)
+    with open(os.path.join(view_dir, "view.json"), "w") as f:
+        json.dump({"angle": args.angle, "mode": args.mode, "led_count": led_count}, f)
+
+    def shoot(name, lit):
+        for i in range(led_count):
+            strip.setPixelColor(i, on if lit(i) else 0)
+        strip.show()
+        time.sleep(SETTLE_TIME)
+        camera.read()    # drop a buffered frame
+        ok, frame = camera.read()
+        if not ok:
+            raise RuntimeError("camera read failed")
+        cv2.imwrite(os.path.join(view_dir, name + ".png"),
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    try:
+        shoot("background", lambda i: False)
+        if args.mode == "binary":
+            shoot("all", lambda i: True)
+            for bit in range(bit_count(led_count)):
+                shoot(f"bit_{bit:02d}", lambda i: (i >> bit) & 1)
+        else:
+            for led in range(led_count):
+                shoot(f"led_{led:04d}", lambda i: i == led)
+    finally:
+        for i in range(led_count):
+            strip.setPixelColor(i, 0)
+        strip.show()
+        camera.release()
+
+    print(f"[Calibrate] view '{args.view}' saved to {view_dir}")
+
+
+def solve(args):
+    ideal = load_coords()
+    t0 = time.time()
+    views = locate_views(args.views, args.workers)
+    refined = triangulate(views, ideal)
+    with open(args.out, "w") as f:
+        json.dump(refined.tolist(), f, indent=2)
+    print(f"[Calibrate] wrote {args.out} in {time.time() - t0:.1f} s")
+
+
+# ----------------------------------------------------
+# Synthetic self-test
+# ----------------------------------------------------
+def render_view(coords, angle, lit, size=(960, 640), scale=10.0, sigma=1.2):
+    """Synthetic camera image of the lit LEDs; LEDs on the far side are hidden."""
+    a = math.radians(angle)
+    axis = np.array([-math.sin(a), math.cos(a)])
+    toward = np.array([math.cos(a), math.sin(a)])
+    h, w = size
+
+    u = coords[:, :2] @ axis * scale + w / 2
+    v = h - 40 - coords[:, 2] * scale
+    facing = coords[:, :2] @ toward > -0.3 * np.linalg.norm(coords[:, :2], axis=1)
+
+    img = np.zeros(size, dtype=np.float32)
+    yy, xx = np.mgrid[-4:5, -4:5]
+    for i in np.nonzero(lit & facing)[0]:
+        x0, y0 = int(round(u[i])), int(round(v[i]))
+        fx, fy = u[i] - x0, v[i] - y0
+        s = 255 * np.exp(-((xx - fx) ** 2 + (yy - fy) ** 2) / (2 * sigma ** 2))
+        ys, xs = slice(y0 - 4, y0 + 5), slice(x0 - 4, x0 + 5)
+        if 0 <= y0 - 4 and y0 + 5 <= h and 0 <= x0 - 4 and x0 + 5 <= w:
+            img[ys, xs] = np.maximum(img[ys, xs], s)
+    return np.minimum(img + 5.0, 255)
+
+
+def synthetic_errors(workers=None):
+    """
+    Calibrate synthetic views of a randomly perturbed tree.
+    Returns per-LED errors (inches) of the ideal and calibrated coordinates,
+    the solve time and the number of views.
+    """
+    ideal = load_coords()
+    rng = np.random.default_rng(1)
+    truth = ideal + rng.normal(0, 0.4, ideal.shape)
+    n = len(truth)
+    idx = np.arange(n)
+
+    with tempfile.TemporaryDirectory() as root:
+        dirs = []
+        for k, angle in enumerate((0, 90, 180, 270)):
+            d = os.path.join(root, f"view{k}")
+            os.makedirs(d)
+            with open(os.path.join(d, "view.json"), "w") as f:
+                json.dump({"angle": angle, "mode": "binary", "led_count": n}, f)
+            np.save(os.path.join(d, "background"), render_view(truth, angle, idx < 0))
+            np.save(os.path.join(d, "all"), render_view(truth, angle, idx >= 0))
+            for bit in range(bit_count(n)):
+                np.save(os.path.join(d, f"bit_{bit:02d}"),
+                        render_view(truth, angle, ((idx >> bit) & 1).astype(bool)))
+            dirs.append(d)
+
+        t0 = time.time()
+        views = locate_views(dirs, workers)
+        refined = triangulate(views, ideal)
+        elapsed = time.time() - t0
+
+    before = np.linalg.norm(ideal - truth, axis=1)
+    after = np.linalg.norm(refined - truth, axis=1)
+    return before, after, elapsed, len(dirs)
+
+
+def selftest(args):
+    before, after, elapsed, views = synthetic_errors(args.workers)
+    n = len(before)
+    print(f"[Calibrate] {views} views x {bit_count(n) + 2} frames solved in {elapsed:.1f} s")
+    print(f"[Calibrate] median error: ideal {np.median(before):.3f} in -> "
+          f"calibrated {np.median(after):.3f} in")
+    return 0 if np.median(after) < min(np.median(before), SELFTEST_MAX_ERROR) else 1
+
+
+# ----------------------------------------------------
+# MAIN
+# ----------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Camera calibration of LED coordinates")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("capture", help="light LEDs and capture one camera view")
+    p.add_argument("--view", required=True, help="name of this view (directory name)")
+    p.add_argument("--angle", type=float, required=True,
+                   help="camera angle around the tree in degrees")
+    p.add_argument("--mode", choices=("binary", "single"), default="binary")
+    p.add_argument("--camera", type=int, default=0, help="OpenCV camera index")
+    p.add_argument("--out", default=os.path.join(BASE_DIR, "calib"))
+
+    p = sub.add_parser("solve", help="locate LEDs in captured views and triangulate")
+    p.add_argument("views", nargs="+", help="view directories")
+    p.add_argument("--out", default=os.path.join(BASE_DIR, "tree_coords_calibrated.json"))
+    p.add_argument("--workers", type=int, default=None)
+
+    p = sub.add_parser("selftest", help="solve synthetic views of a perturbed tree")
+    p.add_argument("--workers", type=int, default=None)
+
+    args = parser.parse_args()
+    return {"capture": capture, "solve": solve, "selftest": selftest}[args.command](args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,21 @@
 # candy_cane_motion.py — animated candy cane spiral
 
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
-import json
-import os
 import math
 import signal
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from rpi_ws281x import Color
+from led_output import DoubleBufferedStrip, FrameWriter
+import geometry_cache
+from procedural import CandyCane
+from kernel_pool import KernelPool
+from frame_memo import FrameMemo
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 
 # -------------------------
@@ -29,24 +39,10 @@ def handle_exit(signum, frame):
 # -------------------------
 # Load LED coordinates
 # -------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(BASE_DIR, "tree_coords.json")) as f:
-    coords = json.load(f)
+coords = geometry_cache.coords()
 
 LED_COUNT = len(coords)
 
-# Precompute angle & height normalization
-thetas = []
-z_norms = []
-
-zs = [p[2] for p in coords]
-z_min, z_max = min(zs), max(zs)
-height = z_max - z_min
-
-for x, y, z in coords:
-    thetas.append(math.atan2(y, x))
-    z_norms.append((z - z_min) / height)
-
 
 # -------------------------
 # LED Setup
@@ -65,6 +61,11 @@ LED_CHANNEL    = 0
 STRIPES_PER_HEIGHT = 50       # how many diagonal stripes wrap the tree
 ROTATION_SPEED     = 4    # smaller = slower movement
 FADE_SHARPNESS     = 10       # higher = cleaner separation between red & white
+LOD_LEVEL          = 0        # >0 on very large trees: evaluate per LED cluster (lod.py)
+
+# the pattern repeats every 2*pi / ROTATION_SPEED of t: reuse those frames
+MEMO_STEPS         = 512              # phase quantization steps per rotation
+MEMO_MAX_BYTES     = 4 * 1024 * 1024  # cached frames (LED_COUNT * 4 bytes each)
 
 
 # -------------------------
@@ -76,47 +77,33 @@ def main():
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
 
-    strip = PixelStrip(
+    strip = fast_start.strip(
         LED_COUNT, LED_PIN, LED_FREQ_HZ,
         LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
     )
-    strip.begin()
 
-    # Clear garbage startup colors
-    for _ in range(2):
-        for i in range(LED_COUNT):
-            strip.setPixelColor(i, GRB(0,0,0))
-        strip.show()
-        time.sleep(0.05)
+    # compute the next frame while the output thread pushes this one
+    strip = DoubleBufferedStrip(strip)
 
     t = 0
 
-    RED   = (255,0,0)
-    WHITE = (255,255,255)
+    # red -> white spiral, computed for all LEDs at once
+    effect = CandyCane(stripes=STRIPES_PER_HEIGHT, rotation_speed=ROTATION_SPEED,
+                       sharpness=FADE_SHARPNESS, lod=LOD_LEVEL)
+    writer = FrameWriter(strip)    # whole frame per call, no per-pixel calls
+    pool = KernelPool()            # TREE_THREADS>1 splits big trees across cores
+    frame = np.empty(LED_COUNT, dtype=np.uint32)
+    memo = FrameMemo(2 * math.pi / ROTATION_SPEED, MEMO_STEPS, MEMO_MAX_BYTES)
+    heartbeat.track(memo)
 
     try:
         while running:
             t += 0.02
 
-            for i in range(LED_COUNT):
-
-                # Spiral: angle + height offset + time shift
-                phase = thetas[i] * 3 + z_norms[i] * STRIPES_PER_HEIGHT * math.pi + t * ROTATION_SPEED
-
-                # stripe value oscillates between 0 and 1
-                stripe = (math.sin(phase) + 1) / 2
-
-                # make boundaries clean (sharper edges)
-                stripe = stripe ** FADE_SHARPNESS
-
-                # blend between red & white
-                r = int(RED[0]   * (1-stripe) + WHITE[0] * stripe)
-                g = int(RED[1]   * (1-stripe) + WHITE[1] * stripe)
-                b = int(RED[2]   * (1-stripe) + WHITE[2] * stripe)
-
-                strip.setPixelColor(i, GRB(r,g,b))
+            writer.write(memo.frame(t, lambda tq: effect.render_packed(tq, frame, pool)))
 
             strip.show()
+            heartbeat.frame()
             time.sleep(0.02)
 
     finally:
@@ -124,6 +111,8 @@ def main():
         for i in range(LED_COUNT):
             strip.setPixelColor(i, GRB(0,0,0))
         strip.show()
+        strip.close()
+        print(f"[FrameMemo] {memo.stats()}")
 
 
 if __name__ == "__main__":
@@ -1,10 +1,21 @@
-# contagion_effect_rgb.py – spherical spreading contagion for 500 LEDs (RGB ORDER)
+# contagion_effect_rgb.py – contagion spreading along the lights for 500 LEDs (RGB ORDER)
+#
+# The spread follows geodesic.py's surface distance (shortest path along
+# neighbouring LEDs) rather than straight-line distance, so it crawls
+# along the branches instead of jumping through the tree's interior.
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import random
-import math
-import os
-import json
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from rpi_ws281x import Color
+import geometry_cache
+from geodesic import GeodesicField
+from led_output import FrameWriter
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 # -----------------------------------------------------
 # RGB helper (your strip uses RGB order)
@@ -13,16 +24,10 @@ def RGB(r, g, b):
     return Color(r, g, b)
 
 # -----------------------------------------------------
-# Load coordinates from JSON
+# Load coordinates and the geodesic distance field
 # -----------------------------------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-COORDS_JSON = os.path.join(BASE_DIR, "tree_coords.json")
-
-with open(COORDS_JSON, "r") as f:
-    coords = json.load(f)
-
-LED_COUNT = len(coords)
-led_coords = coords[:]
+LED_COUNT = len(geometry_cache.coords())
+field = GeodesicField(heartbeat=heartbeat)    # rows computed per origin, kept on disk
 
 print(f"Loaded {LED_COUNT} LED coordinates (RGB strip).")
 
@@ -36,7 +41,7 @@ LED_BRIGHTNESS = 255
 LED_INVERT     = False
 LED_CHANNEL    = 0
 
-strip = PixelStrip(
+strip = fast_start.strip(
     LED_COUNT,
     LED_PIN,
     LED_FREQ_HZ,
@@ -45,7 +50,7 @@ strip = PixelStrip(
     LED_BRIGHTNESS,
     LED_CHANNEL
 )
-strip.begin()
+writer = FrameWriter(strip)
 
 # -----------------------------------------------------
 # Clear all LEDs
@@ -66,7 +71,6 @@ def animate_contagious_effect(interval=0.01, contagion_speed=15.0, hold_time=0.4
         # Pick ONE LED and ONE color
         # ----------------------------
         start_idx = random.randrange(LED_COUNT)
-        sx, sy, sz = led_coords[start_idx]
 
         # Bright single color chosen ONCE
         r = random.randint(120, 255)
@@ -75,16 +79,12 @@ def animate_contagious_effect(interval=0.01, contagion_speed=15.0, hold_time=0.4
         contagion_color = RGB(r, g, b)
 
         # ----------------------------
-        # Compute all distances once
+        # Distances along the lights: one row lookup
         # ----------------------------
-        distances = []
-        max_dist = 0.0
-
-        for (x, y, z) in led_coords:
-            d = math.dist((sx, sy, sz), (x, y, z))
-            distances.append(d)
-            if d > max_dist:
-                max_dist = d
+        distances = field.from_source(start_idx)
+        max_dist = float(distances.max())
+        lit = np.full(LED_COUNT, contagion_color, dtype=np.uint32)
+        dark = np.zeros(LED_COUNT, dtype=np.uint32)
 
         spread_duration = max_dist / contagion_speed
 
@@ -98,13 +98,10 @@ def animate_contagious_effect(interval=0.01, contagion_speed=15.0, hold_time=0.4
             radius = contagion_speed * elapsed
 
             # no pulsing, no brightness, no flicker
-            for idx, d in enumerate(distances):
-                if d <= radius:
-                    strip.setPixelColor(idx, contagion_color)
-                else:
-                    strip.setPixelColor(idx, RGB(0, 0, 0))
+            writer.write(np.where(distances <= radius, lit, dark))
 
             strip.show()
+            heartbeat.frame()
 
             if elapsed >= spread_duration:
                 break
@@ -117,6 +114,7 @@ def animate_contagious_effect(interval=0.01, contagion_speed=15.0, hold_time=0.4
         for i in range(LED_COUNT):
             strip.setPixelColor(i, contagion_color)
         strip.show()
+        heartbeat.frame()
         time.sleep(hold_time)
 
         # ----------------------------
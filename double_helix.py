@@ -1,11 +1,18 @@
 # double_helix.py
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
-import json
-import os
-import math
 import signal
-from rpi_ws281x import PixelStrip, Color
-import colorsys
+import numpy as np
+from rpi_ws281x import Color
+from led_output import DoubleBufferedStrip, FrameWriter
+import geometry_cache
+from procedural import DoubleHelix
+from kernel_pool import KernelPool
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 running = True
 strip = None
@@ -18,22 +25,10 @@ def handle_exit(signum, frame):
     running = False
 
 # Load 3D coordinates
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(BASE_DIR, "tree_coords.json")) as f:
-    coords = json.load(f)
+coords = geometry_cache.coords()
 
 LED_COUNT = len(coords)
 
-# Precompute theta and z
-thetas = []
-zs = []
-for x, y, z in coords:
-    thetas.append(math.atan2(y, x))
-    zs.append(z)
-
-z_min, z_max = min(zs), max(zs)
-height = z_max - z_min
-
 # LED strip config
 LED_PIN = 18
 LED_FREQ_HZ = 800000
@@ -42,9 +37,8 @@ LED_BRIGHTNESS = 255
 LED_INVERT = False
 LED_CHANNEL = 0
 
-def vibrant(h):
-    r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
-    return GRB(int(r*255), int(g*255), int(b*255))
+LOD_LEVEL = 0    # >0 on very large trees: evaluate per LED cluster (lod.py)
+
 
 def main():
     global strip, running
@@ -52,44 +46,35 @@ def main():
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
 
-    strip = PixelStrip(LED_COUNT, LED_PIN, LED_FREQ_HZ,
+    strip = fast_start.strip(LED_COUNT, LED_PIN, LED_FREQ_HZ,
                        LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
-    strip.begin()
+
+    # compute the next frame while the output thread pushes this one
+    strip = DoubleBufferedStrip(strip)
 
     phase = 0.0
     speed = 0.04
     turns = 5.5
 
+    # two counter-rotating rainbow helices, computed for all LEDs at once
+    effect = DoubleHelix(turns=turns, lod=LOD_LEVEL)
+    writer = FrameWriter(strip)    # whole frame per call, no per-pixel calls
+    pool = KernelPool()            # TREE_THREADS>1 splits big trees across cores
+    frame = np.empty(LED_COUNT, dtype=np.uint32)
+
     while running:
         phase += speed
-        for i in range(LED_COUNT):
-            theta = thetas[i]
-            z_norm = (zs[i] - z_min) / height
-
-            # helix phase
-            h1 = theta + 2 * math.pi * turns * z_norm + phase
-            h2 = theta + 2 * math.pi * turns * z_norm - phase
-
-            # Two helix intensities
-            v1 = (math.sin(h1) + 1) / 2
-            v2 = (math.sin(h2) + 1) / 2
-
-            v = max(v1, v2)  # combined
-
-            color = vibrant((z_norm + phase * 0.1) % 1.0)
-            g = int(((color >> 16) & 0xFF) * v)
-            r = int(((color >> 8) & 0xFF) * v)
-            b = int((color & 0xFF) * v)
-
-            strip.setPixelColor(i, GRB(r, g, b))
+        writer.write(effect.render_packed(phase, frame, pool))
 
         strip.show()
+        heartbeat.frame()
         time.sleep(0.02)
 
     # On exit
     for i in range(LED_COUNT):
         strip.setPixelColor(i, GRB(0,0,0))
     strip.show()
+    strip.close()
 
 if __name__ == "__main__":
     main()
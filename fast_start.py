@@ -0,0 +1,136 @@
+# fast_start.py — light the tree within a few hundred ms of launch
+#
+# An animation's first real frame waits on numpy, geometry caches, strip
+# setup and its own precomputation.  Meanwhile the tree keeps whatever the
+# previous animation left on it.  This module fixes that with only stdlib
+# imports plus rpi_ws281x.  As the very first lines of a script:
+#
+#     import fast_start
+#     fast_start.show_first_frame(__file__)    # before the heavy imports
+#
+# This begins the strip and shows the animation's poster frame, a frame of
+# that animation recorded by `python3 startup_bench.py --capture`.  If no
+# poster exists yet it shows a dim warm fill.  WS281x LEDs latch, so the
+# poster stays on while the rest of the script imports and precomputes.
+# The script then gets the same, already begun strip back:
+#
+#     strip = fast_start.strip(LED_COUNT, LED_PIN, ...)    # instead of PixelStrip(...); begin()
+#
+# show_first_frame() also gives every animation a --profile [SECONDS]
+# flag (profiler.py samples the script's first SECONDS).
+#
+# With strip_daemon.py running, both calls return a DaemonStrip that
+# draws into the daemon's shared memory instead, so no animation opens
+# the DMA channel itself.  Once a daemon has claimed the strip they
+# never fall back to a PixelStrip.  They wait for a daemon that is still
+# starting, and raise if it never gets ready or drives another LED count.
+#
+# Poster file: .first_frames/<animation>.u32, native-endian u32 words:
+# brightness, then one packed color per LED.
+
+import os
+import sys
+from array import array
+from strip_daemon import DaemonStrip
+
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+COORDS_JSON = os.path.join(BASE_DIR, "tree_coords.json")
+POSTER_DIR  = os.path.join(BASE_DIR, ".first_frames")
+
+# defaults shared by every animation
+LED_PIN        = 18
+LED_FREQ_HZ    = 800000
+LED_DMA        = 10
+LED_BRIGHTNESS = 255
+LED_INVERT     = False
+LED_CHANNEL    = 0
+
+FALLBACK_COLOR      = (40 << 16) | (60 << 8) | 10    # dim warm white, GRB packed
+FALLBACK_BRIGHTNESS = 255
+
+_strip  = None
+_config = None
+
+
+def poster_path(name):
+    return os.path.join(POSTER_DIR, os.path.splitext(os.path.basename(name))[0] + ".u32")
+
+
+def load_poster(name):
+    """(brightness, array('I') of colors) or None."""
+    try:
+        with open(poster_path(name), "rb") as f:
+            words = array("I", f.read())
+    except OSError:
+        return None
+    if len(words) < 2:
+        return None
+    return words[0], words[1:]
+
+
+def save_poster(name, colors, brightness=LED_BRIGHTNESS):
+    os.makedirs(POSTER_DIR, exist_ok=True)
+    words = array("I", [brightness])
+    words.extend(int(c) & 0xFFFFFFFF for c in colors)
+    tmp = poster_path(name) + ".tmp"
+    with open(tmp, "wb") as f:
+        words.tofile(f)
+    os.replace(tmp, poster_path(name))
+
+
+def _led_count():
+    import json
+    with open(COORDS_JSON) as f:
+        return len(json.load(f))
+
+
+def show_first_frame(script):
+    """Begin the strip and show `script`'s poster frame (or a dim fill)."""
+    global _strip, _config
+    if "--profile" in sys.argv:
+        import profiler
+        profiler.from_argv(script)
+    if _strip is not None or "-h" in sys.argv or "--help" in sys.argv:
+        return
+    daemon = DaemonStrip.connect()
+
+    poster = load_poster(script)
+    if poster is not None and (daemon is None or len(poster[1]) == daemon.numPixels()):
+        brightness, colors = poster
+    else:
+        brightness = FALLBACK_BRIGHTNESS
+        colors = [FALLBACK_COLOR] * (daemon.numPixels() if daemon else _led_count())
+
+    _config = (len(colors), LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_CHANNEL)
+    if daemon is not None:
+        _strip = daemon
+        _strip.setBrightness(brightness)
+    else:
+        from rpi_ws281x import PixelStrip
+        _strip = PixelStrip(len(colors), LED_PIN, LED_FREQ_HZ, LED_DMA,
+                            LED_INVERT, brightness, LED_CHANNEL)
+        _strip.begin()
+    for i, color in enumerate(colors):
+        _strip.setPixelColor(i, color)
+    _strip.show()
+
+
+def strip(led_count, pin=LED_PIN, freq_hz=LED_FREQ_HZ, dma=LED_DMA,
+          invert=LED_INVERT, brightness=LED_BRIGHTNESS, channel=LED_CHANNEL):
+    """A begun strip: the one show_first_frame() opened if it matches, the daemon's, else a new one."""
+    global _strip
+    early, _strip = _strip, None
+    if early is not None and _config == (led_count, pin, freq_hz, dma, invert, channel):
+        early.setBrightness(brightness)
+        return early
+    early = None    # release the DMA channel before opening it again
+
+    daemon = DaemonStrip.connect(led_count)    # raises rather than share the DMA channel
+    if daemon is not None:
+        daemon.setBrightness(brightness)
+        return daemon
+
+    from rpi_ws281x import PixelStrip
+    s = PixelStrip(led_count, pin, freq_hz, dma, invert, brightness, channel)
+    s.begin()
+    return s
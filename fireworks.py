@@ -1,10 +1,19 @@
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import random
-import math
-import os
-import json
 import argparse
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from rpi_ws281x import Color
+from led_output import InterpolatingStrip, FrameWriter
+from quality_governor import QualityGovernor
+from trail_kernels import TrailBuffer
+import geometry_cache
+from audio_input import AudioInput, open_source
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 # ----------------------------------------------------
 # WS2811 GRB helper
@@ -29,12 +38,29 @@ parser.add_argument("-s", "--spawn", type=float, default=0.4,
 parser.add_argument("-b", "--blast", type=float, default=0.45,
                     help="Blast radius factor (0–1) scaled by tree size")
 
+parser.add_argument("--min-spawn", type=float, default=0.1,
+                    help="Lowest spawn probability the quality governor may drop to")
+
+parser.add_argument("--budget", type=float, default=None,
+                    help="Compute time budget per frame in seconds (default: same as --interval)")
+
+parser.add_argument("--audio", default=None,
+                    help="Drive spawning from audio: 'alsa', 'alsa:<device>' or a .wav path")
+
+parser.add_argument("--interpolate", type=float, default=None, metavar="FPS",
+                    help="Treat each rendered frame as a keyframe and blend in-between "
+                         "frames at FPS (0 = wire rate); pair with a larger --interval")
+
 args = parser.parse_args()
 
 INTERVAL            = args.interval
 FIREWORK_DURATION   = args.duration
 SPAWN_CHANCE        = args.spawn
 BLAST_RADIUS_FACTOR = args.blast
+MIN_SPAWN_CHANCE    = min(args.min_spawn, SPAWN_CHANCE)
+FRAME_BUDGET        = args.budget if args.budget is not None else INTERVAL
+AUDIO_SOURCE        = args.audio
+OUTPUT_FPS          = args.interpolate
 
 print(f"\nFireworks parameters:")
 print(f"  interval = {INTERVAL}")
@@ -45,11 +71,7 @@ print(f"  blast    = {BLAST_RADIUS_FACTOR}\n")
 # ----------------------------------------------------
 # Load LED coordinates
 # ----------------------------------------------------
-BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
-COORDS_JSON = os.path.join(BASE_DIR, "tree_coords.json")
-
-with open(COORDS_JSON, "r") as f:
-    positions = json.load(f)
+positions = geometry_cache.coords()   # (N, 3) array of [x, y, z]
 
 LED_COUNT = len(positions)
 print(f"Loaded {LED_COUNT} LED positions.")
@@ -64,11 +86,14 @@ LED_BRIGHTNESS = 150
 LED_INVERT     = False
 LED_CHANNEL    = 0
 
-strip = PixelStrip(
+strip = fast_start.strip(
     LED_COUNT, LED_PIN, LED_FREQ_HZ,
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
-strip.begin()
+
+# Keyframes from the animation, blended in-betweens from the output thread
+if OUTPUT_FPS is not None:
+    strip = InterpolatingStrip(strip, OUTPUT_FPS or None)
 
 # ----------------------------------------------------
 # Helpers
@@ -78,19 +103,14 @@ def clear_strip():
         strip.setPixelColor(i, GRB(0,0,0))
     strip.show()
 
-def dist3(p, q):
-    return math.dist(p, q)
-
 # ----------------------------------------------------
 # Fireworks Animation
 # ----------------------------------------------------
 def animate_fireworks():
 
-    xs = [p[0] for p in positions]
-    ys = [p[1] for p in positions]
-    zs = [p[2] for p in positions]
+    pos = positions    # read-only (N, 3) array from geometry_cache
 
-    max_dim = max(max(xs)-min(xs), max(ys)-min(ys), max(zs)-min(zs))
+    max_dim = (pos.max(axis=0) - pos.min(axis=0)).max()
     local_radius = BLAST_RADIUS_FACTOR * max_dim
 
     # Color groups
@@ -99,11 +119,27 @@ def animate_fireworks():
     group3 = [(0,0,255),     (255,255,0), (255,255,255)]
     raw_groups = [group1, group2, group3]
 
-    color_groups = [[(r,g,b) for (r,g,b) in grp] for grp in raw_groups]
+    color_groups = [np.array(grp, dtype=np.uint16) for grp in raw_groups]
+
+    # Summed contributions, reused every frame; each firework keeps its
+    # own faded-color scratch, so a frame allocates no per-LED arrays
+    contributions = TrailBuffer(LED_COUNT)
+    writer = FrameWriter(strip)    # whole frame per call, no per-pixel calls
 
     active_fireworks = []
     prev_time = time.time()
 
+    governor = QualityGovernor(FRAME_BUDGET, {
+        "spawn": (MIN_SPAWN_CHANCE, SPAWN_CHANCE)
+    })
+
+    # With audio: every beat launches a firework, and the random spawn
+    # chance follows the music's loudness
+    audio = None
+    last_beats = 0
+    if AUDIO_SOURCE:
+        audio = AudioInput(open_source(AUDIO_SOURCE)).start()
+
     try:
         while True:
             now = time.time()
@@ -113,37 +149,43 @@ def animate_fireworks():
             # -----------------------------------
             # Possibly spawn a new firework
             # -----------------------------------
-            if random.random() < SPAWN_CHANCE:
+            spawn_chance = governor.value("spawn")
+            on_beat = False
+            if audio:
+                features = audio.features
+                spawn_chance *= features.level
+                on_beat = features.beats != last_beats
+                last_beats = features.beats
+
+            if on_beat or random.random() < spawn_chance:
 
                 center_idx = random.randrange(LED_COUNT)
-                cx, cy, cz = positions[center_idx]
 
-                local_leds = [
-                    idx for idx, p in enumerate(positions)
-                    if dist3(p, (cx,cy,cz)) <= local_radius
-                ]
+                local_leds = np.flatnonzero(
+                    np.linalg.norm(pos - pos[center_idx], axis=1) <= local_radius
+                )
 
-                if not local_leds:
-                    local_leds = [center_idx]
+                if not len(local_leds):
+                    local_leds = np.array([center_idx])
 
                 chosen_group = random.choice(color_groups)
 
-                colors = {
-                    idx: random.choice(chosen_group)
-                    for idx in local_leds
-                }
+                # one color from the group per LED
+                colors = chosen_group[
+                    np.array([random.randrange(len(chosen_group)) for _ in local_leds])
+                ]
 
                 active_fireworks.append({
                     "local_leds": local_leds,
                     "colors":     colors,
+                    "faded":      np.empty_like(colors),
                     "start_time": now,
                     "duration":   FIREWORK_DURATION
                 })
 
             # -----------------------------------
-            # Build contribution buffer
+            # Build contribution buffer (in place)
             # -----------------------------------
-            contributions = [(0,0,0)] * LED_COUNT
             new_active = []
 
             for fw in active_fireworks:
@@ -152,35 +194,37 @@ def animate_fireworks():
                 if age < fw["duration"]:
                     fade = 1 - (age / fw["duration"])
 
-                    for idx in fw["local_leds"]:
-                        br, bg, bb = fw["colors"][idx]
-                        cr = int(br * fade)
-                        cg = int(bg * fade)
-                        cb = int(bb * fade)
-
-                        or_, og, ob = contributions[idx]
-                        contributions[idx] = (
-                            min(or_ + cr, 255),
-                            min(og + cg, 255),
-                            min(ob + cb, 255)
-                        )
+                    # add this firework on top (clamped at 255 below)
+                    contributions.accumulate(
+                        fw["local_leds"], fw["colors"], fade, fw["faded"]
+                    )
 
                     new_active.append(fw)
 
             active_fireworks = new_active
+            contributions.saturate()
 
             # -----------------------------------
             # Draw frame
             # -----------------------------------
-            for i, (r, g, b) in enumerate(contributions):
-                strip.setPixelColor(i, GRB(r, g, b))
+            writer.write(contributions.pack_grb(writer.buffer()))
+
+            governor.update(time.time() - now)    # compute only, not the wire
 
-            strip.show()
+            if audio:
+                audio.show(strip, features)
+            else:
+                strip.show()
+            heartbeat.frame()
             time.sleep(INTERVAL)
 
     except KeyboardInterrupt:
         print("\nStopping fireworks...")
         clear_strip()
+        if OUTPUT_FPS is not None:
+            strip.close()
+        if audio:
+            audio.stop()
 
 # ----------------------------------------------------
 # MAIN
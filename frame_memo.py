@@ -0,0 +1,114 @@
+# frame_memo.py — reuse frames of effects that repeat with a phase
+#
+# candy_cane.py's frame depends only on t * ROTATION_SPEED mod 2*pi and
+# light_beams.py's on the beam angle (plus color and beam count), so a
+# long run keeps recomputing the same frames.  A FrameMemo is declared
+# with the period of the animation's phase variable and a number of
+# quantization steps per period.  frame(phase, render) snaps the phase to
+# the nearest step and renders a miss at exactly that phase, so every
+# visit to a step shows the same frame.  It caches the packed uint32
+# frame in an LRU bounded by max_bytes.  A hit costs a dict lookup, and
+# the caller's write of the returned frame is the only copy.
+#
+# `variant` keys everything else the frame depends on (color, density
+# level, ...); old variants fall out of the LRU by themselves.
+#
+#     memo = FrameMemo(period=2 * math.pi / ROTATION_SPEED, steps=512)
+#     heartbeat.track(memo)                   # hit rate in the scheduler log
+#     writer.write(memo.frame(t, effect.render_packed))
+#
+# Run this file for hit rate / speed on candy_cane's parameters:
+#     python3 frame_memo.py
+
+import math
+import time
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_STEPS     = 512                 # quantization steps per period
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024     # cached frames, packed u32
+
+
+class FrameMemo:
+    def __init__(self, period, steps=DEFAULT_STEPS, max_bytes=DEFAULT_MAX_BYTES):
+        self.period = float(period)
+        self.steps = int(steps)
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.lookups = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def quantize(self, phase):
+        """(step index, phase snapped to that step) for any phase value."""
+        step = round(phase / self.period * self.steps) % self.steps
+        return step, step * self.period / self.steps
+
+    def frame(self, phase, render, variant=None, out=None):
+        """
+        Packed frame for `phase`: cached, or render(snapped phase) on a miss.
+        The returned array is shared and read-only; pass `out` for a copy.
+        """
+        step, snapped = self.quantize(phase)
+        key = (variant, step)
+        self.lookups += 1
+
+        cached = self._frames.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._frames.move_to_end(key)
+        else:
+            cached = np.array(render(snapped), dtype=np.uint32)
+            cached.setflags(write=False)
+            self._frames[key] = cached
+            self._bytes += cached.nbytes
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                _, old = self._frames.popitem(last=False)
+                self._bytes -= old.nbytes
+
+        if out is None:
+            return cached
+        np.copyto(out, cached)
+        return out
+
+    def stats(self):
+        return (f"hit rate {self.hit_rate:.1%} over {self.lookups} frames, "
+                f"{len(self._frames)} frames cached ({self._bytes / 1024:.0f} KB)")
+
+
+# ----------------------------------------------------
+# Benchmark
+# ----------------------------------------------------
+def benchmark(frames=3000, steps=DEFAULT_STEPS):
+    from procedural import CandyCane
+
+    rotation_speed, time_step = 4, 0.02    # candy_cane.py
+    effect = CandyCane(rotation_speed=rotation_speed)
+    memo = FrameMemo(2 * math.pi / rotation_speed, steps)
+    ts = np.arange(1, frames + 1) * time_step
+
+    t0 = time.perf_counter()
+    for t in ts:
+        effect.render_packed(t)
+    direct = (time.perf_counter() - t0) / frames * 1000
+
+    t0 = time.perf_counter()
+    for t in ts:
+        memo.frame(t, effect.render_packed)
+    memoized = (time.perf_counter() - t0) / frames * 1000
+
+    worst = max(np.abs(effect.render(t).astype(int) - effect.render(memo.quantize(t)[1])).max()
+                for t in ts[:200])
+    print(f"candy_cane, {frames} frames ({frames * time_step:.0f} s of animation), "
+          f"{steps} steps per period")
+    print(f"  direct   {direct:7.3f} ms/frame")
+    print(f"  memo     {memoized:7.3f} ms/frame   {memo.stats()}")
+    print(f"  worst channel error from phase snapping: {worst} of 255")
+
+
+if __name__ == "__main__":
+    benchmark()
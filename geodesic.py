@@ -0,0 +1,157 @@
+# geodesic.py — distances along the lights instead of through the tree
+#
+# Straight-line distance lets a spreading effect jump between branches
+# through the interior.  Here the LEDs form a sparse graph instead.  Each
+# LED links to its GRAPH_K nearest neighbours (snake_ring.knn_table) and
+# to its predecessor and successor on the string, so the graph is always
+# connected.  Edges are weighted by their length.  Shortest paths over
+# that graph follow the surface the lights actually trace.
+#
+# Distances come from a heap-based Dijkstra (several sources seed the
+# heap together).  One row is a few ms (500 LEDs: ~1 ms, 4000: ~6 ms on
+# x86), so rows are computed only when an origin is first asked for,
+# never all at startup.  For trees up to ALL_PAIRS_MAX LEDs each row is
+# written into a uint16 matrix in DIST_UNIT steps, memory-mapped in the
+# geometry_cache directory and kept across runs (500 LEDs -> 0.5 MB).  A
+# row counts as done once its own diagonal entry is 0; that entry is
+# written last, so an interrupted run never leaves a half row that passes
+# for done.  Larger trees keep the last SESSION_CACHE_ROWS in memory.
+#
+# The k-nearest-neighbour table behind the graph is the "knn"
+# geometry_cache artifact snake.py uses too.  On a cache miss for a big
+# tree it takes a while, so pass the animation's heartbeat and it is
+# beaten between blocks.
+#
+# Usage:
+#     field = GeodesicField(heartbeat=heartbeat)
+#     d = field.from_source(start_idx)         # (N,) float32, inches
+#     d = field.from_sources([a, b, c])        # nearest of several origins
+
+import os
+import heapq
+from collections import OrderedDict
+import numpy as np
+import geometry_cache
+from snake_ring import knn_table
+
+GRAPH_K            = 6
+DIST_UNIT          = 0.01     # inches per uint16 step (saturates at 655.35)
+ALL_PAIRS_MAX      = 4000     # LEDs kept on disk; 4000^2 * 2 bytes = 32 MB
+SESSION_CACHE_ROWS = 256
+NOT_DONE           = 65535    # diagonal of a row not computed yet
+
+
+# ----------------------------------------------------
+# Graph
+# ----------------------------------------------------
+def neighbor_graph(c, k=GRAPH_K, knn=None):
+    """CSR (indptr, indices, weights) of the symmetric kNN + string-order graph."""
+    c = np.asarray(c, dtype=np.float64)
+    n = len(c)
+    knn = np.asarray(knn_table(c, k) if knn is None else knn)
+    a = np.concatenate([np.repeat(np.arange(n), knn.shape[1]), np.arange(n - 1)])
+    b = np.concatenate([knn.ravel(), np.arange(1, n)])
+
+    # both directions, each edge once
+    pairs = np.unique(np.stack([np.concatenate([a, b]), np.concatenate([b, a])], axis=1), axis=0)
+    src, dst = pairs[:, 0], pairs[:, 1]
+    weights = np.linalg.norm(c[src] - c[dst], axis=1)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+    return indptr, dst, weights
+
+
+def dijkstra(graph, sources):
+    """(N,) float64 shortest-path distance from the nearest of `sources`."""
+    indptr, indices, weights = graph
+    indptr, indices, weights = indptr.tolist(), indices.tolist(), weights.tolist()
+    dist = [float("inf")] * (len(indptr) - 1)
+    heap = []
+    for s in sources:
+        dist[s] = 0.0
+        heap.append((0.0, s))
+    heapq.heapify(heap)
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return np.array(dist)
+
+
+def to_u16(dist):
+    return np.minimum(np.rint(dist / DIST_UNIT), 65535).astype(np.uint16)
+
+
+def open_rows(path, n):
+    """(N, N) uint16 memmap of persisted rows, created with every row not done."""
+    if os.path.exists(path):
+        rows = np.lib.format.open_memmap(path, mode="r+")
+        if rows.shape == (n, n) and rows.dtype == np.uint16:
+            os.utime(path)    # recently used, for geometry_cache.evict()
+            return rows
+        del rows
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    rows = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint16, shape=(n, n))
+    rows[np.arange(n), np.arange(n)] = NOT_DONE
+    rows.flush()
+    os.replace(tmp, path)
+    return rows
+
+
+# ----------------------------------------------------
+# Distance field
+# ----------------------------------------------------
+class GeodesicField:
+    def __init__(self, coords=None, k=GRAPH_K, heartbeat=None):
+        """coords=None uses tree_coords.json, with rows kept on disk as they are computed."""
+        beat = heartbeat.alive if heartbeat is not None else None
+        if coords is None:
+            c = np.asarray(geometry_cache.coords(), dtype=np.float64)
+            knn = geometry_cache.derived("knn", lambda pts, k: knn_table(pts, k, beat), k=k)
+        else:
+            c = np.asarray(coords, dtype=np.float64)
+            knn = knn_table(c, k, beat)
+        self.led_count = len(c)
+        self.graph = neighbor_graph(c, k, knn)
+        self.matrix = None
+        self._rows = OrderedDict()
+
+        if coords is None and self.led_count <= ALL_PAIRS_MAX:
+            path = geometry_cache.artifact_path("geodesic_rows", k=k)
+            self.matrix = open_rows(path, self.led_count)
+
+    def _row_u16(self, source):
+        row = self.matrix[source]
+        if row[source] != 0:
+            done = to_u16(dijkstra(self.graph, [source]))
+            done[source] = NOT_DONE
+            row[:] = done
+            row[source] = 0    # last: marks the row complete
+        return row
+
+    def from_source(self, source):
+        """(N,) float32 distance in inches from one LED."""
+        if self.matrix is not None:
+            return self._row_u16(source).astype(np.float32) * np.float32(DIST_UNIT)
+
+        row = self._rows.pop(source, None)
+        if row is None:
+            row = dijkstra(self.graph, [source]).astype(np.float32)
+        self._rows[source] = row
+        if len(self._rows) > SESSION_CACHE_ROWS:
+            self._rows.popitem(last=False)
+        return row
+
+    def from_sources(self, sources):
+        """(N,) float32 distance in inches from the nearest of several LEDs."""
+        sources = list(sources)
+        if self.matrix is not None and all(self.matrix[s, s] == 0 for s in sources):
+            return self.matrix[sources].min(axis=0).astype(np.float32) * np.float32(DIST_UNIT)
+        return dijkstra(self.graph, sources).astype(np.float32)
@@ -0,0 +1,163 @@
+# geometry_cache.py — on-disk cache for arrays derived from tree_coords.json
+#
+# Artifacts are keyed by the SHA-256 of the coordinates file plus the
+# derivation name and its parameters, so editing tree_coords.json
+# invalidates everything automatically.  They are stored as .npy files
+# and loaded with np.load(mmap_mode="r"): only the pages actually read
+# are touched.  Every hit refreshes the file's mtime, and when the cache
+# grows past MAX_CACHE_BYTES the least recently used files are removed.
+#
+# When tree_geometry.json declares the tree as a helix (helix_geometry.py)
+# and tree_coords.json still matches the hash recorded there, coords,
+# polar_height and z_descending are computed from the parameters on
+# demand instead of being read from disk.  Artifacts without a closed
+# form are then keyed by the declaration.
+#
+# Usage:
+#     import geometry_cache
+#     coords = geometry_cache.coords()                     # (N, 3)
+#     knn = geometry_cache.derived("knn", knn_table, k=6)  # knn_table(coords, k=6)
+
+import os
+import json
+import hashlib
+import numpy as np
+
+BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
+COORDS_JSON     = os.path.join(BASE_DIR, "tree_coords.json")
+GEOMETRY_JSON   = os.path.join(BASE_DIR, "tree_geometry.json")
+CACHE_DIR       = os.path.join(BASE_DIR, ".geometry_cache")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_hashes = {}    # path -> (mtime_ns, size, digest), so each file is hashed once
+_backends = {}  # coords path -> (HelixGeometry or None, declaration stat)
+
+
+def geometry_hash(path=COORDS_JSON):
+    st = os.stat(path)
+    known = _hashes.get(path)
+    if known and known[:2] == (st.st_mtime_ns, st.st_size):
+        return known[2]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    _hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def backend(path=COORDS_JSON):
+    """The HelixGeometry declared for `path`, or None if the file itself is the geometry."""
+    try:
+        st = os.stat(GEOMETRY_JSON)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+    known = _backends.get(path)
+    if known and known[1] == stamp:
+        return known[0]
+
+    from helix_geometry import load, file_sha256
+    geo = None
+    declared = load(GEOMETRY_JSON)
+    if declared is not None:
+        helix, measured_path, sha = declared
+        if measured_path is None:
+            geo = helix if os.path.abspath(path) == COORDS_JSON else None
+        elif os.path.abspath(path) == os.path.abspath(measured_path):
+            # a re-measured or edited file wins over a stale declaration
+            if not os.path.exists(path) or file_sha256(path) == sha:
+                geo = helix
+    _backends[path] = (geo, stamp)
+    return geo
+
+
+def _artifact_path(path, name, params):
+    key = repr(sorted(params.items())).encode()
+    param_hash = hashlib.sha256(key).hexdigest()[:12]
+    source = GEOMETRY_JSON if backend(path) is not None else path
+    return os.path.join(CACHE_DIR, geometry_hash(source), f"{name}-{param_hash}.npy")
+
+
+def artifact_path(name, path=COORDS_JSON, **params):
+    """Where derived(name, ..., **params) keeps its file, for artifacts filled in place."""
+    return _artifact_path(path, name, params)
+
+
+def _load_json_coords(path):
+    with open(path) as f:
+        return np.asarray(json.load(f), dtype=np.float64)
+
+
+def _load_or_store(artifact, make):
+    if os.path.exists(artifact):
+        os.utime(artifact)
+        return np.load(artifact, mmap_mode="r")
+    _store(artifact, np.ascontiguousarray(make()))
+    return np.load(artifact, mmap_mode="r")
+
+
+def derived(name, compute, path=COORDS_JSON, **params):
+    """
+    Cached result of compute(coords, **params) as a read-only memmap.
+    `name` must change whenever `compute` changes meaning.
+    Fields the declared helix has a closed form for are computed instead.
+    """
+    geo = backend(path)
+    if geo is not None and name in geo.ANALYTIC and not params:
+        return geo.field(name)
+    return _load_or_store(_artifact_path(path, name, params),
+                          lambda: compute(coords(path), **params))
+
+
+def coords(path=COORDS_JSON):
+    """(N, 3) float64 LED coordinates: computed from tree_geometry.json, or parsed
+    from JSON only on a cache miss."""
+    geo = backend(path)
+    if geo is not None:
+        return geo.field("coords")
+    return _load_or_store(_artifact_path(path, "coords", {}),
+                          lambda: _load_json_coords(path))
+
+
+def _store(artifact, array):
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+    tmp = f"{artifact}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, artifact)    # atomic: concurrent readers never see half a file
+    evict()
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Remove least recently used artifacts until the cache fits in max_bytes."""
+    files = []
+    for root, _, names in os.walk(CACHE_DIR):
+        for fname in names:
+            if fname.endswith(".npy"):
+                full = os.path.join(root, fname)
+                st = os.stat(full)
+                files.append((st.st_mtime, st.st_size, full))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, full in sorted(files):
+        if total <= max_bytes:
+            break
+        os.remove(full)
+        total -= size
+        try:
+            os.rmdir(os.path.dirname(full))    # drop emptied geometry dirs
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------
+# Shared derivations (one name per meaning)
+# ----------------------------------------------------
+def polar_height(c):
+    """(2, N): polar angle and height normalized to 0..1."""
+    z = c[:, 2]
+    return np.stack([np.arctan2(c[:, 1], c[:, 0]), (z - z.min()) / (z.max() - z.min())])
+
+
+def z_descending(c):
+    """LED indices sorted top to bottom."""
+    return np.argsort(-c[:, 2], kind="stable")
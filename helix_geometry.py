@@ -0,0 +1,211 @@
+# helix_geometry.py — the tree as five numbers instead of a coordinate file
+#
+# tree_coords.json is compute_coords.py's helix written out LED by LED.
+# A HelixGeometry keeps only the parameters (height, bottom/top radius,
+# turns, start angle) plus the LED count.  It computes positions and the
+# shared derived fields vectorized, when asked, for any LED count.  Only
+# LEDs that really sit off the ideal helix (after calibrate.py) are stored,
+# as per-LED offsets.
+#
+# The declaration lives in tree_geometry.json:
+#     {"helix": {"leds": 500, "height": 84, ...},
+#      "offsets": {"17": [dx, dy, dz], ...},
+#      "measured": {"path": "tree_coords.json", "sha256": "..."}}
+# geometry_cache uses it in place of the measured file while that file
+# still hashes to the recorded sha256.  Once the file is re-measured or
+# edited, geometry_cache goes back to reading it until the declaration
+# is fitted again:
+#     python3 helix_geometry.py --fit tree_coords.json    # write / refresh
+#     python3 helix_geometry.py --leds 50000              # startup / memory report
+
+import os
+import json
+import hashlib
+import numpy as np
+
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+GEOMETRY_JSON = os.path.join(BASE_DIR, "tree_geometry.json")
+
+# compute_coords.py
+HEIGHT   = 7 * 12
+R_BOTTOM = 18.5
+R_TOP    = 1.5
+N_TURNS  = 27
+THETA0   = 0.0
+
+OFFSET_TOLERANCE = 1e-6    # inches; smaller deviations are not stored
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class HelixGeometry:
+    def __init__(self, leds, height=HEIGHT, r_bottom=R_BOTTOM, r_top=R_TOP,
+                 turns=N_TURNS, theta0=THETA0, offsets=None):
+        """offsets: {led index: (dx, dy, dz)} for LEDs off the ideal helix."""
+        self.leds = int(leds)
+        self.height = float(height)
+        self.r_bottom = float(r_bottom)
+        self.r_top = float(r_top)
+        self.turns = float(turns)
+        self.theta0 = float(theta0)
+
+        offsets = offsets or {}
+        order = sorted(int(i) for i in offsets)
+        self._offset_idx = np.array(order, dtype=np.intp)
+        self._offset_delta = np.array([offsets[i] if i in offsets else offsets[str(i)]
+                                       for i in order], dtype=np.float64).reshape(-1, 3)
+        self._fields = {}
+
+    def __len__(self):
+        return self.leds
+
+    @property
+    def params(self):
+        return {"leds": self.leds, "height": self.height, "r_bottom": self.r_bottom,
+                "r_top": self.r_top, "turns": self.turns, "theta0": self.theta0}
+
+    @property
+    def offsets(self):
+        return {int(i): d.tolist() for i, d in zip(self._offset_idx, self._offset_delta)}
+
+    # ------------------------------------------------
+    # Positions and derived fields, all vectorized
+    # ------------------------------------------------
+    def _t(self, idx):
+        idx = np.arange(self.leds) if idx is None else np.asarray(idx, dtype=np.intp)
+        return idx, idx / max(1, self.leds - 1)
+
+    def positions(self, idx=None):
+        """(len(idx), 3) float64 positions; idx=None for every LED."""
+        idx, t = self._t(idx)
+        r = self.r_bottom + (self.r_top - self.r_bottom) * t
+        theta = 2 * np.pi * self.turns * t + self.theta0
+        out = np.stack([r * np.cos(theta), r * np.sin(theta), self.height * t], axis=-1)
+
+        if len(self._offset_idx):
+            slot = np.minimum(np.searchsorted(self._offset_idx, idx), len(self._offset_idx) - 1)
+            hit = self._offset_idx[slot] == idx
+            out[hit] += self._offset_delta[slot[hit]]
+        return out
+
+    def polar_height(self):
+        """Same as geometry_cache.polar_height(positions()), without the positions."""
+        if len(self._offset_idx):
+            from geometry_cache import polar_height
+            return polar_height(self.positions())
+        _, t = self._t(None)
+        theta = 2 * np.pi * self.turns * t + self.theta0
+        return np.stack([np.arctan2(np.sin(theta), np.cos(theta)), t])
+
+    def z_descending(self):
+        """Same as geometry_cache.z_descending(positions())."""
+        if len(self._offset_idx) or self.height <= 0:
+            from geometry_cache import z_descending
+            return z_descending(self.positions())
+        return np.arange(self.leds - 1, -1, -1)
+
+    # name -> method, for the geometry_cache derivations that have a closed form
+    ANALYTIC = {"coords": positions, "polar_height": polar_height, "z_descending": z_descending}
+
+    def field(self, name):
+        """A derived field, computed the first time it is asked for."""
+        if name not in self._fields:
+            value = self.ANALYTIC[name](self)
+            value.setflags(write=False)    # shared, like geometry_cache's memmaps
+            self._fields[name] = value
+        return self._fields[name]
+
+    # ------------------------------------------------
+    # Declaration file
+    # ------------------------------------------------
+    @classmethod
+    def fit(cls, measured, tolerance=OFFSET_TOLERANCE, **params):
+        """Helix with `params` plus offsets for the LEDs of `measured` off it by > tolerance."""
+        measured = np.asarray(measured, dtype=np.float64)
+        geo = cls(len(measured), **params)
+        delta = measured - geo.positions()
+        off = np.flatnonzero(np.abs(delta).max(axis=1) > tolerance)
+        return cls(len(measured), offsets={int(i): delta[i] for i in off}, **params)
+
+    def save(self, path=GEOMETRY_JSON, measured_path=None):
+        decl = {"helix": self.params,
+                "offsets": {str(i): d for i, d in self.offsets.items()}}
+        if measured_path is not None:
+            decl["measured"] = {"path": os.path.relpath(measured_path, os.path.dirname(path)),
+                                "sha256": file_sha256(measured_path)}
+        with open(path, "w") as f:
+            json.dump(decl, f, indent=2)
+            f.write("\n")
+
+
+def load(path=GEOMETRY_JSON):
+    """(HelixGeometry, measured path, measured sha256), or None without a declaration."""
+    try:
+        with open(path) as f:
+            decl = json.load(f)
+    except (OSError, ValueError):
+        return None
+    measured = decl.get("measured")
+    measured_path = None
+    if measured:
+        measured_path = os.path.join(os.path.dirname(os.path.abspath(path)), measured["path"])
+    sha = measured["sha256"] if measured else None
+    return HelixGeometry(offsets=decl.get("offsets"), **decl["helix"]), measured_path, sha
+
+
+# ----------------------------------------------------
+# Report: JSON file vs declaration
+# ----------------------------------------------------
+def report(led_count):
+    import time
+    import tempfile
+
+    geo = HelixGeometry(led_count)
+    with tempfile.TemporaryDirectory() as tmp:
+        coords_path = os.path.join(tmp, "coords.json")
+        with open(coords_path, "w") as f:
+            json.dump(geo.positions().tolist(), f, indent=2)
+
+        t0 = time.perf_counter()
+        with open(coords_path) as f:
+            from_file = np.asarray(json.load(f), dtype=np.float64)
+        file_ms = (time.perf_counter() - t0) * 1000
+        file_kb = os.path.getsize(coords_path) / 1024
+
+    t0 = time.perf_counter()
+    computed = HelixGeometry(led_count).positions()
+    helix_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{led_count} LEDs")
+    print(f"  JSON file    {file_kb:9.1f} KB on disk   load {file_ms:8.2f} ms")
+    print(f"  declaration  {len(json.dumps(geo.params)) / 1024:9.1f} KB on disk   "
+          f"compute {helix_ms:8.2f} ms   max diff {np.abs(computed - from_file).max():.1e} in")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parametric helix geometry")
+    parser.add_argument("--fit", metavar="COORDS_JSON",
+                        help="write tree_geometry.json for this measured file")
+    parser.add_argument("--tolerance", type=float, default=OFFSET_TOLERANCE)
+    parser.add_argument("--leds", type=int, nargs="+", default=[500, 5000, 50000],
+                        help="LED counts for the startup / size report")
+    args = parser.parse_args()
+
+    if args.fit:
+        with open(args.fit) as f:
+            geo = HelixGeometry.fit(json.load(f), args.tolerance)
+        geo.save(GEOMETRY_JSON, args.fit)
+        print(f"[Geometry] {GEOMETRY_JSON}: {len(geo)} LEDs, "
+              f"{len(geo.offsets)} stored offsets (tolerance {args.tolerance} in)")
+        return
+    for n in args.leds:
+        report(n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# kernel_pool.py — split per-LED array kernels across the Pi's cores
+#
+# Most per-LED work is already whole-array numpy (spiral intensities,
+# distance tests, fades, GRB packing), but one core still does all of it.
+# numpy drops the GIL inside ufunc loops.  So a KernelPool splits the LED
+# range into one contiguous slice per thread and runs the same kernel on
+# every slice at once.  Each call writes only into its own slice of a
+# shared output buffer, so no merging or locking is needed.
+#
+# The worker threads are started once and reused every frame.  The
+# calling thread runs the first slice itself.  Below MIN_CHUNK LEDs per
+# slice the split costs more than it saves, so small trees (the 500-LED
+# one included) run inline on one thread whatever the setting.
+#
+# Thread count: KernelPool(threads), else TREE_THREADS, else 1.
+#
+#     pool = KernelPool()
+#     pool.run(lambda sl: np.less_equal(dist[sl], radius, out=lit[sl]), len(dist))
+#
+# Run this file for a scaling benchmark on synthetic helix trees:
+#     python3 kernel_pool.py --leds 10000 50000 --threads 1 2 3 4
+# The defaults give every thread count its own slices (4 x MIN_CHUNK is
+# 8192 LEDs).  Each row ends with the TREE_THREADS to use for that
+# kernel, which is 1 unless threading beats a single thread by MIN_SPEEDUP.
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+THREADS_ENV_VAR = "TREE_THREADS"
+MIN_CHUNK       = 2048     # LEDs per slice below which splitting does not pay
+MIN_SPEEDUP     = 1.1      # benchmark advice: less than this is noise, keep 1 thread
+
+
+class KernelPool:
+    def __init__(self, threads=None, min_chunk=MIN_CHUNK):
+        if threads is None:
+            threads = int(os.environ.get(THREADS_ENV_VAR, 1))
+        self.threads = max(1, threads)
+        self.min_chunk = min_chunk
+        self._executor = None
+        if self.threads > 1:
+            self._executor = ThreadPoolExecutor(self.threads - 1, thread_name_prefix="kernel")
+
+    def chunks(self, n):
+        """Contiguous slices covering range(n), one per thread that has enough work."""
+        count = max(1, min(self.threads, n // self.min_chunk))
+        bounds = [n * i // count for i in range(count + 1)]
+        return [slice(bounds[i], bounds[i + 1]) for i in range(count)]
+
+    def run(self, kernel, n):
+        """Call kernel(slice) over range(n) in parallel; returns when every slice is done."""
+        slices = self.chunks(n)
+        if len(slices) == 1:
+            kernel(slices[0])
+            return
+        futures = [self._executor.submit(kernel, sl) for sl in slices[1:]]
+        kernel(slices[0])
+        for f in futures:
+            f.result()    # re-raises a worker's exception here
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# ----------------------------------------------------
+# Scaling benchmark
+# ----------------------------------------------------
+def _kernels(coords):
+    """(label, setup) pairs; setup(pool) returns a zero-argument frame function."""
+    from procedural import CandyCane, DoubleHelix
+    from trail_kernels import TrailBuffer
+
+    n = len(coords)
+    dist = np.linalg.norm(coords - coords[0], axis=1).astype(np.float32)
+    lit = np.full(n, 0xFF8040, dtype=np.uint32)
+    dark = np.zeros(n, dtype=np.uint32)
+    out = np.empty(n, dtype=np.uint32)
+
+    def effect(cls):
+        def setup(pool):
+            e = cls(coords)
+            return lambda: e.render_packed(1.7, out, pool)
+        return setup
+
+    def distance_test(pool):
+        radius = float(dist.max()) / 2
+        def kernel(sl):
+            np.copyto(out[sl], np.where(dist[sl] <= radius, lit[sl], dark[sl]))
+        return lambda: pool.run(kernel, n)
+
+    def fade(pool):
+        trail = TrailBuffer(n)
+        trail.value.fill(200)
+        return lambda: trail.decay(0.9, pool)
+
+    return [("candy cane + pack", effect(CandyCane)),
+            ("double helix + pack", effect(DoubleHelix)),
+            ("distance test", distance_test),
+            ("trail fade", fade)]
+
+
+def benchmark(led_counts=(10000, 50000), thread_counts=(1, 2, 3, 4), frames=50):
+    from tree_simulator import helix_coords
+
+    print(f"{os.cpu_count()} CPUs, {frames} frames per measurement "
+          f"(x = speedup over {thread_counts[0]} thread(s))")
+    for n in led_counts:
+        coords = helix_coords(n)
+        most = max(1, n // MIN_CHUNK)    # slices MIN_CHUNK allows
+        capped = [f"{t}t" for t in thread_counts if t > most]
+        print(f"{n} LEDs" + (f" ({', '.join(capped)} capped at {most} slice(s) "
+                             f"by MIN_CHUNK)" if capped else ""))
+        for label, setup in _kernels(coords):
+            base = None
+            cells = []
+            times = {}
+            for threads in thread_counts:
+                pool = KernelPool(threads)
+                frame = setup(pool)
+                frame()    # warm up the threads and caches
+                t0 = time.perf_counter()
+                for _ in range(frames):
+                    frame()
+                ms = (time.perf_counter() - t0) / frames * 1000
+                pool.close()
+                base = base or ms
+                times[threads] = ms
+                cells.append(f"{threads}t {ms:7.3f} ms x{base / ms:4.2f}")
+            best = min(times, key=times.get)
+            advice = (f"{THREADS_ENV_VAR}={best}" if times[best] * MIN_SPEEDUP < base
+                      else f"threading does not pay: keep {THREADS_ENV_VAR}=1")
+            print(f"  {label:20s} " + "   ".join(cells) + f"   -> {advice}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-LED kernel thread scaling")
+    parser.add_argument("--leds", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+    benchmark(args.leds, args.threads, args.frames)
+
+
+if __name__ == "__main__":
+    main()
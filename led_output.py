@@ -0,0 +1,373 @@
+# led_output.py — output stage shared by the animations
+
+import sys
+import time
+import ctypes
+import threading
+import numpy as np
+
+
+# ---------------------------------------------------
+# Bulk frame writes
+# ---------------------------------------------------
+# setPixelColor() is one SWIG call per LED.  FrameWriter(strip).write(colors)
+# puts a whole frame of packed colors (uint32 array, list, or any buffer
+# of native u32) into the strip in one operation, then the caller runs
+# strip.show() as usual:
+#
+#     wrapper    strips with a write_frame(colors) method (the wrappers
+#                below, tree_simulator.py's SimulatorStrip)
+#     bulk       rpi_ws281x.PixelStrip: one memmove into the channel's
+#                C LED buffer (ws2811_channel_t.leds)
+#     per-pixel  anything else, or if the buffer cannot be located
+#
+# The values are stored exactly as setPixelColor() stores them; gamma
+# and brightness are still applied by the driver in show().
+#
+# buffer() returns the array to render the next frame into.  For a
+# strip_daemon.DaemonStrip that is the shared-memory frame itself, and
+# write(buffer) then copies nothing.  Call it again after every show().
+
+class FrameWriter:
+    def __init__(self, strip, bulk=True):
+        self.strip = strip
+        self.count = strip.numPixels()
+        self._leds = None
+        self._shared = None
+        self._scratch = None
+        if bulk and hasattr(strip, "write_frame"):
+            self.mode = "wrapper"
+        elif bulk and self._find_led_buffer():
+            self.mode = "bulk"
+        else:
+            self.mode = "per-pixel"
+
+    def _find_led_buffer(self):
+        channel = getattr(self.strip, "_channel", None)
+        ws = getattr(sys.modules.get(type(self.strip).__module__), "ws", None)
+        if channel is None or ws is None:
+            return False
+        try:
+            address = int(ws.ws2811_channel_t_leds_get(channel))
+        except (AttributeError, TypeError):
+            return False
+        if not address:
+            return False    # begin() not called yet
+        self._leds = (ctypes.c_uint32 * self.count).from_address(address)
+        return True
+
+    def buffer(self):
+        """uint32 array for the next frame (zero-copy on shared-memory strips)."""
+        if hasattr(self.strip, "frame"):
+            self._shared = np.frombuffer(self.strip.frame(), dtype=np.uint32)
+            return self._shared
+        if self._scratch is None:
+            self._scratch = np.empty(self.count, dtype=np.uint32)
+        return self._scratch
+
+    def write(self, colors):
+        if colors is self._shared:
+            return    # rendered in place
+        if self.mode == "wrapper":
+            self.strip.write_frame(colors)
+            return
+        if self.mode == "bulk":
+            frame = np.ascontiguousarray(colors, dtype=np.uint32)
+            ctypes.memmove(self._leds, frame.ctypes.data, min(frame.nbytes, self.count * 4))
+            return
+        strip = self.strip
+        for i, color in enumerate(colors.tolist() if hasattr(colors, "tolist") else colors):
+            strip.setPixelColor(i, color)
+
+
+def benchmark(strip, frames=500):
+    """Per-frame write time of the per-pixel and bulk paths on a started strip."""
+    n = strip.numPixels()
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 1 << 24, size=(16, n), dtype=np.uint32)
+    print(f"{n} LEDs, {frames} frames (write only, no show)")
+    bulk = FrameWriter(strip)
+    if bulk.mode != "bulk":
+        print(f"  bulk       unavailable: {bulk.mode} mode "
+              f"(no ws2811_channel_t.leds buffer; begin() not called?)")
+    for writer in (FrameWriter(strip, bulk=False), bulk):
+        t0 = time.perf_counter()
+        for k in range(frames):
+            writer.write(data[k % 16])
+        ms = (time.perf_counter() - t0) / frames * 1000
+        print(f"  {writer.mode:10s} {ms:7.3f} ms/frame")
+
+
+def stand_in_strip(count):
+    """
+    A strip shaped like rpi_ws281x.PixelStrip whose LED buffer is a plain
+    ctypes array, for timing the bulk path without the hardware.  Its module
+    exposes `ws` the way rpi_ws281x does, so FrameWriter finds the buffer.
+    """
+    import types
+    leds = (ctypes.c_uint32 * count)()
+    module = types.ModuleType("_stand_in_ws281x")
+    module.ws = types.SimpleNamespace(
+        ws2811_channel_t_leds_get=lambda channel: ctypes.addressof(channel))
+
+    class StandInStrip:
+        def __init__(self):
+            self._channel = leds
+
+        def numPixels(self):
+            return count
+
+        def setPixelColor(self, n, color):
+            leds[n] = color
+
+    StandInStrip.__module__ = module.__name__
+    sys.modules[module.__name__] = module
+    return StandInStrip()
+
+
+# ---------------------------------------------------
+# Double-buffered strip
+# ---------------------------------------------------
+# Wraps a started PixelStrip.  The animation draws into the back buffer
+# with the usual setPixelColor()/show() calls; show() hands the finished
+# frame to a dedicated output thread, which copies it into the strip and
+# runs the real strip.show() while the animation already computes the
+# next frame.  Frame time becomes max(compute, wire) instead of the sum.
+#
+# Tearing: show() only swaps buffers once the output thread has finished
+# pushing the previous frame, so the thread never reads a buffer the
+# animation is writing.  After the swap the back buffer starts out as a
+# copy of the frame just submitted, so animations that only redraw
+# changed pixels keep working unchanged.
+#
+# The overlap depends on strip.show() releasing the GIL while it waits
+# for the DMA transfer; pure-Python compute still shares one core.
+#
+# show(on_pushed) calls on_pushed() from the output thread once that frame
+# is on the wire (audio_input.AudioInput.show uses it to time latency).
+
+class DoubleBufferedStrip:
+    ASYNC_SHOW = True    # show() returns before the frame reaches the strip
+
+    def __init__(self, strip):
+        self.strip = strip
+        n = strip.numPixels()
+
+        self._back = [0] * n
+        self._front = [0] * n
+        self._pending = False      # front holds a frame not pushed yet
+        self._on_pushed = None     # callback for the frame in front
+        self._running = True
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ---- PixelStrip-compatible drawing API ----
+    def numPixels(self):
+        return len(self._back)
+
+    def setPixelColor(self, n, color):
+        self._back[n] = color
+
+    def getPixelColor(self, n):
+        return self._back[n]
+
+    def write_frame(self, colors):
+        self._back[:] = colors.tolist() if hasattr(colors, "tolist") else colors
+
+    def show(self, on_pushed=None):
+        """Submit the back buffer; blocks only while the last frame is still on the wire."""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+            self._back, self._front = self._front, self._back
+            self._back[:] = self._front
+            self._on_pushed = on_pushed
+            self._pending = True
+            self._cond.notify_all()
+
+    def close(self):
+        """Wait for the last submitted frame to reach the strip, then stop the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+
+    # ---- output thread ----
+    def _run(self):
+        strip = self.strip
+        writer = FrameWriter(strip)
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                front, on_pushed = self._front, self._on_pushed
+
+            writer.write(front)
+            strip.show()
+            if on_pushed is not None:
+                on_pushed()
+
+            with self._cond:
+                self._pending = False
+                self._cond.notify_all()
+
+
+# ---------------------------------------------------
+# Keyframe interpolation
+# ---------------------------------------------------
+# Wraps a started PixelStrip for animations too expensive to render at
+# the wire rate.  Each show() submits a keyframe; an output thread pushes
+# frames to the strip at `output_fps` (default: as fast as the wire
+# allows), blending from the frame on screen when the keyframe arrived to
+# the new keyframe over one keyframe interval (smoothed).  The blend is
+# linear in linear light: every color byte is decoded with GAMMA, mixed,
+# and re-encoded, all vectorized over the strip.
+#
+# Motion trails the animation by about one keyframe.  A keyframe that
+# arrives early or late never makes the output jump: the next blend
+# starts from whatever is currently shown.  show(on_pushed) calls
+# on_pushed() once the first output frame blending toward that keyframe
+# is on the wire.
+
+GAMMA             = 2.2
+INTERVAL_SMOOTHING = 0.2
+MAX_OUTPUT_FPS    = 120
+
+_TO_LINEAR = ((np.arange(256) / 255.0) ** GAMMA).astype(np.float32)
+
+
+def wire_fps(led_count, freq_hz=800000, reset_us=280):
+    """Highest frame rate a WS281x chain of led_count pixels can take."""
+    return 1.0 / (led_count * 24 / freq_hz + reset_us * 1e-6)
+
+
+def _to_linear(packed):
+    """(N,) packed u32 -> (N, 3) linear light, one column per color byte."""
+    b = packed.astype("<u4", copy=False).view(np.uint8).reshape(-1, 4)[:, :3]    # lo, mid, hi
+    return _TO_LINEAR[b]
+
+
+def _from_linear(lin):
+    b = (np.power(lin, 1.0 / GAMMA) * 255 + 0.5).astype(np.uint32)
+    return b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+
+
+class InterpolatingStrip:
+    ASYNC_SHOW = True
+
+    def __init__(self, strip, output_fps=None):
+        self.strip = strip
+        n = strip.numPixels()
+        self.output_fps = min(output_fps or MAX_OUTPUT_FPS, wire_fps(n))
+
+        self._draw = np.zeros(n, dtype=np.uint32)    # animation draws here
+        self._prev = np.zeros((n, 3), dtype=np.float32)
+        self._next = np.zeros((n, 3), dtype=np.float32)
+        self._key_time = None
+        self._interval = None      # smoothed seconds between keyframes
+        self._settled = True       # output already shows _next exactly
+        self._on_pushed = None
+        self._running = True
+        self._cond = threading.Condition()
+
+        self._writer = FrameWriter(strip)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ---- PixelStrip-compatible drawing API ----
+    def numPixels(self):
+        return len(self._draw)
+
+    def setPixelColor(self, n, color):
+        self._draw[n] = color
+
+    def getPixelColor(self, n):
+        return int(self._draw[n])
+
+    def write_frame(self, colors):
+        self._draw[:] = colors
+
+    def show(self, on_pushed=None):
+        """Submit the drawn frame as the next keyframe (never blocks on the wire)."""
+        key = _to_linear(self._draw)
+        with self._cond:
+            now = time.perf_counter()
+            if self._key_time is None:
+                self._prev = key
+            else:
+                dt = now - self._key_time
+                self._interval = dt if self._interval is None else \
+                    self._interval + INTERVAL_SMOOTHING * (dt - self._interval)
+                self._prev = self._blend(now)
+            self._next = key
+            self._key_time = now
+            self._settled = False
+            self._on_pushed = on_pushed
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop the output thread and put the last keyframe on the strip as is."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+        self._push(self._draw)
+
+    # ---- output thread ----
+    def _alpha(self, now):
+        if self._interval is None:
+            return 1.0
+        return min(1.0, (now - self._key_time) / self._interval)
+
+    def _blend(self, now):
+        alpha = self._alpha(now)
+        if alpha >= 1.0:
+            return self._next
+        return self._prev + (self._next - self._prev) * np.float32(alpha)
+
+    def _push(self, colors):
+        self._writer.write(colors)
+        self.strip.show()
+
+    def _run(self):
+        period = 1.0 / self.output_fps
+        next_tick = time.perf_counter()
+        while True:
+            with self._cond:
+                while self._running and self._settled:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                now = time.perf_counter()
+                frame = self._blend(now)
+                self._settled = self._alpha(now) >= 1.0
+                on_pushed, self._on_pushed = self._on_pushed, None
+
+            self._push(_from_linear(frame))
+            if on_pushed is not None:
+                on_pushed()
+
+            next_tick = max(next_tick + period, time.perf_counter())
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+
+# ---------------------------------------------------
+# Microbenchmark: per-pixel vs bulk frame writes
+# ---------------------------------------------------
+#     sudo python3 led_output.py [LED_COUNT]          # real strip on GPIO 18
+#     python3 tree_simulator.py led_output.py         # simulated strip
+if __name__ == "__main__":
+    # python3 led_output.py [COUNT] [--stand-in]   (--stand-in: no hardware)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    count = int(args[0]) if args else 500
+    if "--stand-in" in sys.argv:
+        bench_strip = stand_in_strip(count)
+    else:
+        from rpi_ws281x import PixelStrip
+        bench_strip = PixelStrip(count, 18, 800000, 10, False, 255, 0)
+        bench_strip.begin()
+    benchmark(bench_strip)
@@ -1,7 +1,8 @@
 # leds_off.py
 import json
 import os
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import Color
+import fast_start
 
 # -----------------------------
 # Load coordinates to determine LED_COUNT
@@ -28,7 +29,8 @@ def GRB(r, g, b):
     return Color(g, r, b)
 
 def main():
-    strip = PixelStrip(
+    # goes through strip_daemon.py when it owns the strip
+    strip = fast_start.strip(
         LED_COUNT,
         LED_PIN,
         LED_FREQ_HZ,
@@ -37,7 +39,6 @@ def main():
         LED_BRIGHTNESS,
         LED_CHANNEL
     )
-    strip.begin()
 
     # Turn all LEDs off
     for i in range(LED_COUNT):
@@ -1,12 +1,23 @@
 # light_beams.py — sweeping 3D vertical light beams for 500-LED mapped Christmas tree
 
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import json
 import os
 import math
 import signal
 import random
-from rpi_ws281x import PixelStrip, Color
+from bisect import bisect_left, bisect_right
+import numpy as np
+from rpi_ws281x import Color
+from led_output import DoubleBufferedStrip, FrameWriter
+from frame_memo import FrameMemo
+from audio_input import AudioInput, open_source
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 
 # ------------------------------
@@ -39,6 +50,11 @@ LED_COUNT = len(coords)
 # Precompute polar angles for each LED
 thetas = [math.atan2(y, x) for x, y, z in coords]
 
+# Theta-sorted index: lets each beam visit only the LEDs inside its
+# angular window instead of evaluating sin() for every LED
+theta_order   = sorted(range(LED_COUNT), key=lambda i: thetas[i])
+sorted_thetas = [thetas[i] for i in theta_order]
+
 
 # ------------------------------
 #  LED Driver Settings
@@ -58,10 +74,18 @@ BEAM_COUNT        = 1        # how many beams sweep around
 BEAM_WIDTH        = 0.45     # larger = thicker beams
 ROTATION_SPEED    = 0.2     # smaller = slower sweep
 SOFTNESS          = 5        # higher = smoother edges
+BEAM_CUTOFF       = 0.3      # per-beam values below this are treated as 0 (0.3**5 * 255 < 1)
 COLOR_MODE        = "random_cycle"  # "white", "red", "green", "blue", "rainbow", "random_cycle"
 
 FRAME_TIME        = 0.02     # delay per frame (smoothness)
 
+AUDIO_SOURCE      = None     # 'alsa', 'alsa:<device>' or a .wav path; None = fixed speed
+AUDIO_SPEED_BOOST = 4.0      # extra rotation speed (x ROTATION_SPEED) at full bass
+
+# a frame depends only on beam angle, color and beam count: reuse them
+MEMO_STEPS        = 720              # beam angle quantization (0.5 degree)
+MEMO_MAX_BYTES    = 4 * 1024 * 1024  # cached frames (LED_COUNT * 4 bytes each)
+
 
 # Optional color presets
 COLOR_PRESETS = {
@@ -95,6 +119,59 @@ def get_beam_color(t):
 get_beam_color.last_color = (255, 255, 255)
 
 
+# ------------------------------
+#  Angular Window Lookup
+# ------------------------------
+def beam_values(beam_angle, beam_count):
+    """
+    Summed beam value for every LED inside some beam's angular window.
+
+    A beam's value 1 - |sin((theta - angle) / BEAM_WIDTH)| peaks every
+    pi * BEAM_WIDTH radians.  Each peak (lobe) is a window of theta where
+    the value is >= BEAM_CUTOFF; LEDs outside every window are left out
+    of the returned dict and count as 0.  Lobes are enumerated over the
+    full (-pi, pi] range, so windows crossing the +/-pi seam are split
+    across both ends of the sorted index.
+    """
+    values = {}
+    lobe_spacing = math.pi * BEAM_WIDTH
+    half_width = math.asin(1 - BEAM_CUTOFF) * BEAM_WIDTH
+
+    for b in range(beam_count):
+        phi = beam_angle + 2 * math.pi * (b / beam_count)
+
+        k_first = math.ceil((-math.pi - phi - half_width) / lobe_spacing)
+        k_last  = math.floor((math.pi - phi + half_width) / lobe_spacing)
+
+        for k in range(k_first, k_last + 1):
+            center = phi + k * lobe_spacing
+            lo = bisect_left(sorted_thetas, center - half_width)
+            hi = bisect_right(sorted_thetas, center + half_width)
+
+            for j in range(lo, hi):
+                i = theta_order[j]
+                diff = abs(math.sin((sorted_thetas[j] - phi) / BEAM_WIDTH))
+                values[i] = values.get(i, 0) + 1 - diff
+
+    return values
+
+
+def render_frame(beam_angle, beam_count, color):
+    """Packed GRB frame with the beams at beam_angle."""
+    frame = np.zeros(LED_COUNT, dtype=np.uint32)
+    for i, beam_value in beam_values(beam_angle, beam_count).items():
+
+        # soften edges
+        beam_value = max(0, min(1, beam_value ** SOFTNESS))
+
+        r = int(color[0] * beam_value)
+        g = int(color[1] * beam_value)
+        b = int(color[2] * beam_value)
+
+        frame[i] = GRB(r, g, b)
+    return frame
+
+
 # ------------------------------
 #  Animation Loop
 # ------------------------------
@@ -104,20 +181,24 @@ def main():
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
 
-    strip = PixelStrip(
+    strip = fast_start.strip(
         LED_COUNT, LED_PIN, LED_FREQ_HZ,
         LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
     )
-    strip.begin()
 
-    # Clear startup garbage
-    for _ in range(3):
-        for i in range(LED_COUNT):
-            strip.setPixelColor(i, GRB(0,0,0))
-        strip.show()
-        time.sleep(0.05)
+    # compute the next frame while the output thread pushes this one
+    strip = DoubleBufferedStrip(strip)
 
     t = 0
+    beam_angle = 0.0
+    writer = FrameWriter(strip)
+    memo = FrameMemo(2 * math.pi, MEMO_STEPS, MEMO_MAX_BYTES)
+    heartbeat.track(memo)
+
+    # with audio the sweep speeds up with the bass band
+    audio = None
+    if AUDIO_SOURCE:
+        audio = AudioInput(open_source(AUDIO_SOURCE)).start()
 
     while running:
         t += FRAME_TIME
@@ -126,34 +207,34 @@ def main():
         color = get_beam_color(t)
         get_beam_color.last_color = color
 
-        for i in range(LED_COUNT):
-
-            # rotating beam angular position
-            beam_angle = (t * ROTATION_SPEED) % (2 * math.pi)
-
-            # support multiple beams evenly spaced
-            beam_value = 0
-            for b in range(BEAM_COUNT):
-                offset = 2 * math.pi * (b / BEAM_COUNT)
-                diff = abs(math.sin((thetas[i] - beam_angle - offset) / BEAM_WIDTH))
-                beam_value += 1 - diff
-
-            # soften edges
-            beam_value = max(0, min(1, beam_value ** SOFTNESS))
-
-            r = int(color[0] * beam_value)
-            g = int(color[1] * beam_value)
-            b = int(color[2] * beam_value)
-
-            strip.setPixelColor(i, GRB(r, g, b))
-
-        strip.show()
+        # rotating beam angular position
+        speed = ROTATION_SPEED
+        if audio:
+            features = audio.features    # one snapshot per frame
+            speed *= 1 + AUDIO_SPEED_BOOST * features.bands[0]
+        beam_angle = (beam_angle + FRAME_TIME * speed) % (2 * math.pi)
+
+        # support multiple beams evenly spaced; seen angles come from the memo
+        writer.write(memo.frame(beam_angle,
+                                lambda angle: render_frame(angle, BEAM_COUNT, color),
+                                variant=color))
+
+        if audio:
+            audio.show(strip, features)    # latency timed once the frame is on the wire
+        else:
+            strip.show()
+        heartbeat.frame()
         time.sleep(FRAME_TIME)
 
+    if audio:
+        audio.stop()
+
     # turn off on exit
     for i in range(LED_COUNT):
         strip.setPixelColor(i, GRB(0,0,0))
     strip.show()
+    strip.close()
+    print(f"[FrameMemo] {memo.stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+# lod.py — level-of-detail rendering for very large LED counts
+#
+# Neighbouring LEDs get nearly the same value from a smooth effect, so on
+# big trees the effect only needs evaluating once per small region.  A
+# LevelOfDetail groups the LEDs into voxel clusters.  At level L the
+# voxel edge is 2**L times the typical LED spacing, so each level cuts the
+# representative count by roughly 2x (LEDs on a string) to 8x (a dense
+# volume).  The effect is evaluated at each cluster's representative
+# point, and a precomputed gather copies the results back to every LED:
+#
+#     nearest   each LED takes its own cluster's value
+#     blend     inverse-distance mix of the BLEND_K nearest representatives
+#               (hides the voxel edges, costs BLEND_K gathers)
+#
+# Cluster membership and blend tables are geometry_cache artifacts, so
+# they are computed once per coordinates file and level.  The LED spacing
+# they both scale by is computed once and handed to both.  The neighbour
+# searches go in row blocks of at most BLOCK_BYTES of distances, so
+# building them for tens of thousands of LEDs stays within a few MB on
+# top of the result.
+#
+# procedural.py effects take lod=<level> (and blend=True); run this file
+# for an error / speedup report against full resolution:
+#     python3 lod.py --leds 50000
+
+import time
+import argparse
+import numpy as np
+import geometry_cache
+
+BLEND_K       = 4
+SPACING_PROBE = 512     # LEDs sampled to estimate the typical spacing
+BLOCK_BYTES   = 4 * 1024 * 1024    # float64 squared distances per search block
+
+
+# ----------------------------------------------------
+# Geometry derivations (cacheable: f(coords, **params))
+# ----------------------------------------------------
+def _sq_dist_blocks(a, b):
+    """(start, d2) row blocks of the squared distances from a to b, BLOCK_BYTES each at most."""
+    b_sq = (b * b).sum(axis=1)
+    rows = max(1, BLOCK_BYTES // (8 * len(b)))
+    for start in range(0, len(a), rows):
+        block = a[start:start + rows]
+        d2 = block @ b.T
+        d2 *= -2
+        d2 += b_sq
+        d2 += (block * block).sum(axis=1)[:, None]
+        np.maximum(d2, 0, out=d2)    # rounding can dip just below zero
+        yield start, d2
+
+
+def led_spacing(c):
+    """Median nearest-neighbour distance, estimated from a fixed sample."""
+    c = np.asarray(c, dtype=np.float64)
+    rng = np.random.default_rng(0)
+    probe = rng.choice(len(c), size=min(SPACING_PROBE, len(c)), replace=False)
+    nearest = np.empty(len(probe))
+    for start, d2 in _sq_dist_blocks(c[probe], c):
+        rows = np.arange(len(d2))
+        d2[rows, probe[start:start + len(d2)]] = np.inf
+        nearest[start:start + len(d2)] = d2.min(axis=1)
+    return float(np.sqrt(np.median(nearest)))
+
+
+def voxel_members(c, level, spacing=None):
+    """(N,) int32 cluster id of every LED at this level."""
+    c = np.asarray(c, dtype=np.float64)
+    edge = (led_spacing(c) if spacing is None else spacing) * 2 ** level
+    keys = np.floor((c - c.min(axis=0)) / edge).astype(np.int64)
+    _, members = np.unique(keys, axis=0, return_inverse=True)
+    return members.reshape(-1).astype(np.int32)
+
+
+def _centroids(c, members):
+    counts = np.bincount(members)
+    return np.stack([np.bincount(members, weights=c[:, d]) / counts for d in range(3)], axis=1)
+
+
+def blend_table(c, level, k=BLEND_K, spacing=None):
+    """(N, 2k): k nearest representatives per LED, then their weights (float64)."""
+    c = np.asarray(c, dtype=np.float64)
+    spacing = led_spacing(c) if spacing is None else spacing
+    reps = _centroids(c, voxel_members(c, level, spacing))
+    k = min(k, len(reps))
+    eps = spacing * 1e-3
+
+    table = np.empty((len(c), 2 * k))
+    for start, d2 in _sq_dist_blocks(c, reps):
+        near = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        w = 1.0 / (np.sqrt(np.take_along_axis(d2, near, axis=1)) + eps)
+        table[start:start + len(d2), :k] = near
+        table[start:start + len(d2), k:] = w / w.sum(axis=1, keepdims=True)
+    return table
+
+
+# ----------------------------------------------------
+# Level of detail
+# ----------------------------------------------------
+class LevelOfDetail:
+    def __init__(self, coords=None, level=1, blend=False):
+        """coords=None uses tree_coords.json with cached cluster tables."""
+        if coords is None:
+            full = np.asarray(geometry_cache.coords())
+            spacing = float(geometry_cache.derived("lod_spacing", lambda c: [led_spacing(c)])[0])
+            members = geometry_cache.derived("lod_members", voxel_members,
+                                             level=level, spacing=spacing)
+            table = (geometry_cache.derived("lod_blend", blend_table, level=level, k=BLEND_K,
+                                            spacing=spacing)
+                     if blend else None)
+        else:
+            full = np.asarray(coords, dtype=np.float64)
+            spacing = led_spacing(full)
+            members = voxel_members(full, level, spacing)
+            table = blend_table(full, level, spacing=spacing) if blend else None
+
+        self.level = level
+        self.led_count = len(full)
+        self.members = np.asarray(members, dtype=np.intp)
+        self.counts = np.bincount(self.members)
+        self.coords = _centroids(full, self.members)
+        if table is not None:
+            k = table.shape[1] // 2
+            self.gather = np.asarray(table[:, :k], dtype=np.intp)
+            self.weights = np.asarray(table[:, k:], dtype=np.float32)
+        else:
+            self.gather = self.weights = None
+
+    def __len__(self):
+        return len(self.coords)
+
+    # ---- per-LED inputs -> per-representative ----
+    def reduce(self, values):
+        """Cluster mean of an (N,) per-LED quantity."""
+        return np.bincount(self.members, weights=values) / self.counts
+
+    def reduce_angle(self, theta):
+        """Circular cluster mean of an (N,) angle in radians."""
+        return np.arctan2(self.reduce(np.sin(theta)), self.reduce(np.cos(theta)))
+
+    # ---- per-representative results -> per-LED ----
+    def expand(self, frames):
+        """(T, M, 3) uint8 representative colors -> (T, N, 3) uint8 LED colors."""
+        if self.gather is None:
+            return frames[:, self.members]
+        acc = frames[:, self.gather[:, 0]] * self.weights[None, :, 0, None]
+        for j in range(1, self.gather.shape[1]):
+            acc += frames[:, self.gather[:, j]] * self.weights[None, :, j, None]
+        return (acc + 0.5).astype(np.uint8)
+
+
+# ----------------------------------------------------
+# Error / speedup report
+# ----------------------------------------------------
+def report(coords, levels=(1, 2, 3), frames=20, blend=False):
+    from procedural import EFFECTS
+
+    ts = np.arange(frames) * 0.37
+    print(f"{len(coords)} LEDs, {frames} frames per batch"
+          f"{', blended gather' if blend else ''}")
+    for cls in EFFECTS:
+        full = cls(coords)
+        t0 = time.perf_counter()
+        reference = full.render_batch(ts).astype(np.int16)
+        full_time = time.perf_counter() - t0
+        print(f"  {cls.name:14s} full   {full_time * 1000 / frames:8.2f} ms/frame")
+
+        for level in levels:
+            effect = cls(coords, lod=level, blend=blend)
+            t0 = time.perf_counter()
+            out = effect.render_batch(ts).astype(np.int16)
+            lod_time = time.perf_counter() - t0
+            err = np.abs(out - reference)
+            print(f"  {'':14s} L{level} {len(effect.lod):7d} reps {lod_time * 1000 / frames:8.2f} ms/frame"
+                  f"  x{full_time / lod_time:5.1f}   err mean {err.mean():5.2f}"
+                  f"  p99 {np.percentile(err, 99):5.0f}  (of 255)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Level-of-detail error / speedup report")
+    parser.add_argument("--leds", type=int, default=None,
+                        help="synthetic helix of this many LEDs (default: tree_coords.json)")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--blend", action="store_true", help="use the blended gather")
+    args = parser.parse_args()
+
+    if args.leds:
+        from tree_simulator import helix_coords
+        coords = helix_coords(args.leds)
+    else:
+        coords = np.asarray(geometry_cache.coords())
+    report(coords, args.levels, args.frames, args.blend)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 # matrix_rain.py — 3D Matrix Code Rain for 500-LED Tree (WS2811 GRB)
 
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
-import json
-import os
-import math
 import random
 import signal
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from rpi_ws281x import Color
+from quality_governor import QualityGovernor
+from trail_kernels import TrailBuffer
+from led_output import FrameWriter
+import geometry_cache
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 running = True
 strip = None
@@ -21,19 +29,20 @@ def handle_exit(signum, frame):
 # ----------------------------------------------------
 # Load LED coordinates
 # ----------------------------------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(BASE_DIR, "tree_coords.json")) as f:
-    coords = json.load(f)   # list of [x, y, z]
+coords = geometry_cache.coords()   # (N, 3) array of [x, y, z]
 
 LED_COUNT = len(coords)
 
 # Extract Z (used for falling rain)
-zs = [p[2] for p in coords]
+zs = coords[:, 2].tolist()
 z_min, z_max = min(zs), max(zs)
 height = z_max - z_min
 
-# Get LED index sorted by descending Z (top to bottom)
-sorted_by_z = sorted(range(LED_COUNT), key=lambda i: zs[i], reverse=True)
+# Get LED index sorted by descending Z (top to bottom, cached across launches)
+sorted_by_z = np.array(geometry_cache.derived("z_descending", geometry_cache.z_descending))
+
+# Heights in that order, negated so they ascend (for searchsorted)
+neg_z_sorted = -coords[sorted_by_z, 2]
 
 # ----------------------------------------------------
 # Strip configuration
@@ -68,54 +77,63 @@ class RainDrop:
         self.length = random.randint(18, 33)    # green tail length
 
 # ----------------------------------------------------
-def matrix_rain_loop(interval=0.015, num_streams=10, fade_factor=0.80):
+def matrix_rain_loop(interval=0.015, num_streams=10, fade_factor=0.80,
+                     min_streams=3, frame_budget=None):
     """
     interval: time between frames
     num_streams: number of raindrops falling at once
     fade_factor: brightness decay (0.8 = smooth fade)
+    min_streams: fewest streams the quality governor may drop to
+    frame_budget: compute time budget per frame in seconds (default: interval)
     """
 
     drops = [RainDrop() for _ in range(num_streams)]
 
-    # Holds current brightness for each LED
-    buffer = [(0,0,0)] * LED_COUNT
+    governor = QualityGovernor(
+        frame_budget if frame_budget is not None else interval,
+        {"streams": (min(min_streams, num_streams), num_streams)}
+    )
 
-    while running:
+    # Holds current green brightness for each LED, faded in place
+    trail = TrailBuffer(LED_COUNT, channels=1)
+    green = trail.value[:, 0]
 
-        # Fade existing buffer
-        new_buffer = []
-        for (r, g, b) in buffer:
-            new_g = int(g * fade_factor)   # only green channel
-            new_buffer.append((0, new_g, 0))
+    # Packed GRB color for every green level, built once
+    green_colors = np.array([GRB(0, g, 0) for g in range(256)], dtype=np.uint32)
+    writer = FrameWriter(strip)    # whole frame per call, no per-pixel calls
 
-        buffer = new_buffer[:]
+    while running:
+        frame_start = time.time()
+
+        # Fade existing buffer (only green channel)
+        trail.decay(fade_factor)
 
         # Update each rain stream
-        for drop in drops:
+        for drop in drops[:governor.int_value("streams")]:
             drop.pos -= drop.speed * interval
 
             # If below bottom → restart
             if drop.pos < z_min - 10:
                 drop.reset()
 
-            # Light LEDs in this vertical segment
-            for idx in sorted_by_z:
-                z = zs[idx]
+            # Light LEDs in this vertical segment: one contiguous run of
+            # the height-sorted order
+            lo = np.searchsorted(neg_z_sorted, -drop.pos, side="left")
+            hi = np.searchsorted(neg_z_sorted, drop.length - drop.pos, side="right")
+            if lo == hi:
+                continue
 
-                if drop.pos - drop.length <= z <= drop.pos:
-                    # brighter at drop head, dimmer in tail
-                    dist = drop.pos - z
-                    t = 1 - (dist / drop.length)
-                    g = int(drop.brightness * t)
-
-                    old_r, old_g, old_b = buffer[idx]
-                    buffer[idx] = (0, max(old_g, g), 0)
+            # brighter at drop head, dimmer in tail
+            dist = drop.pos + neg_z_sorted[lo:hi]
+            g = drop.brightness * (1 - dist / drop.length)
+            trail.max_merge(sorted_by_z[lo:hi], g.astype(np.uint8), channel=0)
 
         # Render frame
-        for i, (r,g,b) in enumerate(buffer):
-            strip.setPixelColor(i, GRB(r,g,b))
+        writer.write(green_colors[green])
+        governor.update(time.time() - frame_start)    # compute only, not the wire
 
         strip.show()
+        heartbeat.frame()
         time.sleep(interval)
 
 # ----------------------------------------------------
@@ -127,7 +145,7 @@ def main():
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
 
-    strip = PixelStrip(
+    strip = fast_start.strip(
         LED_COUNT,
         LED_PIN,
         LED_FREQ_HZ,
@@ -136,9 +154,6 @@ def main():
         LED_BRIGHTNESS,
         LED_CHANNEL
     )
-    strip.begin()
-
-    clear_strip()
 
     try:
         matrix_rain_loop(
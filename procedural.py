@@ -0,0 +1,259 @@
+# procedural.py — time-batched versions of the procedural effects
+#
+# Each effect is a pure function of time, so many frames can be computed
+# in one call: render_batch(ts) takes T timestamps and returns a
+# (T, N, 3) uint8 RGB block, broadcasting over time and LEDs at once.
+# Baking, render-ahead and offline capture pay the Python overhead once
+# per batch instead of once per LED per frame.
+#
+# lod=<level> evaluates the effect on voxel clusters and spreads the
+# result to every LED (see lod.py), for trees with tens of thousands of
+# LEDs.  leds=<indices> evaluates it only on those LEDs (zones.py), with
+# heights still normalized over the whole tree.
+#
+# Timestamps are in each script's own time variable (the value its main
+# loop increments every frame), so render(t) reproduces the script's
+# frame at that t.  Parameters default to the values in the scripts.
+#
+# render_packed(t, out, pool) renders one frame straight into a packed
+# GRB buffer for FrameWriter, split across a kernel_pool.KernelPool's
+# threads on large trees.  Every evaluate() takes a slice of its points
+# for that.
+#
+# Run this file for a batch vs single-frame benchmark:
+#     python3 procedural.py
+
+import time
+import numpy as np
+import geometry_cache
+from lod import LevelOfDetail
+
+
+def pack_grb(frames, out=None):
+    """(..., 3) uint8 RGB -> (...) uint32 packed like the scripts' GRB() helper."""
+    f = frames.astype(np.uint32)
+    return np.bitwise_or((f[..., 1] << 16) | (f[..., 0] << 8), f[..., 2], out=out)
+
+
+def hsv_to_rgb(h):
+    """Vectorized colorsys.hsv_to_rgb(h, 1, 1) -> (..., 3) floats in 0..1."""
+    h6 = (h % 1.0)[..., None] * 6.0
+    return np.clip(np.abs(h6 - [3.0, 2.0, 4.0]) * [1, -1, -1] + [-1.0, 2.0, 2.0], 0.0, 1.0)
+
+
+class ProceduralAnimation:
+    """Base class: subclasses implement evaluate(ts, sl) -> (T, points[sl], 3) uint8."""
+
+    name = "procedural"
+
+    def __init__(self, coords=None, lod=0, blend=False, leds=None):
+        if coords is None:
+            full = np.asarray(geometry_cache.coords())
+            polar = geometry_cache.derived("polar_height", geometry_cache.polar_height)
+        else:
+            full = np.asarray(coords, dtype=np.float64)
+            polar = geometry_cache.polar_height(full)
+        if leds is not None:
+            leds = np.asarray(leds, dtype=np.intp)
+            full, polar = full[leds], polar[:, leds]
+            coords = full
+        self.led_count = len(full)
+
+        # the effect is evaluated at these points: every LED, or one
+        # representative per cluster
+        self.lod = LevelOfDetail(coords, lod, blend) if lod else None
+        if self.lod is None:
+            self.coords, self.theta, self.z_norm = full, polar[0], polar[1]
+        else:
+            self.coords = self.lod.coords
+            self.theta = self.lod.reduce_angle(polar[0])
+            self.z_norm = self.lod.reduce(polar[1])
+
+    def evaluate(self, ts, sl=slice(None)):
+        raise NotImplementedError
+
+    def render_batch(self, ts, **kwargs):
+        """(T,) timestamps -> (T, N, 3) uint8 RGB for every LED."""
+        frames = self.evaluate(ts, **kwargs)
+        return frames if self.lod is None else self.lod.expand(frames)
+
+    def render(self, t, **kwargs):
+        return self.render_batch(np.array([t], dtype=np.float64), **kwargs)[0]
+
+    def render_packed(self, t, out=None, pool=None, **kwargs):
+        """One frame as (N,) uint32 GRB, evaluated and packed slice by slice on `pool`."""
+        ts = np.array([t], dtype=np.float64)
+        if out is None:
+            out = np.empty(self.led_count, dtype=np.uint32)
+        run = pool.run if pool is not None else (lambda kernel, n: kernel(slice(0, n)))
+
+        if self.lod is None:
+            run(lambda sl: pack_grb(self.evaluate(ts, sl, **kwargs)[0], out[sl]), self.led_count)
+            return out
+
+        reduced = np.empty((1, len(self.lod), 3), dtype=np.uint8)
+        def evaluate(sl):
+            reduced[:, sl] = self.evaluate(ts, sl, **kwargs)
+        run(evaluate, len(self.lod))
+        frame = self.lod.expand(reduced)[0]
+        run(lambda sl: pack_grb(frame[sl], out[sl]), self.led_count)
+        return out
+
+
+# ----------------------------------------------------
+# candy_cane.py
+# ----------------------------------------------------
+class CandyCane(ProceduralAnimation):
+    name = "candy_cane"
+
+    def __init__(self, coords=None, stripes=50, rotation_speed=4, sharpness=10,
+                 lod=0, blend=False, leds=None):
+        super().__init__(coords, lod, blend, leds)
+        self.base = self.theta * 3 + self.z_norm * stripes * np.pi
+        self.rotation_speed = rotation_speed
+        self.sharpness = sharpness
+
+    def evaluate(self, ts, sl=slice(None)):
+        ts = np.asarray(ts, dtype=np.float64)[:, None]
+        stripe = ((np.sin(self.base[None, sl] + ts * self.rotation_speed) + 1) / 2) ** self.sharpness
+        out = np.empty(stripe.shape + (3,), dtype=np.uint8)
+        out[..., 0] = 255 * (1 - stripe) + 255 * stripe    # red -> white blend
+        out[..., 1] = 255 * stripe
+        out[..., 2] = out[..., 1]
+        return out
+
+
+# ----------------------------------------------------
+# double_helix.py  (t = the script's `phase`)
+# ----------------------------------------------------
+class DoubleHelix(ProceduralAnimation):
+    name = "double_helix"
+
+    def __init__(self, coords=None, turns=5.5, lod=0, blend=False, leds=None):
+        super().__init__(coords, lod, blend, leds)
+        self.base = self.theta + 2 * np.pi * turns * self.z_norm
+
+    def evaluate(self, ts, sl=slice(None)):
+        ts = np.asarray(ts, dtype=np.float64)[:, None]
+        v1 = (np.sin(self.base[None, sl] + ts) + 1) / 2
+        v2 = (np.sin(self.base[None, sl] - ts) + 1) / 2
+        v = np.maximum(v1, v2)
+
+        hue = (self.z_norm[None, sl] + ts * 0.1) % 1.0
+        color = (hsv_to_rgb(hue) * 255).astype(np.uint8)
+        return (color * v[..., None]).astype(np.uint8)
+
+
+# ----------------------------------------------------
+# wind_swirl.py
+# ----------------------------------------------------
+class WindSwirl(ProceduralAnimation):
+    name = "wind_swirl"
+
+    def __init__(self, coords=None, spiral_speed=0.06, swirl_strength=11.0, blink_speed=0.10,
+                 lod=0, blend=False, leds=None):
+        super().__init__(coords, lod, blend, leds)
+        self.base = self.theta * swirl_strength + self.z_norm * 8
+        self.spiral_speed = spiral_speed
+        self.blink_speed = blink_speed
+
+    def evaluate(self, ts, sl=slice(None), blink=None):
+        """blink: optional (T,) brightness override (e.g. from audio)."""
+        ts = np.asarray(ts, dtype=np.float64)[:, None]
+        if blink is None:
+            blink = (np.sin(ts * self.blink_speed * 2 * np.pi) + 1) / 2
+        else:
+            blink = np.asarray(blink, dtype=np.float64).reshape(-1, 1)
+        swirl = (np.sin(self.base[None, sl] - ts * self.spiral_speed * 50) + 1) / 2
+        val = (np.clip(swirl * blink, 0.0, 1.0) * 255).astype(np.uint8)
+        return np.repeat(val[..., None], 3, axis=-1)
+
+
+# ----------------------------------------------------
+# light_beams.py  (fixed color; the script's random_cycle is stateful)
+# ----------------------------------------------------
+class LightBeams(ProceduralAnimation):
+    name = "light_beams"
+
+    def __init__(self, coords=None, beam_count=1, beam_width=0.45,
+                 rotation_speed=0.2, softness=5, color=(255, 255, 255),
+                 lod=0, blend=False, leds=None):
+        super().__init__(coords, lod, blend, leds)
+        self.offsets = 2 * np.pi * np.arange(beam_count) / beam_count
+        self.beam_width = beam_width
+        self.rotation_speed = rotation_speed
+        self.softness = softness
+        self.color = np.asarray(color, dtype=np.float64)
+
+    def evaluate(self, ts, sl=slice(None)):
+        ts = np.asarray(ts, dtype=np.float64)
+        angle = (ts * self.rotation_speed) % (2 * np.pi)
+        # (T, beams, N)
+        rel = self.theta[None, None, sl] - angle[:, None, None] - self.offsets[None, :, None]
+        value = (1 - np.abs(np.sin(rel / self.beam_width))).sum(axis=1)
+        value = np.clip(value ** self.softness, 0.0, 1.0)
+        return (value[..., None] * self.color).astype(np.uint8)
+
+
+# ----------------------------------------------------
+# top_to_bottom.py  (t in seconds; one band step per frame_delay)
+# ----------------------------------------------------
+class TopToBottom(ProceduralAnimation):
+    name = "top_to_bottom"
+
+    XMAS_COLORS = np.array([(255, 255, 255), (255, 0, 0), (0, 255, 0)], dtype=np.uint8)
+
+    def __init__(self, coords=None, band_height_frac=0.10, step_frac=0.02,
+                 frame_delay=0.03, seed=0, lod=0, blend=False, leds=None):
+        super().__init__(coords, lod, blend, leds)
+        self.z = self.coords[:, 2]
+        z_min, z_max = self.z.min(), self.z.max()
+        height = z_max - z_min
+        self.z_max = z_max
+        self.band_height = band_height_frac * height
+        self.step = step_frac * height
+        self.frame_delay = frame_delay
+        self.steps_per_pass = int(np.floor((z_max - (z_min - self.band_height)) / self.step)) + 1
+        self.seed = seed
+
+    def evaluate(self, ts, sl=slice(None)):
+        frame = np.floor(np.asarray(ts, dtype=np.float64) / self.frame_delay).astype(np.int64)
+        z_top = self.z_max - (frame % self.steps_per_pass) * self.step
+        z_bottom = z_top - self.band_height
+        z = self.z[None, sl]
+        inside = (z >= z_bottom[:, None]) & (z <= z_top[:, None])
+
+        # the script picks a random color every frame; here it is a
+        # deterministic function of the frame number
+        color_idx = (frame * 2654435761 + self.seed) % 2**32 % len(self.XMAS_COLORS)
+        return inside[..., None] * self.XMAS_COLORS[color_idx][:, None, :]
+
+
+EFFECTS = [CandyCane, DoubleHelix, WindSwirl, LightBeams, TopToBottom]
+
+
+# ----------------------------------------------------
+# Benchmark
+# ----------------------------------------------------
+def benchmark(frames=600, batch=200):
+    print(f"{frames} frames, batch size {batch}")
+    for cls in EFFECTS:
+        effect = cls()
+        ts = np.arange(frames) * 0.02
+
+        t0 = time.perf_counter()
+        for t in ts:
+            effect.render(t)
+        single = frames / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        for start in range(0, frames, batch):
+            effect.render_batch(ts[start:start + batch])
+        batched = frames / (time.perf_counter() - t0)
+
+        print(f"  {effect.name:14s} single {single:9.0f} fps   "
+              f"batch {batched:9.0f} fps   x{batched / single:5.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
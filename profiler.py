@@ -0,0 +1,222 @@
+# profiler.py — low-overhead sampling profiler for any animation
+#
+# Runs an animation script and samples its main thread's Python stack on
+# SIGPROF (a CPU-time timer, so sleeping between frames costs nothing and
+# is not sampled).  After the window ends — or when the animation exits
+# first — it writes, under profiles/:
+#
+#     <animation>-<YYYYmmdd-HHMMSS>.collapsed   one "a;b;c count" line per
+#                                               stack, for flamegraph.pl /
+#                                               speedscope / inferno
+#     <animation>-<YYYYmmdd-HHMMSS>.txt         top hot lines (self samples)
+#
+# The signal handler only walks frame objects and bumps a dict counter;
+# at the default 200 Hz that stays well under 1% of one core (the summary
+# reports the measured overhead), so short windows are fine in production.
+#
+# Usage:
+#     python3 snake.py -n 50 --profile                    # 30 s window
+#     python3 fireworks.py --profile 10                   # any animation that calls
+#                                                         # fast_start.show_first_frame
+#     python3 profiler.py snake.py -n 50                  # any script, as a wrapper
+#     python3 profiler.py --seconds 10 tree_simulator.py fireworks.py
+#     python3 tree_scheduler.py --profile 60              # every launched animation
+#
+# The scheduler stops animations with SIGTERM.  Some of them only catch
+# KeyboardInterrupt, and SIGTERM's default action would kill them before
+# the profile is written.  So while profiling, an otherwise unhandled
+# SIGTERM raises SystemExit instead, and the output is written on the way out.
+#
+# Only the main thread is sampled; the output threads of led_output.py /
+# audio_input.py are not.
+
+import os
+import sys
+import time
+import runpy
+import atexit
+import signal
+import argparse
+import linecache
+from collections import Counter
+from datetime import datetime
+
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+
+DEFAULT_WINDOW   = 30.0     # seconds of samples
+DEFAULT_INTERVAL = 0.005    # seconds of CPU time between samples (200 Hz)
+TOP_LINES        = 20
+
+# runpy's own frames are plumbing, not the animation
+_RUNPY_FILES = {runpy.__file__, "<frozen runpy>"}
+
+
+class SamplingProfiler:
+    def __init__(self, name, window=DEFAULT_WINDOW, interval=DEFAULT_INTERVAL,
+                 out_dir=PROFILE_DIR):
+        self.name = name
+        self.window = window
+        self.interval = interval
+        self.out_dir = out_dir
+        self.stacks = Counter()     # tuple of (file, func, line), root first -> samples
+        self.samples = 0
+        self.handler_time = 0.0
+        self._stop_codes = set()    # frames at or above these are profiler/runpy plumbing
+        self._started = None
+        self._stopped = False
+
+    def start(self, stop_at=None):
+        """Begin sampling; `stop_at` is the code object whose callees are the animation."""
+        if stop_at is not None:
+            self._stop_codes.add(stop_at)
+        self._started = time.time()
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def _sample(self, signum, frame):
+        t0 = time.perf_counter()
+        stack = []
+        while frame is not None and frame.f_code not in self._stop_codes:
+            code = frame.f_code
+            if code.co_filename not in _RUNPY_FILES:
+                stack.append((code.co_filename, code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+        self.handler_time += time.perf_counter() - t0
+
+        if time.time() - self._started >= self.window:
+            self.stop()
+
+    def stop(self):
+        """Stop sampling and write the output files (once)."""
+        if self._stopped or self._started is None:
+            return None
+        self._stopped = True
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        return self.write()
+
+    # ----------------------------------------------------
+    # Output
+    # ----------------------------------------------------
+    def write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(self._started).strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.out_dir, f"{self.name}-{stamp}")
+
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(_label(fr) for fr in stack) + f" {count}\n")
+
+        summary = self.summary()
+        with open(base + ".txt", "w") as f:
+            f.write(summary)
+        print(summary, file=sys.stderr)
+        print(f"[Profiler] wrote {base}.collapsed and {base}.txt", file=sys.stderr)
+        return base
+
+    def summary(self, top=TOP_LINES):
+        elapsed = time.time() - self._started
+        hot = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                file, _, line = stack[-1]
+                hot[(file, line)] += count
+
+        overhead = self.handler_time / max(1e-9, elapsed) * 100
+        lines = [f"{self.name}: {self.samples} samples over {elapsed:.1f}s "
+                 f"(every {self.interval * 1000:.1f} ms CPU), "
+                 f"profiler overhead {overhead:.2f}% of one core",
+                 "",
+                 "   self%  samples  location"]
+        for (file, line), count in hot.most_common(top):
+            source = linecache.getline(file, line).strip()
+            lines.append(f"  {count / max(1, self.samples) * 100:5.1f}%  {count:7d}  "
+                         f"{os.path.basename(file)}:{line}  {source}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(frame):
+    file, func, line = frame
+    return f"{func} ({os.path.basename(file)}:{line})"
+
+
+def _exit_on_sigterm(signum, frame):
+    sys.exit(128 + signum)
+
+
+def _unwind_on_sigterm():
+    """Let SIGTERM unwind (finally blocks, atexit) unless the animation handles it."""
+    if signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None):
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+
+# ----------------------------------------------------
+# --profile [SECONDS] on an animation's own command line
+# ----------------------------------------------------
+def from_argv(script):
+    """
+    Start profiling `script` if sys.argv has --profile [SECONDS].
+    The flag is removed before the script's own argparse runs; the output
+    is written when the window ends or the process exits, whichever is first.
+    """
+    if "--profile" not in sys.argv:
+        return None
+    i = sys.argv.index("--profile")
+    window = DEFAULT_WINDOW
+    if i + 1 < len(sys.argv):
+        try:
+            window = float(sys.argv[i + 1])
+            del sys.argv[i + 1]
+        except ValueError:
+            pass
+    del sys.argv[i]
+
+    name = os.path.splitext(os.path.basename(script))[0]
+    profiler = SamplingProfiler(name, window).start()
+    atexit.register(profiler.stop)
+    _unwind_on_sigterm()
+    return profiler
+
+
+# ----------------------------------------------------
+# Run a script under the profiler
+# ----------------------------------------------------
+def run_script(script, script_args, window=DEFAULT_WINDOW, interval=DEFAULT_INTERVAL):
+    script = os.path.abspath(script)
+    # name the output after the animation, also when it runs inside
+    # tree_simulator.py (the first .py argument)
+    inner = [a for a in script_args if a.endswith(".py")]
+    name = os.path.splitext(os.path.basename(inner[0] if inner else script))[0]
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script] + script_args
+
+    profiler = SamplingProfiler(name, window, interval)
+    profiler.start(stop_at=run_script.__code__)
+    _unwind_on_sigterm()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        profiler.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sampling profiler for tree animations")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_WINDOW,
+                        help="profiling window; the animation keeps running afterwards")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="CPU seconds between samples")
+    parser.add_argument("script", help="animation script to run")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    run_script(args.script, args.script_args, args.seconds, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# quality_governor.py — holds an animation at its frame budget by scaling density knobs
+
+# ----------------------------------------------------
+# How it works
+# ----------------------------------------------------
+# Each animation declares the knobs that drive its cost (spawn rate,
+# stream count, snake count, beam count, ...) together with the range
+# the knob may move in.  After every frame the animation reports how
+# long the frame took to compute, measured before strip.show().  The wire
+# time is set by the LED count and no knob changes it, so counting it
+# would pin a directly driven strip at its minimum.  The governor keeps a smoothed
+# frame time and moves one shared quality level (0.0 = every knob at its
+# minimum, 1.0 = every knob at its maximum):
+#
+#   smoothed > budget * HIGH_WATER  -> step quality down
+#   smoothed < budget * LOW_WATER   -> step quality back up (slower)
+#   anywhere in between             -> leave it alone (hysteresis band)
+#
+# After every change the governor waits HOLD_FRAMES frames so the new
+# level has time to show up in the measurements before it moves again.
+#
+# tree_scheduler.py may cap the level (TREE_QUALITY=0.0..1.0) when the
+# Pi is running hot; the governor then starts at and never exceeds it.
+
+import os
+
+HIGH_WATER  = 1.0     # fraction of the budget that triggers a step down
+LOW_WATER   = 0.7     # fraction of the budget that allows a step up
+STEP_DOWN   = 0.15    # quality removed per step down
+STEP_UP     = 0.05    # quality added per step up (slow recovery)
+SMOOTHING   = 0.1     # EWMA weight of the newest frame time
+HOLD_FRAMES = 20      # frames to wait after a change
+
+QUALITY_ENV_VAR = "TREE_QUALITY"
+
+
+class QualityGovernor:
+    def __init__(self, frame_budget, knobs, verbose=True):
+        """
+        frame_budget : seconds one frame's compute (without strip.show()) may take
+        knobs        : {name: (min_value, max_value)}
+        verbose      : print a line whenever the quality level moves
+        """
+        self.frame_budget = frame_budget
+        self.knobs = dict(knobs)
+        self.verbose = verbose
+
+        self.max_quality = min(1.0, max(0.0, float(os.environ.get(QUALITY_ENV_VAR, 1.0))))
+        self.quality = self.max_quality
+        self.smoothed = None
+        self.hold = HOLD_FRAMES
+
+    # ------------------------------------------------
+    # Knob values at the current quality level
+    # ------------------------------------------------
+    def value(self, name):
+        lo, hi = self.knobs[name]
+        return lo + (hi - lo) * self.quality
+
+    def int_value(self, name):
+        return int(round(self.value(name)))
+
+    # ------------------------------------------------
+    # Feed one measured frame time
+    # ------------------------------------------------
+    def update(self, frame_time):
+        """Record a frame time; returns True if the quality level changed."""
+        if self.smoothed is None:
+            self.smoothed = frame_time
+        else:
+            self.smoothed += SMOOTHING * (frame_time - self.smoothed)
+
+        if self.hold > 0:
+            self.hold -= 1
+            return False
+
+        old = self.quality
+        if self.smoothed > self.frame_budget * HIGH_WATER:
+            self.quality = max(0.0, self.quality - STEP_DOWN)
+        elif self.smoothed < self.frame_budget * LOW_WATER:
+            self.quality = min(self.max_quality, self.quality + STEP_UP)
+
+        if self.quality == old:
+            return False
+
+        self.hold = HOLD_FRAMES
+        if self.verbose:
+            knobs = ", ".join(f"{name}={self.value(name):.2f}" for name in self.knobs)
+            print(f"[Governor] frame {self.smoothed * 1000:.1f} ms / "
+                  f"budget {self.frame_budget * 1000:.1f} ms -> "
+                  f"quality {self.quality:.2f} ({knobs})")
+        return True
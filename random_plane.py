@@ -1,10 +1,16 @@
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import math
 import random
 import json
 import os
 import signal
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import Color
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 def RGB(r, g, b):
     return Color(r, g, b)
@@ -91,6 +97,7 @@ def animate_random_planes():
                     strip.setPixelColor(idx, RGB(0,0,0))
 
             strip.show()
+            heartbeat.frame()
             time.sleep(INTERVAL)
 
             D += PLANE_SPEED * dt
@@ -102,7 +109,7 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
 
-    strip = PixelStrip(
+    strip = fast_start.strip(
         LED_COUNT,
         LED_PIN,
         LED_FREQ_HZ,
@@ -111,7 +118,6 @@ if __name__ == "__main__":
         LED_BRIGHTNESS,
         LED_CHANNEL
     )
-    strip.begin()
 
     try:
         animate_random_planes()
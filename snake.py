@@ -1,10 +1,17 @@
-import os
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import random
-import math
 import argparse
-from rpi_ws281x import PixelStrip, Color
-import json
+from rpi_ws281x import Color
+import geometry_cache
+import numpy as np
+from quality_governor import QualityGovernor
+from snake_ring import SnakeRing, knn_table, segment_palette
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 # ---------------------------------------------------
 # ARGUMENT PARSING
@@ -22,6 +29,10 @@ parser.add_argument("--min-bright", type=int, default=50,
                     help="Minimum segment brightness")
 parser.add_argument("--max-bright", type=int, default=255,
                     help="Maximum segment brightness")
+parser.add_argument("--min-snakes", type=int, default=5,
+                    help="Fewest snakes the quality governor may drop to")
+parser.add_argument("--budget", type=float, default=None,
+                    help="Compute time budget per frame in seconds (default: same as --delay)")
 args = parser.parse_args()
 
 NUM_SNAKES     = args.num_snakes
@@ -30,15 +41,13 @@ FRAME_DELAY    = args.delay
 NEIGHBORS_K    = args.neighbors
 MIN_SEG_BRIGHT = args.min_bright
 MAX_SEG_BRIGHT = args.max_bright
+MIN_SNAKES     = max(1, min(args.min_snakes, NUM_SNAKES))
+FRAME_BUDGET   = args.budget if args.budget is not None else FRAME_DELAY
 
 # ---------------------------------------------------
 # LOAD TREE COORDINATES (500 LEDs)
 # ---------------------------------------------------
-BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
-COORDS_JSON  = os.path.join(BASE_DIR, "tree_coords.json")
-
-with open(COORDS_JSON, "r") as f:
-    positions = json.load(f)
+positions = geometry_cache.coords()
 
 LED_COUNT = len(positions)
 print(f"Loaded {LED_COUNT} coordinates.")
@@ -53,11 +62,10 @@ LED_BRIGHTNESS = 255    # we control brightness manually by segments
 LED_INVERT     = False
 LED_CHANNEL    = 0
 
-strip = PixelStrip(
+strip = fast_start.strip(
     LED_COUNT, LED_PIN, LED_FREQ_HZ,
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
-strip.begin()
 
 # ---------------------------------------------------
 # HELPER: GRB COLOR CREATOR (VERY IMPORTANT!)
@@ -77,77 +85,55 @@ def clear_strip():
 # ---------------------------------------------------
 print("Precomputing nearest-neighbor graph...")
 
-dist_matrix = []
-for i, p in enumerate(positions):
-    px, py, pz = p
-    dists = []
-    for j, q in enumerate(positions):
-        if i == j:
-            continue
-        qx, qy, qz = q
-        d = math.sqrt((px-qx)**2 + (py-qy)**2 + (pz-qz)**2)
-        dists.append((j, d))
-    dists.sort(key=lambda x: x[1])
-    dist_matrix.append([idx for idx, _ in dists[:NEIGHBORS_K]])
+dist_matrix = geometry_cache.derived("knn", knn_table, k=NEIGHBORS_K)
 
 print("Neighbor graph ready.\n")
 
 # ---------------------------------------------------
 # INITIALIZE SNAKES
 # ---------------------------------------------------
-snakes = []
 colors = []
 
 for _ in range(NUM_SNAKES):
-    snakes.append([random.randrange(LED_COUNT)])  # random starting LED
     colors.append((
         random.randint(50, 255),   # R
         random.randint(50, 255),   # G
         random.randint(50, 255)    # B
     ))
 
-# ---------------------------------------------------
-# CHOOSE NEXT LED FOR THE SNAKE
-# ---------------------------------------------------
-def choose_next(head, body):
-    neighs = dist_matrix[head]
-    choices = [n for n in neighs if n not in body]
-    return random.choice(choices) if choices else random.choice(neighs)
+snakes  = SnakeRing(dist_matrix, NUM_SNAKES, SNAKE_LENGTH)
+palette = segment_palette(colors, SNAKE_LENGTH, MIN_SEG_BRIGHT, MAX_SEG_BRIGHT, GRB)
+
+# Packed frame being built and the frame currently on the strip;
+# only pixels that differ between the two are pushed to the strip
+frame = np.zeros(LED_COUNT, dtype=np.uint32)
+shown = np.zeros(LED_COUNT, dtype=np.uint32)
+
+governor = QualityGovernor(FRAME_BUDGET, {
+    "snakes": (MIN_SNAKES, NUM_SNAKES)
+})
 
-# ---------------------------------------------------
-# MAIN LOOP
-# ---------------------------------------------------
 try:
     print("Running multi-snake 3D animation...\n")
     while True:
+        frame_start = time.time()
+        active = governor.int_value("snakes")
 
-        # UPDATE SNAKES' POSITIONS
-        for s in snakes:
-            head = s[-1]
-            nxt = choose_next(head, s)
-            s.append(nxt)
-
-            if len(s) > SNAKE_LENGTH:
-                s.pop(0)
+        # UPDATE SNAKES' POSITIONS (all heads in one batch; snakes the
+        # governor parked keep moving so their occupancy stays current)
+        snakes.step()
 
         # DRAW FRAME
-        clear_strip()
-
-        for idx, s in enumerate(snakes):
-            base_r, base_g, base_b = colors[idx]
-
-            for seg_idx, led in enumerate(s):
-                frac = seg_idx / (SNAKE_LENGTH - 1)
-                bri  = MIN_SEG_BRIGHT + frac * (MAX_SEG_BRIGHT - MIN_SEG_BRIGHT)
-                scale = bri / 255.0
-
-                r = int(base_r * scale)
-                g = int(base_g * scale)
-                b = int(base_b * scale)
+        frame[:] = 0
+        snakes.compose(palette, frame, active)
 
-                strip.setPixelColor(led, GRB(r, g, b))
+        for led in np.flatnonzero(frame != shown):
+            strip.setPixelColor(int(led), int(frame[led]))
+        shown[:] = frame
+        governor.update(time.time() - frame_start)    # compute only, not the wire
 
         strip.show()
+        heartbeat.frame()
         time.sleep(FRAME_DELAY)
 
 except KeyboardInterrupt:
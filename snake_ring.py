@@ -0,0 +1,155 @@
+# snake_ring.py — batch-stepped snakes in fixed-size ring arrays
+#
+# Every snake lives in one row of a (num_snakes, length) ring array.
+# All snakes advance together, so one shared ring pointer marks the head
+# slot of every row and the slot after it holds every tail.  A per-LED
+# occupancy count replaces the old `n not in body` list scan: a head
+# prefers neighbors no snake currently sits on and falls back to any
+# neighbor when boxed in.
+#
+# Run this file directly for a stepping/compose benchmark:
+#     python3 snake_ring.py
+
+import os
+import json
+import time
+import numpy as np
+
+EMPTY = -1    # ring slot not filled yet (snake still growing)
+KNN_CHUNK = 1024    # rows per distance block in knn_table
+
+
+# ---------------------------------------------------
+# NEAREST-NEIGHBOR TABLE
+# ---------------------------------------------------
+def knn_table(positions, k, progress=None):
+    """
+    (LED_COUNT, k) table of each LED's k nearest other LEDs.
+    progress() is called after every block (e.g. a heartbeat on big trees).
+    """
+    pts = np.asarray(positions, dtype=np.float64)
+    k = min(k, len(pts) - 1)
+    out = np.empty((len(pts), k), dtype=np.int32)
+    # KNN_CHUNK rows at a time keeps the distance block small on big trees
+    for start in range(0, len(pts), KNN_CHUNK):
+        block = pts[start:start + KNN_CHUNK]
+        d2 = ((block[:, None, :] - pts[None, :, :]) ** 2).sum(axis=2)
+        rows = np.arange(len(block))[:, None]
+        d2[rows[:, 0], start + rows[:, 0]] = np.inf
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        # keep the old ordering: closest neighbor first
+        order = np.argsort(d2[rows, nearest], axis=1, kind="stable")
+        out[start:start + len(block)] = nearest[rows, order]
+        if progress is not None:
+            progress()
+    return out
+
+
+# ---------------------------------------------------
+# SNAKE STATE
+# ---------------------------------------------------
+class SnakeRing:
+    def __init__(self, neighbors, num_snakes, length, rng=None):
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.led_count = len(self.neighbors)
+        self.num_snakes = num_snakes
+        self.length = length
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.body = np.full((num_snakes, length), EMPTY, dtype=np.int32)
+        self.head = 0    # ring slot holding every snake's head
+        self.body[:, 0] = self.rng.integers(self.led_count, size=num_snakes)
+
+        self.occupancy = np.zeros(self.led_count, dtype=np.int32)
+        np.add.at(self.occupancy, self.body[:, 0], 1)
+
+    def step(self):
+        """Advance every snake by one LED."""
+        n = self.num_snakes
+        heads = self.body[:n, self.head]
+
+        # random key per candidate; occupied candidates only win when
+        # every neighbor is occupied
+        cand = self.neighbors[heads]
+        keys = self.rng.random(cand.shape)
+        keys[self.occupancy[cand] > 0] += 1.0
+        nxt = cand[np.arange(n), keys.argmin(axis=1)]
+
+        # the slot after the head is the oldest segment: it gets overwritten
+        slot = (self.head + 1) % self.length
+        tails = self.body[:n, slot]
+        tails = tails[tails != EMPTY]
+        np.subtract.at(self.occupancy, tails, 1)
+        np.add.at(self.occupancy, nxt, 1)
+
+        self.body[:n, slot] = nxt
+        self.head = slot
+
+    def compose(self, palette, frame, active=None):
+        """
+        Write the first `active` snakes (default all) into `frame`
+        (packed colors, one per LED).
+
+        palette[s, age] is the packed color of snake s's segment `age`
+        steps behind its head.  Segments are drawn oldest first, and
+        higher-numbered snakes on top, so heads win where snakes overlap.
+        """
+        n = self.num_snakes if active is None else active
+        ages = np.arange(self.length - 1, -1, -1)
+        slots = (self.head - ages) % self.length
+
+        leds = self.body[:n, slots].T.ravel()
+        colors = palette[:n, ages].T.ravel()
+        filled = leds != EMPTY
+        frame[leds[filled]] = colors[filled]
+
+
+def segment_palette(colors, length, min_bright, max_bright, pack):
+    """(num_snakes, length) packed colors, age 0 (head) brightest."""
+    palette = np.zeros((len(colors), length), dtype=np.uint32)
+    for s, (base_r, base_g, base_b) in enumerate(colors):
+        for age in range(length):
+            frac = (length - 1 - age) / max(1, length - 1)
+            bri = min_bright + frac * (max_bright - min_bright)
+            scale = bri / 255.0
+            palette[s, age] = pack(int(base_r * scale), int(base_g * scale), int(base_b * scale))
+    return palette
+
+
+# ---------------------------------------------------
+# BENCHMARK
+# ---------------------------------------------------
+def benchmark(counts=(25, 250, 2500), length=10, k=6, frames=300):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base_dir, "tree_coords.json")) as f:
+        positions = json.load(f)
+
+    neighbors = knn_table(positions, k)
+    led_count = len(positions)
+    rng = np.random.default_rng(0)
+
+    print(f"{led_count} LEDs, length {length}, k {k}, {frames} frames")
+    for num in counts:
+        ring = SnakeRing(neighbors, num, length, rng)
+        colors = rng.integers(50, 256, size=(num, 3))
+        palette = segment_palette(colors, length, 50, 255,
+                                  lambda r, g, b: (g << 16) | (r << 8) | b)
+        frame = np.zeros(led_count, dtype=np.uint32)
+        prev = frame.copy()
+        changed = 0
+
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            ring.step()
+            frame[:] = 0
+            ring.compose(palette, frame)
+            changed += np.count_nonzero(frame != prev)
+            prev[:] = frame
+        elapsed = time.perf_counter() - t0
+
+        print(f"  {num:5d} snakes: {elapsed / frames * 1000:7.3f} ms/frame, "
+              f"{changed / frames:6.1f} changed pixels/frame")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,11 +1,10 @@
 # snowfall_vertical.py — true falling snow using Z-axis ordering
 
 import time
-import json
-import os
 import random
 import signal
 from rpi_ws281x import PixelStrip, Color
+import geometry_cache
 
 running = True
 strip = None
@@ -34,15 +33,13 @@ BRIGHTNESS_MAX    = 255
 # --------------------------------------------------------------
 # Load LED positions
 # --------------------------------------------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(BASE_DIR, "tree_coords.json")) as f:
-    coords = json.load(f)
+coords = geometry_cache.coords()
 
 LED_COUNT = len(coords)
 
-# Extract Z coordinates and sort LED indices by Z descending (top→bottom)
-z_values = [p[2] for p in coords]
-sorted_by_height = sorted(range(LED_COUNT), key=lambda i: z_values[i], reverse=True)
+# Extract Z coordinates and sort LED indices by Z descending (top→bottom, cached)
+z_values = coords[:, 2].tolist()
+sorted_by_height = geometry_cache.derived("z_descending", geometry_cache.z_descending).tolist()
 
 # for quick lookup, create rank → LED index mapping
 # Example: sorted_z_order[0] = highest LED, sorted_z_order[-1] = lowest
@@ -59,18 +56,21 @@ z_max = max(z_values)
 # Snowflake class using true vertical ordering
 # --------------------------------------------------------------
 class Flake:
-    def __init__(self):
+    def __init__(self, order=None):
+        # LED indices top to bottom the flake falls through (zones.py
+        # passes one zone's LEDs; default: the whole tree)
+        self.order = sorted_z_order if order is None else order
         self.reset()
 
     def reset(self):
         # start near top (random X/Y LED but HIGH Z rank)
-        start_rank = random.randint(0, max(3, LED_COUNT // 10))
-        self.position = start_rank                 # position in sorted_z_order list
+        start_rank = random.randint(0, max(3, len(self.order) // 10))
+        self.position = min(start_rank, len(self.order) - 1)    # position in self.order
         self.brightness = BRIGHTNESS_MAX
 
     def update(self):
         # Move downward along sorted order (larger index → lower physically)
-        self.position = min(self.position + FALL_SPEED, LED_COUNT - 1)
+        self.position = min(self.position + FALL_SPEED, len(self.order) - 1)
 
         # Fade as it falls
         self.brightness = max(BRIGHTNESS_MIN, self.brightness - FADE_RATE)
@@ -83,13 +83,13 @@ class Flake:
             )
 
         # Respawn when reaching the bottom
-        if self.position >= LED_COUNT - 1:
+        if self.position >= len(self.order) - 1:
             self.reset()
 
     @property
     def led(self):
         # convert float position to nearest LED index
-        return sorted_z_order[int(self.position)]
+        return self.order[int(self.position)]
 
 
 # --------------------------------------------------------------
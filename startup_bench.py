@@ -0,0 +1,248 @@
+# startup_bench.py — time-to-first-frame for every scheduled animation
+#
+# Launches each animation the way tree_scheduler.py does (a fresh python3
+# process) with a stand-in rpi_ws281x.  Two times are measured from spawn:
+#
+#     poster   the first show() that lights a pixel: fast_start's poster
+#              frame, or the animation's own frame under --cold
+#     frame    the first show() after show_first_frame() returned, i.e.
+#              the first frame the animation rendered itself (dark or not)
+#
+# Each is the median of several runs.  The poster must be up within
+# TARGET_MS.  Every animation renders with numpy, whose import alone
+# takes about as long as that on a Pi 4.  So the rendered frame is held
+# to the bare `import numpy` time plus SETUP_TARGET_MS for the script's
+# own imports and precomputation.  The bench exits 1 if any animation
+# misses either target.
+#
+#     python3 startup_bench.py                    # all animations in animations.ANIMATIONS
+#     python3 startup_bench.py snake.py --runs 5
+#     python3 startup_bench.py --cold             # without fast_start's poster frame
+#     python3 startup_bench.py --capture          # (re)record poster frames first
+#
+# --capture runs each animation until its POSTER_FRAME-th lit frame and
+# saves that frame for fast_start.show_first_frame().  --poster-only
+# skips the rendered-frame check (still reported).
+#
+# The targets are for a Pi 4.  The bare interpreter start and the numpy
+# import are printed as floors.
+
+import os
+import sys
+import time
+
+TARGET_MS    = 150         # spawn to poster frame
+SETUP_TARGET_MS = 100      # rendered frame, beyond the bare numpy import
+RUNS         = 3
+TIMEOUT      = 60          # seconds before a run counts as never showing a frame
+POSTER_FRAME = 60
+MARKER       = "@@first_frame"        # first lit show(): poster or rendered
+RENDER_MARKER = "@@first_render"      # first show() the animation rendered
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------------------------------------------
+# Child side: stand-in strip, kept to stdlib so it adds nothing to startup
+# ----------------------------------------------------
+class BenchStrip:
+    capture = None          # animation name when recording a poster
+    lit_frames = 0
+    poster_done = False     # show_first_frame() has returned
+    rendered = False
+
+    def __init__(self, num, pin=18, freq_hz=800000, dma=10, invert=False,
+                 brightness=255, channel=0, strip_type=None, gamma=None):
+        self._pixels = [0] * num
+        self._brightness = brightness
+
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return len(self._pixels)
+
+    def setPixelColor(self, n, color):
+        self._pixels[n] = color
+
+    def setPixelColorRGB(self, n, red, green, blue, white=0):
+        self._pixels[n] = _color(red, green, blue, white)
+
+    def getPixelColor(self, n):
+        return self._pixels[n]
+
+    def setBrightness(self, brightness):
+        self._brightness = brightness
+
+    def getBrightness(self):
+        return self._brightness
+
+    def show(self):
+        lit = any(self._pixels)
+        if lit:
+            BenchStrip.lit_frames += 1
+            if BenchStrip.lit_frames == 1:
+                print(MARKER, repr(time.time()), flush=True)
+        if BenchStrip.poster_done and not BenchStrip.rendered:
+            # dark frames count: a sweep may start off the tree
+            BenchStrip.rendered = True
+            print(RENDER_MARKER, repr(time.time()), flush=True)
+            if BenchStrip.capture is None:
+                os._exit(0)
+        if not lit:
+            return
+        if BenchStrip.capture and BenchStrip.lit_frames >= POSTER_FRAME:
+            import fast_start
+            fast_start.save_poster(BenchStrip.capture, self._pixels, self._brightness)
+            os._exit(0)
+
+
+def _color(red, green, blue, white=0):
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+def run_child(script, cold=False, capture=False):
+    import types
+    import runpy
+
+    fake = types.ModuleType("rpi_ws281x")
+    fake.PixelStrip = BenchStrip
+    fake.Adafruit_NeoPixel = BenchStrip
+    fake.Color = _color
+    sys.modules["rpi_ws281x"] = fake
+
+    script = os.path.abspath(script)
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script]
+    if capture:
+        BenchStrip.capture = script
+
+    import fast_start
+    show_first_frame = fast_start.show_first_frame
+
+    def timed_first_frame(name):
+        if not (cold or capture):
+            show_first_frame(name)
+        BenchStrip.poster_done = True
+
+    fast_start.show_first_frame = timed_first_frame
+    runpy.run_path(script, run_name="__main__")
+
+
+# ----------------------------------------------------
+# Parent side
+# ----------------------------------------------------
+def time_to_first_frame(script, cold=False, capture=False):
+    """(poster, rendered): seconds from spawn to each first lit show(), None if never."""
+    import subprocess
+
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", script]
+    if cold:
+        cmd.append("--cold")
+    if capture:
+        cmd.append("--capture")
+
+    t0 = time.time()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True, cwd=BASE_DIR)
+    first = rendered = None
+    try:
+        deadline = t0 + TIMEOUT
+        for line in proc.stdout:
+            if line.startswith(MARKER):
+                first = float(line.split()[1]) - t0
+            elif line.startswith(RENDER_MARKER):
+                rendered = float(line.split()[1]) - t0
+                if not capture:
+                    break
+            if time.time() > deadline:
+                break
+        if capture:
+            proc.wait(timeout=max(1, deadline - time.time()))
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+    return first, rendered
+
+
+def _median(times):
+    return sorted(times)[len(times) // 2]
+
+
+def interpreter_floor(runs, code="pass"):
+    import subprocess
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.call([sys.executable, "-c", code])
+        times.append(time.perf_counter() - t0)
+    return _median(times)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Time-to-first-frame benchmark")
+    parser.add_argument("scripts", nargs="*",
+                        help="animations to measure (default: animations.ANIMATIONS)")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS,
+                        help="poster frame target")
+    parser.add_argument("--setup-target-ms", type=float, default=SETUP_TARGET_MS,
+                        help="rendered frame target, on top of the numpy import")
+    parser.add_argument("--cold", action="store_true",
+                        help="measure without the fast_start poster frame")
+    parser.add_argument("--capture", action="store_true",
+                        help="record each animation's poster frame before measuring")
+    parser.add_argument("--poster-only", action="store_true",
+                        help="hold only the poster frame to the target")
+    args = parser.parse_args()
+
+    scripts = args.scripts
+    if not scripts:
+        from animations import ANIMATIONS
+        scripts = ANIMATIONS
+
+    if args.capture:
+        for script in scripts:
+            ok = time_to_first_frame(script, capture=True)[0] is not None
+            print(f"  poster {script:18s} {'saved' if ok else 'FAILED (no lit frame)'}")
+
+    floor = interpreter_floor(args.runs)
+    numpy_floor = interpreter_floor(args.runs, "import numpy")
+    frame_target = numpy_floor * 1000 + args.setup_target_ms
+    print(f"python3 start (floor): {floor * 1000:6.0f} ms   poster target {args.target_ms:.0f} ms"
+          f"{'   [cold, no poster]' if args.cold else ''}")
+    print(f"import numpy (floor):  {numpy_floor * 1000:6.0f} ms   frame target "
+          f"{frame_target:.0f} ms (+{args.setup_target_ms:.0f})")
+
+    print(f"  {'':18s} {'poster':>9s} {'frame':>9s}")
+
+    failed = []
+    for script in scripts:
+        runs = [time_to_first_frame(script, cold=args.cold) for _ in range(args.runs)]
+        posters = [p for p, _ in runs]
+        frames = [f for _, f in runs]
+        if None in posters or None in frames:
+            print(f"  {script:18s}   no lit frame within {TIMEOUT}s")
+            failed.append(script)
+            continue
+        poster, frame = _median(posters) * 1000, _median(frames) * 1000
+        slow = poster > args.target_ms or (frame > frame_target and not args.poster_only)
+        print(f"  {script:18s} {poster:6.0f} ms {frame:6.0f} ms  "
+              f"(min {min(frames) * 1000:.0f})  {'SLOW' if slow else 'ok'}")
+        if slow:
+            failed.append(script)
+
+    if failed:
+        print(f"{len(failed)} over target: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], cold="--cold" in sys.argv, capture="--capture" in sys.argv)
+    else:
+        main()
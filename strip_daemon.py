@@ -0,0 +1,457 @@
+# strip_daemon.py — one long-lived process owns the LED strip
+#
+# Without it every animation opens its own PixelStrip on DMA channel 10.
+# During a scheduler switch the old and new process can overlap on the
+# channel, and the tree shows garbage or a stale frame.  With the daemon
+# running, animations never touch the hardware.  fast_start.strip() hands
+# them a DaemonStrip instead, which draws straight into shared memory.
+#
+#     python3 strip_daemon.py              # on the Pi, before the scheduler
+#     python3 tree_simulator.py strip_daemon.py   # the same in the browser
+#
+# Shared memory (SHM_PATH, little-endian): a 64-byte header, then SLOTS
+# frames of led_count native u32 colors.
+#     u32 magic, u32 led_count, u32 front (slot last published),
+#     u32 brightness, u32 client_pid, u32 daemon_pid,
+#     u32 seq[SLOTS] (odd = client writing that slot), u32 reserved,
+#     u64 published (frames published so far)
+#
+# A client draws into the slot after `front`.  It marks the slot odd
+# while drawing, even when done, then moves `front` to it and sends an
+# empty datagram to NOTIFY_ADDR.  setPixelColor() and frame() write the
+# slot in place, so nothing is copied on the client side.  The daemon
+# wakes on the datagram, copies the front slot (retrying if its seq moved
+# mid-copy) into its last good frame, and shows it.
+#
+# A client that crashes mid-frame never moves `front`, so its torn slot
+# is never shown.  Without notifications the daemon re-shows the last good
+# frame every REFRESH_INTERVAL.  So the tree holds its picture through
+# crashes and scheduler switches.
+#
+# A restarted daemon replaces SHM_PATH with a new file.  A client notices
+# the new inode on its next show() and re-attaches, carrying its last
+# frame over.  Once a daemon claims the strip (NOTIFY_ADDR is bound, even
+# while it is still starting up), connect() waits for its shared memory
+# and raises rather than let an animation open the DMA channel itself.
+#
+# The client half only uses the standard library, so fast_start can
+# import it before numpy.
+#
+#     python3 strip_daemon.py --selftest   # daemon vs a 50 fps client, fake strip
+
+import os
+import sys
+import time
+import mmap
+import errno
+import struct
+import select
+import socket
+import signal
+from array import array
+
+SHM_DIR     = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+SHM_PATH    = os.path.join(SHM_DIR, "maexmastree_frames")
+NOTIFY_ADDR = "\0maexmastree_strip"    # abstract unix socket: nothing to clean up
+
+MAGIC       = 0x54524545               # "TREE"
+SLOTS       = 3
+HEADER      = struct.Struct("<IIIIII3IIQ")
+HEADER_SIZE = 64
+FRONT_OFFSET      = 8                  # byte offsets into the header
+BRIGHTNESS_OFFSET = 12
+CLIENT_OFFSET     = 16
+SEQ_OFFSET        = 24
+PUBLISHED_OFFSET  = 40
+
+REFRESH_INTERVAL = 1.0     # seconds between re-shows of the last good frame
+COPY_RETRIES     = 5       # torn-read retries before keeping the last good frame
+START_TIMEOUT    = 30.0    # seconds a claimed strip may take to get its shared memory
+
+
+def _slot_offset(led_count, slot):
+    return HEADER_SIZE + slot * led_count * 4
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+def _attach(led_count=None, path=SHM_PATH):
+    """(mmap, led_count, inode) of a live daemon's shared memory, or None."""
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return None
+    try:
+        st = os.fstat(fd)
+        if st.st_size < HEADER_SIZE:
+            return None
+        mm = mmap.mmap(fd, st.st_size)
+    finally:
+        os.close(fd)
+    magic, count, _, _, _, daemon_pid, *_ = HEADER.unpack_from(mm, 0)
+    if (magic != MAGIC or not _pid_alive(daemon_pid)
+            or (led_count is not None and count != led_count)
+            or st.st_size < _slot_offset(count, SLOTS)):
+        mm.close()
+        return None
+    return mm, count, st.st_ino
+
+
+def daemon_running(path=SHM_PATH):
+    attached = _attach(path=path)
+    if attached is None:
+        return False
+    attached[0].close()
+    return True
+
+
+def daemon_claimed(addr=NOTIFY_ADDR):
+    """True once a daemon has bound NOTIFY_ADDR, also while it is still starting up."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sock.sendto(b"", addr)    # at worst one spurious re-show
+        return True
+    except BlockingIOError:
+        return True               # bound, its queue is just full
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+# ----------------------------------------------------
+# Client side (stdlib only)
+# ----------------------------------------------------
+class DaemonStrip:
+    """PixelStrip-compatible strip that publishes frames to strip_daemon.py."""
+
+    def __init__(self, mm, led_count, inode, path=SHM_PATH, addr=NOTIFY_ADDR):
+        self._mm = mm
+        self._count = led_count
+        self._inode = inode
+        self._path = path
+        self._addr = addr
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        struct.pack_into("<I", mm, CLIENT_OFFSET, os.getpid())
+        self._slot = None
+        self._open_slot()
+
+    @classmethod
+    def connect(cls, led_count=None, timeout=START_TIMEOUT, path=SHM_PATH, addr=NOTIFY_ADDR):
+        """
+        A DaemonStrip if a daemon owns the strip, else None.  Waits up to
+        `timeout` for a daemon that is still starting; raises RuntimeError
+        if it never gets ready or drives a different LED count.
+        """
+        attached = _attach(path=path)
+        if attached is None and daemon_claimed(addr):
+            deadline = time.monotonic() + timeout
+            while attached is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                attached = _attach(path=path)
+            if attached is None:
+                raise RuntimeError(f"[StripDaemon] a strip daemon holds the strip but "
+                                   f"published no frames in {path} within {timeout:.0f}s")
+        if attached is None:
+            return None
+        mm, count, inode = attached
+        if led_count is not None and count != led_count:
+            mm.close()
+            raise RuntimeError(f"[StripDaemon] the strip daemon drives {count} LEDs, "
+                               f"not {led_count}")
+        return cls(mm, count, inode, path, addr)
+
+    def _seq(self, slot):
+        return struct.unpack_from("<I", self._mm, SEQ_OFFSET + 4 * slot)[0]
+
+    def _set_seq(self, slot, value):
+        struct.pack_into("<I", self._mm, SEQ_OFFSET + 4 * slot, value & 0xFFFFFFFF)
+
+    def _open_slot(self):
+        """Start drawing the slot after `front`, seeded with the current frame."""
+        front = struct.unpack_from("<I", self._mm, FRONT_OFFSET)[0] % SLOTS
+        slot = (front + 1) % SLOTS
+        self._set_seq(slot, self._seq(slot) | 1)    # odd: drawing
+        start, size = _slot_offset(self._count, slot), self._count * 4
+        src = _slot_offset(self._count, front)
+        self._mm[start:start + size] = self._mm[src:src + size]
+        self._slot = slot
+        self._pixels = memoryview(self._mm)[start:start + size].cast("I")
+
+    def _follow_daemon(self):
+        """Re-attach if a restarted daemon replaced the shared memory; True if it did."""
+        try:
+            if os.stat(self._path).st_ino == self._inode:
+                return False
+        except OSError:
+            return False    # daemon gone: keep drawing, a new one re-creates the file
+        attached = _attach(path=self._path)
+        if attached is None:
+            return False    # the new daemon is not up yet
+        mm, count, inode = attached
+        if count != self._count:
+            raise RuntimeError(f"[StripDaemon] the restarted strip daemon drives {count} LEDs, "
+                               f"not {self._count}")
+        brightness = self.getBrightness()
+        # the old mapping is left to the garbage collector: views of it may still exist
+        self._mm, self._inode = mm, inode
+        struct.pack_into("<I", mm, CLIENT_OFFSET, os.getpid())
+        self.setBrightness(brightness)
+        return True
+
+    # ---- PixelStrip-compatible drawing API ----
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return self._count
+
+    def setPixelColor(self, n, color):
+        self._pixels[n] = color & 0xFFFFFFFF
+
+    def getPixelColor(self, n):
+        return self._pixels[n]
+
+    def frame(self):
+        """Writable u32 view of the frame being drawn (np.frombuffer-able), zero-copy."""
+        return self._pixels
+
+    def write_frame(self, colors):
+        if hasattr(colors, "astype"):
+            colors = colors.astype("uint32", copy=False)
+        elif not isinstance(colors, (memoryview, array)):
+            colors = array("I", colors)
+        self._pixels[:] = colors
+
+    def setBrightness(self, brightness):
+        struct.pack_into("<I", self._mm, BRIGHTNESS_OFFSET, brightness)
+
+    def getBrightness(self):
+        return struct.unpack_from("<I", self._mm, BRIGHTNESS_OFFSET)[0]
+
+    def show(self):
+        """Publish the drawn frame and wake the daemon."""
+        slot = self._slot
+        self._set_seq(slot, self._seq(slot) + 1)    # even: complete
+        struct.pack_into("<I", self._mm, FRONT_OFFSET, slot)
+        published = struct.unpack_from("<Q", self._mm, PUBLISHED_OFFSET)[0]
+        struct.pack_into("<Q", self._mm, PUBLISHED_OFFSET, published + 1)
+        try:
+            self._sock.sendto(b"", self._addr)
+        except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+            pass    # daemon busy or gone: it still re-shows the last good frame
+
+        last = self._pixels
+        if self._follow_daemon():
+            last = bytes(last)    # this frame, for the new daemon's next show
+            self._open_slot()
+            self._pixels[:] = memoryview(last).cast("I")
+            self.show()
+        else:
+            self._open_slot()
+
+
+# ----------------------------------------------------
+# Daemon side
+# ----------------------------------------------------
+running = True
+
+def handle_exit(signum, frame):
+    global running
+    running = False
+
+
+def _create_shm(led_count, brightness, path=SHM_PATH):
+    size = _slot_offset(led_count, SLOTS)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        os.ftruncate(fd, size)
+        mm = mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+    HEADER.pack_into(mm, 0, MAGIC, led_count, 0, brightness, 0, os.getpid(), 0, 0, 0, 0, 0)
+    os.replace(tmp, path)    # clients never see a half-initialized block
+    return mm
+
+
+def _bind(addr=NOTIFY_ADDR):
+    """The daemon's non-blocking notify socket; claims the strip."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.bind(addr)
+    except OSError:
+        sock.close()
+        sys.exit("[StripDaemon] another strip daemon is already running")
+    sock.setblocking(False)
+    return sock
+
+
+def serve(strip, sock, led_count, brightness, path=SHM_PATH, keep_running=lambda: running):
+    """Show published frames on `strip` until keep_running() is False."""
+    import numpy as np
+    from led_output import FrameWriter
+
+    writer = FrameWriter(strip)
+    mm = _create_shm(led_count, brightness, path)
+    slots = [np.frombuffer(mm, dtype=np.uint32, count=led_count,
+                           offset=_slot_offset(led_count, k)) for k in range(SLOTS)]
+    seqs = np.frombuffer(mm, dtype=np.uint32, count=SLOTS, offset=SEQ_OFFSET)
+    last_good = np.zeros(led_count, dtype=np.uint32)
+    client = 0
+    print(f"[StripDaemon] {led_count} LEDs, frames in {path}", flush=True)
+
+    try:
+        while keep_running():
+            # wait for a notification (or the refresh), then drain the queue
+            # without blocking: several frames queued, only the newest matters
+            if select.select([sock], [], [], REFRESH_INTERVAL)[0]:
+                try:
+                    while True:
+                        sock.recv(1)
+                except (BlockingIOError, InterruptedError):
+                    pass
+
+            _, _, _, want, pid, *_ = HEADER.unpack_from(mm, 0)
+            if pid != client:
+                client = pid
+                print(f"[StripDaemon] client pid {pid} attached", flush=True)
+            for _ in range(COPY_RETRIES):
+                front = struct.unpack_from("<I", mm, FRONT_OFFSET)[0] % SLOTS
+                seq = int(seqs[front])
+                if seq & 1:
+                    continue    # first frame still being drawn
+                candidate = slots[front].copy()
+                if int(seqs[front]) == seq:
+                    last_good = candidate
+                    break
+
+            if want != brightness:
+                brightness = want
+                strip.setBrightness(brightness)
+            writer.write(last_good)
+            strip.show()
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        del slots, seqs    # views into mm must go before it can close
+        mm.close()
+
+
+def main():
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.signal(signal.SIGINT, handle_exit)
+
+    sock = _bind()    # claim the strip before the slow imports and strip setup
+    try:
+        import fast_start
+        from rpi_ws281x import PixelStrip
+
+        led_count = fast_start._led_count()
+        brightness = fast_start.LED_BRIGHTNESS
+        strip = PixelStrip(led_count, fast_start.LED_PIN, fast_start.LED_FREQ_HZ,
+                           fast_start.LED_DMA, fast_start.LED_INVERT, brightness,
+                           fast_start.LED_CHANNEL)
+        strip.begin()
+        serve(strip, sock, led_count, brightness)
+    finally:
+        sock.close()
+
+
+# ----------------------------------------------------
+# Self-test: a 50 fps client against the daemon loop, with a restart
+# ----------------------------------------------------
+class _RecordingStrip:
+    """Fake strip that records (time, value, torn) for every show()."""
+
+    def __init__(self, led_count):
+        self._count = led_count
+        self._frame = (0, False)
+        self.shown = []
+
+    def numPixels(self):
+        return self._count
+
+    def write_frame(self, colors):
+        self._frame = (int(colors[0]), int(colors.min()) != int(colors.max()))
+
+    def setBrightness(self, brightness):
+        pass
+
+    def show(self):
+        self.shown.append((time.monotonic(),) + self._frame)
+
+
+def selftest(fps=50, seconds=2.0, led_count=500, min_shown=0.9):
+    import tempfile
+    import threading
+
+    path = os.path.join(tempfile.mkdtemp(), "frames")
+    addr = f"\0maexmastree_selftest_{os.getpid()}"
+
+    def start_daemon():
+        strip, sock, alive = _RecordingStrip(led_count), _bind(addr), [True]
+        thread = threading.Thread(target=serve, daemon=True,
+                                  args=(strip, sock, led_count, 255, path, lambda: alive[0]))
+        thread.start()
+        return strip, lambda: (alive.__setitem__(0, False), thread.join(), sock.close())
+
+    def publish(client, first, count):
+        for value in range(first, first + count):
+            client.write_frame(array("I", [value]) * led_count)
+            client.show()
+            time.sleep(1.0 / fps)
+        time.sleep(0.1)    # let the daemon show the last one
+
+    frames = int(fps * seconds)
+    failures = []
+    strip, stop = start_daemon()
+    client = DaemonStrip.connect(led_count, path=path, addr=addr)
+    t0 = time.monotonic()
+    publish(client, 1, frames)
+    phases = [("first daemon", strip, t0, 1)]
+    stop()
+
+    strip, stop = start_daemon()
+    while not daemon_running(path):
+        time.sleep(0.01)
+    t0 = time.monotonic()
+    publish(client, frames + 1, frames)
+    phases.append(("restarted daemon", strip, t0, frames + 1))
+    stop()
+
+    for label, strip, t0, first in phases:
+        values = {v for t, v, _ in strip.shown if t >= t0 and first <= v < first + frames}
+        torn = sum(torn for _, _, torn in strip.shown)
+        last = strip.shown[-1][1] if strip.shown else None
+        print(f"[StripDaemon] {label}: showed {len(values)} of {frames} frames "
+              f"published at {fps} fps, {torn} torn, last {last}")
+        if len(values) < min_shown * frames:
+            failures.append(f"{label} showed only {len(values)} of {frames} frames")
+        if torn:
+            failures.append(f"{label} showed {torn} torn frames")
+        if last != first + frames - 1:
+            failures.append(f"{label} ended on frame {last}, not {first + frames - 1}")
+
+    if failures:
+        sys.exit("[StripDaemon] selftest FAILED: " + "; ".join(failures))
+    print("[StripDaemon] selftest ok")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        selftest()
+    else:
+        main()
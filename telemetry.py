@@ -0,0 +1,276 @@
+# telemetry.py — heartbeat + FPS status block shared by an animation and the scheduler
+#
+# The scheduler creates a small file on /dev/shm (tmpfs, i.e. shared
+# memory), zeroes it and passes its path to the animation in the
+# TREE_STATUS_PATH environment variable.  The animation calls
+# heartbeat.frame() once per frame; both sides mmap the same 128 bytes.
+# Long setup work calls heartbeat.alive() now and then: it refreshes
+# last_frame without counting a frame, so the scheduler does not take a
+# slow first launch for a stall.
+#
+# Layout (little-endian), guarded by a sequence counter so a reader never
+# sees a half-written record (odd seq = write in progress):
+#     u32 seq, u32 pid, u64 frames, f64 last_frame (time.time()),
+#     f64 fps (smoothed), f64 cpu_time (process seconds),
+#     memory (zero unless TREE_MEMSTATS is set):
+#     f64 bytes_per_frame, f64 blocks_per_frame (both smoothed),
+#     f64 rss (bytes), u32 gc_collections, u32 gc_gen2,
+#     f64 gc_pause_total, f64 gc_pause_max (seconds, max over the last
+#     REPORT_INTERVAL),
+#     u32 memo_hits, u32 memo_lookups (frame_memo.FrameMemo passed to
+#     heartbeat.track(); zero without one)
+#
+# Memory mode (TREE_MEMSTATS=1, or tree_scheduler.py --memstats):
+# tracemalloc measures the bytes allocated within each frame (traced peak
+# above the frame's starting level) and sys.getallocatedblocks() the net
+# block growth.  gc callbacks time every collection, and /proc gives RSS.
+# Every SNAPSHOT_INTERVAL a tracemalloc snapshot is diffed against the
+# previous one, and the lines whose allocations grew most go to stderr.
+# tracemalloc roughly doubles allocation cost, so keep this mode for
+# diagnosis runs.
+#
+# Run without the scheduler (variable unset) the heartbeat is a no-op,
+# unless memory mode is on; then it prints a status line every
+# REPORT_INTERVAL to stderr.
+
+import os
+import gc
+import sys
+import mmap
+import time
+import struct
+import tempfile
+import tracemalloc
+from collections import namedtuple
+
+ENV_VAR     = "TREE_STATUS_PATH"
+MEM_ENV_VAR = "TREE_MEMSTATS"
+SHM_DIR     = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+STATUS_PATH = os.path.join(SHM_DIR, "maexmastree_status")
+
+LAYOUT = struct.Struct("<IIQddddddIIddII")
+SIZE   = 128
+FPS_SMOOTHING = 0.05
+MEM_SMOOTHING = 0.05
+
+REPORT_INTERVAL   = 10      # seconds
+SNAPSHOT_INTERVAL = 60      # seconds between tracemalloc snapshot diffs
+SNAPSHOT_TOP      = 5
+
+Status = namedtuple("Status", ["pid", "frames", "last_frame", "fps", "cpu_time",
+                               "bytes_per_frame", "blocks_per_frame", "rss",
+                               "gc_collections", "gc_gen2", "gc_pause_total", "gc_pause_max",
+                               "memo_hits", "memo_lookups"])
+
+
+def _open(path):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size < SIZE:
+            os.ftruncate(fd, SIZE)
+        return mmap.mmap(fd, SIZE)
+    finally:
+        os.close(fd)
+
+
+# ----------------------------------------------------
+# Memory instrumentation
+# ----------------------------------------------------
+def _rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryStats:
+    def __init__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.bytes_per_frame = 0.0
+        self.blocks_per_frame = 0.0
+        self.rss = _rss()
+        self.gc_collections = 0
+        self.gc_gen2 = 0
+        self.gc_pause_total = 0.0
+        self.gc_pause_max = 0.0
+        self._pause_window_max = 0.0
+        self._window_start = time.time()
+        self._gc_start = None
+        self._frames = 0
+        self._blocks = sys.getallocatedblocks()
+        self._traced = tracemalloc.get_traced_memory()[0]
+        self._snapshot = tracemalloc.take_snapshot()
+        self._snapshot_time = time.time()
+        gc.callbacks.append(self._gc_event)
+
+    def _gc_event(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+            return
+        if self._gc_start is None:
+            return
+        pause = time.perf_counter() - self._gc_start
+        self._gc_start = None
+        self.gc_collections += 1
+        if info.get("generation") == 2:
+            self.gc_gen2 += 1
+        self.gc_pause_total += pause
+        self._pause_window_max = max(self._pause_window_max, pause)
+
+    def frame(self, now):
+        """Close the current frame's measurement window."""
+        traced, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        allocated = max(0, peak - self._traced)
+        grown = blocks - self._blocks
+        self._traced, self._blocks = traced, blocks
+
+        if self._frames == 0:
+            self.bytes_per_frame, self.blocks_per_frame = allocated, grown
+        else:
+            self.bytes_per_frame += MEM_SMOOTHING * (allocated - self.bytes_per_frame)
+            self.blocks_per_frame += MEM_SMOOTHING * (grown - self.blocks_per_frame)
+        self._frames += 1
+
+        if now - self._window_start >= REPORT_INTERVAL:
+            self.rss = _rss()
+            self.gc_pause_max = self._pause_window_max
+            self._pause_window_max = 0.0
+            self._window_start = now
+        else:
+            self.gc_pause_max = max(self.gc_pause_max, self._pause_window_max)
+
+        if now - self._snapshot_time >= SNAPSHOT_INTERVAL:
+            self._report_growth()
+            self._snapshot_time = now
+
+    def _report_growth(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        top = snapshot.compare_to(self._snapshot, "lineno")[:SNAPSHOT_TOP]
+        self._snapshot = snapshot
+        print(f"[Telemetry] allocation growth over the last {SNAPSHOT_INTERVAL}s:",
+              file=sys.stderr)
+        for stat in top:
+            frame = stat.traceback[0]
+            print(f"    {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  "
+                  f"{os.path.basename(frame.filename)}:{frame.lineno}", file=sys.stderr)
+
+    def fields(self):
+        return (self.bytes_per_frame, self.blocks_per_frame, float(self.rss),
+                self.gc_collections, self.gc_gen2, self.gc_pause_total, self.gc_pause_max)
+
+
+def format_memory(st):
+    """One log fragment for a Status with memory fields, '' if they are unset."""
+    if not st.rss:
+        return ""
+    return (f" rss={st.rss / 2**20:.1f}MB alloc={st.bytes_per_frame / 1024:.1f}KiB/frame "
+            f"blocks={st.blocks_per_frame:+.1f}/frame gc={st.gc_collections} "
+            f"(gen2 {st.gc_gen2}) gc_pause_max={st.gc_pause_max * 1000:.1f}ms")
+
+
+def format_memo(st):
+    """Frame memo hit rate as a log fragment, '' without a tracked memo."""
+    if not st.memo_lookups:
+        return ""
+    return f" memo_hits={st.memo_hits / st.memo_lookups:.1%}"
+
+
+# ----------------------------------------------------
+# Animation side
+# ----------------------------------------------------
+class Heartbeat:
+    def __init__(self, path=None, memstats=None):
+        path = path or os.environ.get(ENV_VAR)
+        if memstats is None:
+            memstats = os.environ.get(MEM_ENV_VAR, "") not in ("", "0")
+        self._mm = _open(path) if path else None
+        self.mem = MemoryStats() if memstats else None
+        self.memo = None
+        self._seq = 0
+        self._frames = 0
+        self._fps = 0.0
+        self._last = None
+        self._last_report = time.time()
+        self._memory = (0.0, 0.0, 0.0, 0, 0, 0.0, 0.0)
+
+    def track(self, memo):
+        """Publish a frame_memo.FrameMemo's hit counts with every frame."""
+        self.memo = memo
+
+    def frame(self):
+        """Call once per shown frame."""
+        if self._mm is None and self.mem is None:
+            return
+        now = time.time()
+        if self._last is not None and now > self._last:
+            fps = 1.0 / (now - self._last)
+            self._fps = fps if self._frames < 2 else self._fps + FPS_SMOOTHING * (fps - self._fps)
+        self._last = now
+        self._frames += 1
+
+        if self.mem is not None:
+            self.mem.frame(now)
+            self._memory = self.mem.fields()
+
+        if self._mm is None:
+            # memory mode without the scheduler: report on stderr
+            if now - self._last_report >= REPORT_INTERVAL:
+                self._last_report = now
+                st = Status(os.getpid(), self._frames, now, self._fps,
+                            time.process_time(), *self._memory, *self._memo_counts())
+                print(f"[Telemetry] frames={st.frames} fps={st.fps:.1f}"
+                      f"{format_memory(st)}{format_memo(st)}", file=sys.stderr)
+            return
+        self._publish(now)
+
+    def alive(self):
+        """Call during long setup: shows progress to the scheduler without counting a frame."""
+        if self._mm is not None:
+            self._publish(time.time())
+
+    def _memo_counts(self):
+        if self.memo is None:
+            return (0, 0)
+        return (self.memo.hits & 0xFFFFFFFF, self.memo.lookups & 0xFFFFFFFF)
+
+    def _publish(self, now):
+        self._seq += 1    # odd: writing
+        struct.pack_into("<I", self._mm, 0, self._seq)
+        LAYOUT.pack_into(self._mm, 0, self._seq, os.getpid(), self._frames, now,
+                         self._fps, time.process_time(), *self._memory, *self._memo_counts())
+        self._seq += 1    # even: stable
+        struct.pack_into("<I", self._mm, 0, self._seq)
+
+
+# ----------------------------------------------------
+# Scheduler side
+# ----------------------------------------------------
+class StatusReader:
+    def __init__(self, path=STATUS_PATH):
+        self.path = path
+        self._mm = _open(path)
+
+    def reset(self):
+        """Zero the block before launching a new animation."""
+        self._mm[:SIZE] = bytes(SIZE)
+
+    def read(self):
+        """Latest consistent Status (frames is 0 while only alive() has beaten),
+        or None if nothing was published yet."""
+        for _ in range(100):
+            seq, *fields = LAYOUT.unpack_from(self._mm, 0)
+            if seq & 1:
+                continue
+            if struct.unpack_from("<I", self._mm, 0)[0] == seq:
+                st = Status(*fields)
+                return st if st.last_frame else None
+        return None
+
+    def close(self):
+        self._mm.close()
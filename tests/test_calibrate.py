@@ -0,0 +1,10 @@
+import numpy as np
+
+import calibrate
+
+
+def test_selftest_recovers_perturbed_tree():
+    before, after, _, views = calibrate.synthetic_errors(workers=1)
+    assert views == 4
+    assert np.median(after) < calibrate.SELFTEST_MAX_ERROR
+    assert np.median(after) < np.median(before) / 3
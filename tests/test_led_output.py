@@ -0,0 +1,56 @@
+import ctypes
+import sys
+import types
+
+import numpy as np
+
+from led_output import FrameWriter
+
+
+class FakeChannel:
+    """Stands in for the SWIG ws2811_channel_t: owns the C LED buffer."""
+
+    def __init__(self, count):
+        self.leds = (ctypes.c_uint32 * count)()
+
+
+def fake_strip(count, monkeypatch):
+    channel = FakeChannel(count)
+    ws = types.ModuleType("ws")
+    ws.ws2811_channel_t_leds_get = lambda ch: ctypes.addressof(ch.leds)
+    module = types.ModuleType("fake_rpi_ws281x")
+    module.ws = ws
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+
+    class PixelStrip:
+        def __init__(self):
+            self._channel = channel
+
+        def numPixels(self):
+            return count
+
+        def setPixelColor(self, n, color):
+            raise AssertionError("bulk path must not set pixels one by one")
+
+    PixelStrip.__module__ = module.__name__
+    return PixelStrip(), channel
+
+
+def test_bulk_write_lands_in_led_buffer(monkeypatch):
+    strip, channel = fake_strip(300, monkeypatch)
+    writer = FrameWriter(strip)
+    assert writer.mode == "bulk"
+
+    colors = np.arange(300, dtype=np.uint32) * 0x010203
+    writer.write(colors)
+    assert list(channel.leds) == colors.tolist()
+
+    # lists and other dtypes are converted to packed u32
+    writer.write([7] * 300)
+    assert list(channel.leds) == [7] * 300
+
+
+def test_unbegun_strip_falls_back_to_per_pixel(monkeypatch):
+    strip, _ = fake_strip(10, monkeypatch)
+    sys.modules[type(strip).__module__].ws.ws2811_channel_t_leds_get = lambda ch: 0
+    assert FrameWriter(strip).mode == "per-pixel"
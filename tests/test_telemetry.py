@@ -0,0 +1,22 @@
+import time
+
+from telemetry import Heartbeat, StatusReader
+
+
+def test_alive_is_visible_before_the_first_frame(tmp_path):
+    path = str(tmp_path / "status")
+    reader = StatusReader(path)
+    reader.reset()
+    assert reader.read() is None
+
+    heartbeat = Heartbeat(path, memstats=False)
+    before = time.time()
+    heartbeat.alive()
+    st = reader.read()
+    assert st is not None
+    assert st.frames == 0
+    assert st.last_frame >= before
+
+    heartbeat.frame()
+    assert reader.read().frames == 1
+    reader.close()
@@ -0,0 +1,39 @@
+import os
+
+import thermal
+
+
+def write_sysfs(root, temp=None, throttled=None):
+    for rel, value in ((thermal.TEMP_PATH, temp), (thermal.THROTTLED_PATH, throttled)):
+        if value is None:
+            continue
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(value + "\n")
+    return str(root)
+
+
+def test_throttled_is_plain_hex(tmp_path):
+    st = thermal.read_state(write_sysfs(tmp_path, "71500", "5000a"))
+    assert st.throttled == 0x5000A
+    assert st.temp == 71.5
+    assert st.headroom == 0.0    # 0xa: frequency capped + soft temp limit
+
+
+def test_throttled_accepts_prefix_and_past_only_bits(tmp_path):
+    st = thermal.read_state(write_sysfs(tmp_path, "50000", "0x50000"))
+    assert st.throttled == 0x50000
+    assert st.headroom == 1.0    # only "has occurred" bits set
+
+
+def test_unparsable_throttled_is_unknown(tmp_path, capsys):
+    st = thermal.read_state(write_sysfs(tmp_path, "70000", "garbage"))
+    assert st.throttled == 0
+    assert st.headroom == 0.5
+    assert "get_throttled" in capsys.readouterr().out
+
+
+def test_missing_files_mean_full_headroom(tmp_path):
+    st = thermal.read_state(str(tmp_path))
+    assert (st.temp, st.throttled, st.headroom) == (None, 0, 1.0)
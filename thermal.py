@@ -0,0 +1,70 @@
+# thermal.py — CPU temperature, throttle state and headroom from sysfs
+#
+# tree_scheduler.py uses this to pick cheaper animations on hot days.
+# All paths are relative to a sysfs root, "/" unless TREE_SYSFS_ROOT
+# points somewhere else.  A test can build a fake tree such as
+#     <root>/sys/class/thermal/thermal_zone0/temp                  "71500"
+#     <root>/sys/devices/platform/soc/soc:firmware/get_throttled   "20002"
+# and pass root=<root>.  get_throttled is plain hex without a prefix
+# (e.g. "5000a").  Missing or unparsable files read as "unknown" and
+# count as full headroom.
+#
+# Headroom is 1.0 at or below TEMP_COOL, falls linearly to 0.0 at
+# TEMP_LIMIT (the Pi 4 starts soft-throttling at 80 C), and is 0.0
+# whenever the firmware reports active throttling or frequency capping.
+
+import os
+from collections import namedtuple
+
+ROOT_ENV_VAR = "TREE_SYSFS_ROOT"
+
+TEMP_PATH      = "sys/class/thermal/thermal_zone0/temp"
+THROTTLED_PATH = "sys/devices/platform/soc/soc:firmware/get_throttled"
+
+TEMP_COOL  = 60.0     # degrees C, full headroom below this
+TEMP_LIMIT = 80.0     # degrees C, no headroom from here on
+
+# get_throttled bits describing the current state (16+ are "has occurred")
+UNDER_VOLTAGE  = 1 << 0
+FREQ_CAPPED    = 1 << 1
+THROTTLED      = 1 << 2
+SOFT_TEMP      = 1 << 3
+THROTTLE_NOW   = FREQ_CAPPED | THROTTLED | SOFT_TEMP
+
+ThermalState = namedtuple("ThermalState", ["temp", "throttled", "headroom"])
+
+
+def _read(root, rel):
+    try:
+        with open(os.path.join(root, rel)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_state(root=None):
+    root = root or os.environ.get(ROOT_ENV_VAR, "/")
+
+    raw = _read(root, TEMP_PATH)
+    temp = int(raw) / 1000.0 if raw else None
+
+    raw = _read(root, THROTTLED_PATH)
+    try:
+        throttled = int(raw, 16) if raw else 0
+    except ValueError:
+        print(f"[Thermal] unreadable get_throttled value {raw!r}, treating as 0")
+        throttled = 0
+
+    if throttled & THROTTLE_NOW:
+        headroom = 0.0
+    elif temp is None:
+        headroom = 1.0
+    else:
+        headroom = min(1.0, max(0.0, (TEMP_LIMIT - temp) / (TEMP_LIMIT - TEMP_COOL)))
+    return ThermalState(temp, throttled, headroom)
+
+
+def describe(state):
+    temp = "?" if state.temp is None else f"{state.temp:.1f}C"
+    flags = f" throttled=0x{state.throttled:x}" if state.throttled & 0xF else ""
+    return f"temp={temp}{flags} headroom={state.headroom:.2f}"
@@ -1,7 +1,13 @@
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
 import json
 import random
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import Color
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 # ----------------------------
 # LED STRIP CONFIG
@@ -31,11 +37,10 @@ z_max = max(z_values)
 # ----------------------------
 # INITIALIZE LED STRIP
 # ----------------------------
-strip = PixelStrip(
+strip = fast_start.strip(
     LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA,
     LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
-strip.begin()
 
 # ----------------------------
 # COLOR HELPERS (GRB ORDER)
@@ -101,6 +106,7 @@ def vertical_sweep(
                     strip.setPixelColor(idx, color_grb(0, 0, 0))
 
             strip.show()
+            heartbeat.frame()
             time.sleep(frame_delay)
 
             z_top -= step
@@ -115,7 +121,6 @@ def vertical_sweep(
 if __name__ == "__main__":
     try:
         print("Starting vertical top-to-bottom Xmas sweep...")
-        clear_strip()
         # cycles=0 → loop forever; set e.g. cycles=5 to stop after 5 passes
         vertical_sweep(
             band_height_frac=0.10,  # 10% of tree height
@@ -0,0 +1,166 @@
+# trail_kernels.py — persistent integer pixel buffers with in-place kernels
+#
+# Trail effects (matrix_rain.py's fading green tails, fireworks.py's
+# overlapping blasts) used to rebuild Python lists of tuples every frame.
+# A TrailBuffer keeps one uint8 (N, channels) array for the whole run and
+# updates it in place:
+#
+#   decay(factor)                 value = value * factor, 8.8 fixed point
+#   max_merge(idx, values)        value[idx] = max(value[idx], values)
+#   accumulate(idx, values, factor, scratch)
+#                                 sum[idx] += values * factor, 8.8 fixed point
+#   saturate()                    value = min(sum, 255), sum starts over at 0
+#   pack_grb(out)                 value -> packed GRB uint32, written into out
+#
+# All work happens in preallocated uint8/uint16/uint32 arrays, so a
+# frame allocates nothing per pixel (only small per-drop temporaries;
+# callers keep one scratch array per firework for accumulate()).
+#
+# Run this file to measure per-frame allocations (tracemalloc: peak
+# transient bytes per frame and live blocks left behind) of the old
+# list-based matrix_rain frame against the kernels.  Tuple free lists
+# hide part of the old version's churn, so its numbers are a lower bound:
+#     python3 trail_kernels.py
+
+import time
+import random
+import tracemalloc
+import numpy as np
+
+
+class TrailBuffer:
+    def __init__(self, n, channels=3):
+        self.value = np.zeros((n, channels), dtype=np.uint8)
+        self._wide = np.zeros((n, channels), dtype=np.uint16)
+        self._sum = None       # accumulate() totals, allocated on first use
+        self._packed = None    # pack_grb() scratch
+
+    def clear(self):
+        self.value.fill(0)
+
+    def decay(self, factor, pool=None):
+        """Scale every value by `factor` (0..1) in 8.8 fixed point (split on `pool`)."""
+        q8 = int(round(factor * 256))
+
+        def kernel(sl):
+            value, wide = self.value[sl], self._wide[sl]
+            np.multiply(value, q8, out=wide, dtype=np.uint16)
+            np.right_shift(wide, 8, out=wide)
+            np.copyto(value, wide, casting="unsafe")
+
+        if pool is None:
+            kernel(slice(None))
+        else:
+            pool.run(kernel, len(self.value))
+
+    def max_merge(self, idx, values, channel=None):
+        """value[idx] = max(value[idx], values); repeated indices are fine."""
+        target = self.value if channel is None else self.value[:, channel]
+        np.maximum.at(target, idx, values)
+
+    def accumulate(self, idx, values, factor, scratch):
+        """
+        sum[idx] += values * factor (0..1, 8.8 fixed point); repeated indices
+        are fine.  `scratch` is a uint16 array shaped like `values`, kept by
+        the caller across frames.
+        """
+        if self._sum is None:
+            self._sum = np.zeros_like(self._wide)
+        np.multiply(values, int(round(factor * 256)), out=scratch, dtype=np.uint16)
+        np.right_shift(scratch, 8, out=scratch)
+        np.add.at(self._sum, idx, scratch)
+
+    def saturate(self):
+        """value = min(sum of this frame's accumulate() calls, 255); resets the sum."""
+        if self._sum is None:
+            self.value.fill(0)
+            return
+        np.minimum(self._sum, 255, out=self._sum)
+        np.copyto(self.value, self._sum, casting="unsafe")
+        self._sum.fill(0)
+
+    def pack_grb(self, out):
+        """Write value (RGB channels) into `out` as uint32 packed like GRB()."""
+        if self._packed is None:
+            self._packed = np.empty(self.value.shape, dtype=np.uint32)
+        wide = self._packed
+        np.copyto(wide, self.value)
+        r, g, b = wide[:, 0], wide[:, 1], wide[:, 2]
+        np.left_shift(g, 16, out=out)
+        np.left_shift(r, 8, out=r)
+        np.bitwise_or(out, r, out=out)
+        np.bitwise_or(out, b, out=out)
+        return out
+
+
+# ----------------------------------------------------
+# Allocation benchmark (matrix_rain-style frame, no strip)
+# ----------------------------------------------------
+def _old_frame(buffer, zs, sorted_by_z, drops, fade_factor):
+    new_buffer = []
+    for (r, g, b) in buffer:
+        new_buffer.append((0, int(g * fade_factor), 0))
+    buffer = new_buffer[:]
+    for pos, length, brightness in drops:
+        for idx in sorted_by_z:
+            z = zs[idx]
+            if pos - length <= z <= pos:
+                g = int(brightness * (1 - (pos - z) / length))
+                buffer[idx] = (0, max(buffer[idx][1], g), 0)
+    return buffer
+
+
+def _new_frame(trail, z_desc, neg_z_desc, order, drops, fade_factor):
+    trail.decay(fade_factor)
+    for pos, length, brightness in drops:
+        lo = np.searchsorted(neg_z_desc, -pos, side="left")
+        hi = np.searchsorted(neg_z_desc, -(pos - length), side="right")
+        g = brightness * (1 - (pos - z_desc[lo:hi]) / length)
+        trail.max_merge(order[lo:hi], g.astype(np.uint8), channel=1)
+
+
+def _measure(fn, frames):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_blocks = len(tracemalloc.take_snapshot().traces)
+    peak_bytes = 0
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - before
+    elapsed = time.perf_counter() - t0
+    blocks = len(tracemalloc.take_snapshot().traces) - start_blocks
+    tracemalloc.stop()
+    return peak_bytes / frames, blocks, elapsed / frames
+
+
+def benchmark(n=500, num_drops=12, frames=200):
+    rng = random.Random(0)
+    zs = [84 * i / (n - 1) for i in range(n)]
+    sorted_by_z = sorted(range(n), key=lambda i: zs[i], reverse=True)
+    drops = [(rng.uniform(0, 84), rng.randint(18, 33), rng.randint(180, 255))
+             for _ in range(num_drops)]
+
+    state = {"buffer": [(0, 0, 0)] * n}
+    def old():
+        state["buffer"] = _old_frame(state["buffer"], zs, sorted_by_z, drops, 0.78)
+
+    order = np.array(sorted_by_z)
+    z_desc = np.array(zs)[order]
+    neg_z_desc = -z_desc
+    trail = TrailBuffer(n)
+    def new():
+        _new_frame(trail, z_desc, neg_z_desc, order, drops, 0.78)
+
+    print(f"{n} LEDs, {num_drops} drops, {frames} frames (tracemalloc on, times inflated)")
+    for label, fn in (("list/tuple", old), ("kernels", new)):
+        peak, blocks, per_frame = _measure(fn, frames)
+        print(f"  {label:10s} transient {peak / 1024:8.1f} KiB/frame, "
+              f"{blocks:+5d} live blocks after run, {per_frame * 1000:6.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    benchmark()
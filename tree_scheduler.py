@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 import os
+import json
 import time
 import random
+import argparse
 import subprocess
 from datetime import datetime, timedelta
 import pytz
+from telemetry import (StatusReader, STATUS_PATH, ENV_VAR, MEM_ENV_VAR,
+                       format_memory, format_memo)
+import thermal
+from strip_daemon import daemon_running
+from quality_governor import QUALITY_ENV_VAR
+from animations import ANIMATIONS
 
 # -----------------------------
 # CONFIGURATION
@@ -19,22 +27,33 @@ ACTIVE_END_HOUR = 22             # 10 PM (22:00)
 
 PYTHON = "/usr/bin/python3"
 
-# Animations to select from (filenames inside ANIMATION_DIR)
-ANIMATIONS = [
-    "wind_swirl.py",
-    "double_helix.py",
-    "snake.py",
-    "matrix_rain.py",
-    "fireworks.py",
-    "contagious.py",
-    "candy_cane.py",
-    "light_beams.py",
-    "top_to_bottom.py",
-    "random_plane.py"
-]
-
 OFF_SCRIPT = "leds_off.py"
 
+# strip_daemon.py owns the strip for the scheduler's lifetime; animations
+# draw into its shared memory, so switches never fight over the DMA channel
+DAEMON_SCRIPT = "strip_daemon.py"
+DAEMON_START_TIMEOUT = 30        # seconds for it to open the strip and publish its frames
+
+# --profile SECONDS: run each animation under profiler.py for its first
+# SECONDS (output in ANIMATION_DIR/profiles/)
+PROFILER_SCRIPT = "profiler.py"
+PROFILE_WINDOW  = None
+
+# --memstats: animations report allocations, GC and RSS in their heartbeat
+MEMSTATS = False
+
+# Health checks (read from the animation's shared-memory heartbeat)
+STALL_TIMEOUT = 15               # seconds without a new frame -> restart
+MIN_FPS       = 5                # below this the animation is missing its budget
+LOW_FPS_GRACE = 60               # seconds below MIN_FPS before switching animations
+
+# Thermal / cost-aware selection
+COST_FILE      = os.path.join(ANIMATION_DIR, ".animation_costs.json")
+COST_SMOOTHING = 0.3             # EWMA weight of the newest run
+COST_FLOOR     = 0.25            # CPU share (of one core) still allowed at zero headroom
+QUALITY_FLOOR  = 0.3             # density requested from governed animations at zero headroom
+COLLAPSE_RATIO = 0.5             # switch when FPS stays below this share of the usual FPS
+
 # -----------------------------
 # HELPER FUNCTIONS
 # -----------------------------
@@ -64,9 +83,75 @@ def seconds_until_next_window_check():
     return max(5, int((target - now_est).total_seconds()))
 
 
-def start_animation(anim_path):
+# -----------------------------
+# COST PROFILES
+# -----------------------------
+class CostProfile:
+    """Per-animation CPU share and healthy FPS, learned from heartbeats and kept on disk."""
+
+    def __init__(self, path=COST_FILE):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.costs = json.load(f)
+        except (OSError, ValueError):
+            self.costs = {}
+
+    def cpu(self, anim):
+        return self.costs.get(anim, {}).get("cpu")
+
+    def fps(self, anim):
+        return self.costs.get(anim, {}).get("fps")
+
+    def record(self, anim, cpu, fps=None):
+        """Blend one run in; fps only when it ran with full thermal headroom."""
+        entry = self.costs.setdefault(anim, {})
+        for key, value in (("cpu", cpu), ("fps", fps)):
+            if value is None:
+                continue
+            old = entry.get(key)
+            entry[key] = value if old is None else old + COST_SMOOTHING * (value - old)
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.costs, f, indent=1, sort_keys=True)
+        except OSError as e:
+            print(f"[Scheduler] Could not save cost profile: {e}")
+
+
+def choose_animation(costs, state, exclude=None):
+    """
+    Random pick among the animations the current thermal headroom affords.
+    Unmeasured animations are always eligible so they get a cost profile.
+    """
+    budget = COST_FLOOR + (1 - COST_FLOOR) * state.headroom
+    pool = [a for a in ANIMATIONS if a != exclude] or ANIMATIONS
+    affordable = [a for a in pool if costs.cpu(a) is None or costs.cpu(a) <= budget]
+    if affordable:
+        return random.choice(affordable)
+    return min(pool, key=costs.cpu)
+
+
+def quality_for(state):
+    """Density cap handed to governed animations (1.0 = uncapped)."""
+    return QUALITY_FLOOR + (1 - QUALITY_FLOOR) * state.headroom
+
+
+def start_animation(anim_path, status=None, quality=1.0):
     print(f"[Scheduler] Starting animation: {anim_path}")
-    return subprocess.Popen([PYTHON, anim_path])
+    env = os.environ.copy()
+    if status is not None:
+        status.reset()
+        env[ENV_VAR] = status.path
+    if MEMSTATS:
+        env[MEM_ENV_VAR] = "1"
+    if quality < 1.0:
+        print(f"[Scheduler] Requesting reduced density: quality {quality:.2f}")
+        env[QUALITY_ENV_VAR] = f"{quality:.2f}"
+    cmd = [PYTHON, anim_path]
+    if PROFILE_WINDOW:
+        cmd = [PYTHON, os.path.join(ANIMATION_DIR, PROFILER_SCRIPT),
+               "--seconds", str(PROFILE_WINDOW), anim_path]
+    return subprocess.Popen(cmd, env=env)
 
 
 def stop_animation(proc):
@@ -79,6 +164,77 @@ def stop_animation(proc):
             proc.kill()
 
 
+def check_health(status, started, low_fps_since, expected_fps=None):
+    """
+    Log the animation's heartbeat and judge it.
+    "slow" means below MIN_FPS, or below COLLAPSE_RATIO of the animation's
+    usual FPS, for LOW_FPS_GRACE seconds.
+    Returns (verdict, low_fps_since) where verdict is None, "stalled" or "slow".
+    """
+    st = status.read()
+    now = time.time()
+    if st is None:
+        # no heartbeat yet: a stall once the startup grace is over
+        if now - started > STALL_TIMEOUT:
+            print("[Scheduler] No frames published yet")
+            return "stalled", None
+        return None, None
+
+    age = now - st.last_frame
+    if not st.frames:
+        # still setting up: alive() beats count, frames do not exist yet
+        print(f"[Scheduler] setting up, last heartbeat {age:.1f}s ago")
+        if age > STALL_TIMEOUT:
+            return "stalled", None
+        return None, None
+
+    cpu = st.cpu_time / max(1e-6, now - started) * 100
+    print(f"[Scheduler] frames={st.frames} fps={st.fps:.1f} "
+          f"last_frame={age:.1f}s ago cpu={cpu:.0f}%{format_memory(st)}{format_memo(st)}")
+
+    if age > STALL_TIMEOUT:
+        return "stalled", None
+
+    floor = MIN_FPS if expected_fps is None else max(MIN_FPS, COLLAPSE_RATIO * expected_fps)
+    if st.fps < floor:
+        low_fps_since = low_fps_since or now
+        if now - low_fps_since > LOW_FPS_GRACE:
+            return "slow", None
+        return None, low_fps_since
+    return None, None
+
+
+def record_cost(costs, anim, status, started, ran_cool):
+    """Fold the finished run's CPU share (and FPS, if it ran cool) into the profile."""
+    st = status.read()
+    elapsed = time.time() - started
+    if st is None or elapsed <= 0:
+        return
+    costs.record(anim, st.cpu_time / elapsed, st.fps if ran_cool and st.frames else None)
+
+
+def ensure_strip_daemon(proc):
+    """Start (or restart after a crash) the strip-owner daemon, unless one already runs."""
+    if (proc is not None and proc.poll() is None) or (proc is None and daemon_running()):
+        return proc
+    if proc is not None:
+        print(f"[Scheduler] Strip daemon exited ({proc.returncode}), restarting it")
+    proc = subprocess.Popen([PYTHON, os.path.join(ANIMATION_DIR, DAEMON_SCRIPT)])
+
+    # no animation starts before the daemon's shared memory is up; the
+    # running one re-attaches by itself after a restart
+    deadline = time.time() + DAEMON_START_TIMEOUT
+    while not daemon_running():
+        if proc.poll() is not None:
+            print(f"[Scheduler] Strip daemon failed to start ({proc.returncode})")
+            break
+        if time.time() > deadline:
+            print(f"[Scheduler] Strip daemon not ready after {DAEMON_START_TIMEOUT}s")
+            break
+        time.sleep(0.1)
+    return proc
+
+
 def turn_off_leds():
     print("[Scheduler] Turning LEDs OFF")
     subprocess.call([PYTHON, os.path.join(ANIMATION_DIR, OFF_SCRIPT)])
@@ -91,14 +247,33 @@ def main():
     current_proc = None
     last_switch_time = 0
     leds_are_off = False
+    status = StatusReader(STATUS_PATH)
+    costs = CostProfile()
+    low_fps_since = None
+    anim = anim_path = None
+    ran_cool = True
+    daemon = None
+
+    def launch(exclude=None):
+        nonlocal anim, anim_path, current_proc, last_switch_time, low_fps_since, ran_cool
+        state = thermal.read_state()
+        print(f"[Scheduler] {thermal.describe(state)}")
+        anim = choose_animation(costs, state, exclude)
+        anim_path = os.path.join(ANIMATION_DIR, anim)
+        current_proc = start_animation(anim_path, status, quality_for(state))
+        last_switch_time = time.time()
+        low_fps_since = None
+        ran_cool = state.headroom >= 1.0
 
     while True:
         try:
             now = time.time()
+            daemon = ensure_strip_daemon(daemon)
 
             # OFF HOURS
             if not tree_should_be_on():
                 if current_proc:
+                    record_cost(costs, anim, status, last_switch_time, ran_cool)
                     stop_animation(current_proc)
                     current_proc = None
 
@@ -116,17 +291,24 @@ def main():
             leds_are_off = False
 
             if current_proc is None:
-                anim = random.choice(ANIMATIONS)
-                anim_path = os.path.join(ANIMATION_DIR, anim)
-                current_proc = start_animation(anim_path)
-                last_switch_time = now
+                launch()
 
-            if now - last_switch_time >= ANIMATION_DURATION:
+            ran_cool = ran_cool and thermal.read_state().headroom >= 1.0
+            verdict, low_fps_since = check_health(status, last_switch_time, low_fps_since,
+                                                  costs.fps(anim))
+            if verdict == "stalled":
+                print(f"[Scheduler] {anim} stalled, restarting it")
                 stop_animation(current_proc)
-                anim = random.choice(ANIMATIONS)
-                anim_path = os.path.join(ANIMATION_DIR, anim)
-                current_proc = start_animation(anim_path)
+                current_proc = start_animation(anim_path, status,
+                                               quality_for(thermal.read_state()))
                 last_switch_time = now
+            elif verdict == "slow":
+                print(f"[Scheduler] {anim} FPS collapsed for {LOW_FPS_GRACE}s, switching early")
+
+            if verdict == "slow" or now - last_switch_time >= ANIMATION_DURATION:
+                record_cost(costs, anim, status, last_switch_time, ran_cool)
+                stop_animation(current_proc)
+                launch(exclude=anim if verdict == "slow" else None)
 
             time.sleep(5)
 
@@ -136,4 +318,12 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run tree animations on a daily schedule")
+    parser.add_argument("--profile", type=float, default=None, metavar="SECONDS",
+                        help="sample each animation's first SECONDS with profiler.py")
+    parser.add_argument("--memstats", action="store_true",
+                        help="log each animation's allocations, GC pauses and RSS")
+    args = parser.parse_args()
+    PROFILE_WINDOW = args.profile
+    MEMSTATS = args.memstats
     main()
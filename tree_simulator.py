@@ -0,0 +1,307 @@
+# tree_simulator.py — watch any animation in the browser, no tree required
+#
+# Runs an animation script with a simulated PixelStrip in place of
+# rpi_ws281x.  Every strip.show() publishes the frame; a sender thread
+# per browser tab streams it over a WebSocket as a binary delta (only
+# the pixels that changed since that tab's last frame), and
+# simulator.html draws the LEDs on their 3D coordinates with WebGL.
+#
+# show() never waits on the network: it copies the frame and returns.
+# A slow tab simply skips frames — its next delta is computed against
+# whatever it last received, so no pixel is ever lost.
+#
+# Usage:
+#     python3 tree_simulator.py snake.py -n 50      # then open http://localhost:8765
+#     python3 tree_simulator.py --bench 5000        # 5k-LED streaming benchmark
+#
+# Message format (little-endian):
+#     u8 kind (0 = full frame, 1 = delta), 3 pad bytes, u32 count,
+#     count x u32 LED index, count x 3 bytes R G B
+
+import os
+import sys
+import json
+import time
+import types
+import base64
+import struct
+import hashlib
+import runpy
+import argparse
+import threading
+import socketserver
+import numpy as np
+from helix_geometry import HelixGeometry
+
+BASE_DIR  = os.path.dirname(os.path.abspath(__file__))
+HTML_PATH = os.path.join(BASE_DIR, "simulator.html")
+PORT      = 8765
+
+WS_GUID   = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+KIND_FULL  = 0
+KIND_DELTA = 1
+
+
+def Color(red, green, blue, white=0):
+    """Same packing as rpi_ws281x.Color."""
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+# ----------------------------------------------------
+# Frame hub shared by the strip and the sender threads
+# ----------------------------------------------------
+class FrameHub:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None          # (N, 3) uint8, latest shown frame
+        self.frame_no = 0
+        self.coords = None
+
+    def publish(self, rgb):
+        with self.cond:
+            if self.frame is None or self.frame.shape != rgb.shape:
+                self.frame = rgb.copy()
+            else:
+                self.frame[:] = rgb
+            self.frame_no += 1
+            self.cond.notify_all()
+
+    def wait_frame(self, seen_no, timeout=1.0):
+        """Copy of the newest frame once it is newer than `seen_no`."""
+        with self.cond:
+            if self.frame_no == seen_no:
+                self.cond.wait(timeout)
+            if self.frame_no == seen_no or self.frame is None:
+                return seen_no, None
+            return self.frame_no, self.frame.copy()
+
+
+hub = FrameHub()
+
+
+def encode_frame(kind, idx, rgb):
+    header = struct.pack("<B3xI", kind, len(idx))
+    return header + idx.astype("<u4").tobytes() + rgb.tobytes()
+
+
+# ----------------------------------------------------
+# Minimal HTTP + WebSocket server (stdlib only)
+# ----------------------------------------------------
+def ws_frame(payload):
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x82, n)
+    elif n < 65536:
+        head = struct.pack("!BBH", 0x82, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x82, 127, n)
+    return head + payload
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = self.rfile.readline().decode("latin-1").split()
+        if len(request) < 2:
+            return
+        path = request[1]
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if path == "/ws" and "sec-websocket-key" in headers:
+            self.stream(headers["sec-websocket-key"])
+        elif path == "/coords.json":
+            self.reply("application/json", json.dumps(hub.coords).encode())
+        elif path in ("/", "/index.html"):
+            with open(HTML_PATH, "rb") as f:
+                self.reply("text/html; charset=utf-8", f.read())
+        else:
+            self.wfile.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+
+    def reply(self, content_type, body):
+        self.wfile.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nCache-Control: no-store\r\n\r\n".encode()
+            + body
+        )
+
+    def stream(self, key):
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.wfile.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+
+        seen_no = 0
+        last = None
+        try:
+            while True:
+                seen_no, frame = hub.wait_frame(seen_no)
+                if frame is None:
+                    continue
+                if last is None or last.shape != frame.shape:
+                    idx = np.arange(len(frame))
+                    msg = encode_frame(KIND_FULL, idx, frame)
+                else:
+                    idx = np.flatnonzero((frame != last).any(axis=1))
+                    if len(idx) == 0:
+                        continue
+                    msg = encode_frame(KIND_DELTA, idx, frame[idx])
+                self.wfile.write(ws_frame(msg))
+                last = frame
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+_server = None
+
+def start_server(coords, port=PORT):
+    global _server
+    hub.coords = [list(map(float, p)) for p in coords]
+    if _server is None:
+        _server = Server(("127.0.0.1", port), Handler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        print(f"[Simulator] open http://localhost:{port}")
+
+
+# ----------------------------------------------------
+# Simulated PixelStrip
+# ----------------------------------------------------
+def helix_coords(n):
+    """Ideal helix from compute_coords.py for an arbitrary LED count."""
+    return HelixGeometry(n).positions()
+
+
+class SimulatorStrip:
+    """Drop-in for rpi_ws281x.PixelStrip that streams to the browser."""
+
+    # colors are unpacked the way the tree's GRB() helper packs them
+    ORDER = "grb"
+
+    def __init__(self, num, pin=18, freq_hz=800000, dma=10, invert=False,
+                 brightness=255, channel=0, strip_type=None, gamma=None):
+        self._pixels = np.zeros(num, dtype=np.uint32)
+        self._brightness = brightness
+
+    def begin(self):
+        coords_path = os.path.join(BASE_DIR, "tree_coords.json")
+        with open(coords_path) as f:
+            coords = json.load(f)
+        if len(coords) != len(self._pixels):
+            coords = helix_coords(len(self._pixels))
+        start_server(coords)
+
+    def numPixels(self):
+        return len(self._pixels)
+
+    def setPixelColor(self, n, color):
+        self._pixels[n] = color
+
+    def setPixelColorRGB(self, n, red, green, blue, white=0):
+        self.setPixelColor(n, Color(red, green, blue, white))
+
+    def getPixelColor(self, n):
+        return int(self._pixels[n])
+
+    def write_frame(self, colors):
+        self._pixels[:] = colors
+
+    def setBrightness(self, brightness):
+        self._brightness = brightness
+
+    def getBrightness(self):
+        return self._brightness
+
+    def show(self):
+        p = self._pixels
+        hi, mid, lo = (p >> 16) & 0xFF, (p >> 8) & 0xFF, p & 0xFF
+        if self.ORDER == "grb":
+            rgb = np.stack([mid, hi, lo], axis=1)
+        else:
+            rgb = np.stack([hi, mid, lo], axis=1)
+        if self._brightness != 255:
+            rgb = rgb * (self._brightness + 1) >> 8
+        hub.publish(rgb.astype(np.uint8))
+
+
+# ----------------------------------------------------
+# Runner
+# ----------------------------------------------------
+def run_script(script, script_args):
+    fake = types.ModuleType("rpi_ws281x")
+    fake.PixelStrip = SimulatorStrip
+    fake.Adafruit_NeoPixel = SimulatorStrip
+    fake.Color = Color
+    sys.modules["rpi_ws281x"] = fake
+
+    script = os.path.abspath(script)
+    os.chdir(os.path.dirname(script))
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script] + script_args
+    runpy.run_path(script, run_name="__main__")
+
+
+def bench(n, seconds=10.0, fps=60):
+    """Drive a moving pattern on n LEDs at `fps` and report show() cost."""
+    strip = SimulatorStrip(n)
+    strip.begin()
+    coords = helix_coords(n)
+    theta = np.arctan2(coords[:, 1], coords[:, 0])
+    z = coords[:, 2] / coords[:, 2].max()
+
+    period = 1.0 / fps
+    show_times = []
+    t0 = time.perf_counter()
+    next_frame = t0
+    frame = 0
+    while time.perf_counter() - t0 < seconds:
+        t = frame * period
+        v = ((np.sin(theta * 3 + z * 40 - t * 6) + 1) * 127).astype(np.uint32)
+        strip._pixels[:] = (v << 16) | (v << 8) | (255 - v)
+
+        s = time.perf_counter()
+        strip.show()
+        show_times.append(time.perf_counter() - s)
+
+        frame += 1
+        next_frame += period
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+    show_ms = np.array(show_times) * 1000
+    print(f"[Simulator] {n} LEDs, {frame / seconds:.1f} FPS rendered, "
+          f"show() mean {show_ms.mean():.3f} ms, max {show_ms.max():.3f} ms, "
+          f"frames published {hub.frame_no}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser simulator for tree animations")
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="stream a synthetic 60 FPS pattern on N LEDs instead of a script")
+    parser.add_argument("--seconds", type=float, default=10.0, help="benchmark length")
+    parser.add_argument("--order", choices=("grb", "rgb"), default="grb",
+                        help="how packed colors map to R/G/B (grb matches the GRB() helper)")
+    parser.add_argument("script", nargs="?", help="animation script to run")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    SimulatorStrip.ORDER = args.order
+    if args.bench:
+        bench(args.bench, args.seconds)
+    elif args.script:
+        run_script(args.script, args.script_args)
+    else:
+        parser.error("give an animation script or --bench N")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 # wind_swirl.py – fast spiral, all white, blinking brightness
+import fast_start
+fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
 import time
-import json
-import os
 import math
 import signal
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from rpi_ws281x import Color
+from led_output import DoubleBufferedStrip, FrameWriter
+import geometry_cache
+from procedural import WindSwirl
+from kernel_pool import KernelPool
+from audio_input import AudioInput, open_source
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
 
 running = True
 strip = None
@@ -20,22 +30,10 @@ def handle_exit(signum, frame):
 # -----------------------------
 # Load coordinates
 # -----------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(BASE_DIR, "tree_coords.json")) as f:
-    coords = json.load(f)
+coords = geometry_cache.coords()
 
 LED_COUNT = len(coords)
 
-# Precompute angle + Z
-thetas = []
-zs = []
-for x, y, z in coords:
-    thetas.append(math.atan2(y, x))
-    zs.append(z)
-
-z_min, z_max = min(zs), max(zs)
-height = z_max - z_min
-
 
 # -----------------------------
 # LED Strip
@@ -47,6 +45,12 @@ LED_BRIGHTNESS = 255
 LED_INVERT = False
 LED_CHANNEL = 0
 
+# Audio input ('alsa', 'alsa:<device>' or a .wav path); None = timed blink
+AUDIO_SOURCE = None
+FRAME_DELAY  = 0.015
+
+LOD_LEVEL = 0    # >0 on very large trees: evaluate per LED cluster (lod.py)
+
 
 # -----------------------------
 # Main animation
@@ -57,11 +61,13 @@ def main():
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
 
-    strip = PixelStrip(
+    strip = fast_start.strip(
         LED_COUNT, LED_PIN, LED_FREQ_HZ,
         LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
     )
-    strip.begin()
+
+    # compute the next frame while the output thread pushes this one
+    strip = DoubleBufferedStrip(strip)
 
     # Animation parameters
     t = 0.0
@@ -69,37 +75,47 @@ def main():
     swirl_strength = 11.0         # tighter wind spiral
     blink_speed = 0.10            # pulsing brightness
 
+    effect = WindSwirl(spiral_speed=spiral_speed, swirl_strength=swirl_strength,
+                       blink_speed=blink_speed, lod=LOD_LEVEL)
+    writer = FrameWriter(strip)    # whole frame per call, no per-pixel calls
+    pool = KernelPool()            # TREE_THREADS>1 splits big trees across cores
+    frame = np.empty(LED_COUNT, dtype=np.uint32)
+
+    # with audio the blink follows the music's loudness instead
+    audio = None
+    if AUDIO_SOURCE:
+        audio = AudioInput(open_source(AUDIO_SOURCE)).start()
+
     try:
         while running:
             t += 0.05
 
             # blinking factor: 0 → 1 → 0 smoothly
-            blink = (math.sin(t * blink_speed * 2 * math.pi) + 1) / 2
-
-            for i in range(LED_COUNT):
-                theta = thetas[i]
-                z_norm = (zs[i] - z_min) / height
-
-                # fast, clean spiral motion
-                phase = theta * swirl_strength + z_norm * 8 - t * spiral_speed * 50
-
-                swirl_intensity = (math.sin(phase) + 1) / 2
-
-                # combine spiral + blinking
-                brightness = swirl_intensity * blink
-                brightness = max(0.0, min(1.0, brightness))
-
-                val = int(brightness * 255)
-                strip.setPixelColor(i, GRB(val, val, val))  # pure white
-
-            strip.show()
-            time.sleep(0.015)
+            if audio:
+                features = audio.features    # one snapshot per frame
+                blink = features.level
+            else:
+                blink = (math.sin(t * blink_speed * 2 * math.pi) + 1) / 2
+
+            # fast, clean spiral motion times blinking, pure white
+            writer.write(effect.render_packed(t, frame, pool, blink=[blink]))
+
+            if audio:
+                audio.show(strip, features)    # latency timed once the frame is on the wire
+            else:
+                strip.show()
+            heartbeat.frame()
+            time.sleep(FRAME_DELAY)
 
     finally:
+        if audio:
+            audio.stop()
+
         # turn off LEDs on exit
         for i in range(LED_COUNT):
             strip.setPixelColor(i, GRB(0, 0, 0))
         strip.show()
+        strip.close()
 
 
 if __name__ == "__main__":
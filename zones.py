@@ -0,0 +1,243 @@
+# zones.py — several effects at once, one per region of the tree
+#
+# A zone is a selector over tree_coords.json plus an effect.  Each zone
+# keeps the index array of its LEDs (computed once).  Its effect is built
+# on those LEDs only and returns colors for just them.  This process owns
+# the strip and merges every zone's colors into one frame per show().
+#
+# Zones are claimed in LAYOUT order: an LED already taken by an earlier
+# zone is dropped from later ones.  So every LED is computed at most once,
+# and a multi-zone show costs no more than one full-tree effect.  LEDs in
+# no zone stay dark.
+#
+# Each zone may declare its own update rate (LAYOUT's third field, in
+# FPS; None = every output frame).  A zone that is not due keeps its last
+# output in the merged frame, so it costs nothing that frame.  Snowfall
+# steps at snowfall.py's own 55 ms while the candy cane keeps the full
+# output rate.  Per-zone renders, compute time and the time saved by
+# skipped frames are printed on exit and by --bench.
+#
+# Selectors:
+#     height_band(lo, hi)        normalized height, 0 = bottom, 1 = top
+#     sector(start_deg, end_deg) polar angle around the trunk, wraps at 360
+#     mask(indices)              any explicit LED list
+#     everything()
+#
+# Run this file for the show, or compare its compute time against its
+# effects run on the whole tree:
+#     python3 tree_simulator.py zones.py --bench
+
+import sys
+import fast_start
+if "--bench" not in sys.argv:
+    fast_start.show_first_frame(__file__)    # light the tree before the heavy imports below
+
+import time
+import signal
+import numpy as np
+import geometry_cache
+from procedural import CandyCane, pack_grb
+from led_output import FrameWriter
+import snowfall
+from telemetry import Heartbeat
+
+heartbeat = Heartbeat()    # shared-memory status read by tree_scheduler.py
+
+running = True
+strip = None
+
+def handle_exit(signum, frame):
+    global running
+    running = False
+
+
+# ----------------------------------------------------
+# Selectors: f(coords, polar) -> (N,) bool
+# ----------------------------------------------------
+def height_band(lo, hi):
+    return lambda c, polar: (polar[1] >= lo) & (polar[1] <= hi)
+
+def sector(start_deg, end_deg):
+    def select(c, polar):
+        deg = np.degrees(polar[0]) % 360
+        start, end = start_deg % 360, end_deg % 360
+        if start <= end:
+            return (deg >= start) & (deg < end)
+        return (deg >= start) | (deg < end)
+    return select
+
+def mask(indices):
+    def select(c, polar):
+        m = np.zeros(len(c), dtype=bool)
+        m[np.asarray(indices, dtype=np.intp)] = True
+        return m
+    return select
+
+def everything():
+    return lambda c, polar: np.ones(len(c), dtype=bool)
+
+
+# ----------------------------------------------------
+# Zone effects: built on a zone's LEDs, render(t) -> (len(leds), 3) uint8
+# ----------------------------------------------------
+def procedural(cls, **params):
+    return lambda leds: cls(leds=leds, **params)
+
+
+class SnowfallZone:
+    """snowfall.py's flakes, falling through one zone's LEDs."""
+
+    def __init__(self, leds, flakes_per_led=snowfall.FLAKE_COUNT / snowfall.LED_COUNT):
+        self.leds = leds
+        z = geometry_cache.coords()[leds, 2]
+        order = np.argsort(-z, kind="stable")    # positions in `leds`, top to bottom
+        self.flakes = [snowfall.Flake(order.tolist())
+                       for _ in range(max(1, round(flakes_per_led * len(leds))))]
+        self.frame = np.zeros((len(leds), 3), dtype=np.uint8)
+
+    def render(self, t):
+        self.frame.fill(0)
+        for fl in self.flakes:
+            fl.update()
+            self.frame[fl.led] = fl.brightness
+        return self.frame
+
+
+# ----------------------------------------------------
+# Layout: (selector, effect factory, FPS or None), claimed in order
+# ----------------------------------------------------
+LAYOUT = [
+    (height_band(0.65, 1.0), SnowfallZone,          1 / snowfall.FRAME_DELAY),
+    (everything(),           procedural(CandyCane), None),
+]
+
+FRAME_DELAY = 0.02
+TIME_STEP   = 0.02      # effect time advanced per frame (candy_cane.py's step)
+
+# LED strip config
+LED_PIN        = 18
+LED_FREQ_HZ    = 800000
+LED_DMA        = 10
+LED_BRIGHTNESS = 255
+LED_INVERT     = False
+LED_CHANNEL    = 0
+
+
+class Zone:
+    """One claimed region: its LEDs, its effect and its update schedule."""
+
+    def __init__(self, leds, effect, fps=None):
+        self.leds = leds
+        self.effect = effect
+        self.period = 1.0 / fps if fps else 0.0
+        self.due = None        # clock time of the next update
+        self.renders = 0
+        self.skipped = 0
+        self.compute = 0.0     # seconds spent in effect.render()
+
+    def tick(self, now):
+        """True if the zone should recompute at clock time `now`."""
+        if self.due is not None and now < self.due:
+            self.skipped += 1
+            return False
+        # stay on the zone's own grid; after a stall, restart from now
+        self.due = now + self.period if self.due is None or now - self.due > self.period \
+            else self.due + self.period
+        return True
+
+    def stats(self):
+        name = type(self.effect).__name__
+        rate = "every frame" if not self.period else f"{1 / self.period:5.1f} fps"
+        per = self.compute / max(1, self.renders)
+        return (f"  {name:14s} {len(self.leds):5d} LEDs  {rate:>11s}  "
+                f"{self.renders:6d} renders  {self.skipped:6d} reused  "
+                f"{per * 1000:6.3f} ms each  saved {self.skipped * per:6.2f} s")
+
+
+class ZoneShow:
+    def __init__(self, layout=LAYOUT, coords=None):
+        c = np.asarray(geometry_cache.coords() if coords is None else coords)
+        polar = geometry_cache.polar_height(c)
+        self.led_count = len(c)
+
+        free = np.ones(len(c), dtype=bool)
+        self.zones = []
+        for select, factory, *fps in layout:
+            leds = np.flatnonzero(select(c, polar) & free)
+            if len(leds):
+                free[leds] = False
+                self.zones.append(Zone(leds, factory(leds), *fps))
+
+        self.frame = np.zeros((len(c), 3), dtype=np.uint8)
+
+    def render(self, t, now=None):
+        """(N, 3) uint8: due zones recomputed, the rest reused, merged into one frame."""
+        now = time.perf_counter() if now is None else now
+        for zone in self.zones:
+            if zone.tick(now):
+                t0 = time.perf_counter()
+                self.frame[zone.leds] = zone.effect.render(t)
+                zone.compute += time.perf_counter() - t0
+                zone.renders += 1
+        return self.frame
+
+    def report(self):
+        for zone in self.zones:
+            print(zone.stats())
+
+
+# ----------------------------------------------------
+# Benchmark: zoned show vs its effects on the whole tree
+# ----------------------------------------------------
+def bench(frames=300):
+    everywhere = everything()
+    candidates = [("zones", ZoneShow()),
+                  ("zones, every zone every frame", ZoneShow([z[:2] for z in LAYOUT]))]
+    for select, factory, *_ in LAYOUT:
+        whole = ZoneShow([(everywhere, factory)])
+        candidates.append((type(whole.zones[0].effect).__name__ + " (whole tree)", whole))
+
+    for label, show in candidates:
+        t0 = time.perf_counter()
+        for k in range(frames):
+            show.render(k * TIME_STEP, now=k * FRAME_DELAY)    # clock as if shown live
+        ms = (time.perf_counter() - t0) / frames * 1000
+        print(f"  {label:30s} {ms:6.3f} ms/frame  "
+              f"({' + '.join(str(len(zone.leds)) for zone in show.zones)} LEDs)")
+    print("per zone, layout rates:")
+    candidates[0][1].report()
+
+
+# ----------------------------------------------------
+# Main
+# ----------------------------------------------------
+def main():
+    global strip, running
+
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.signal(signal.SIGINT, handle_exit)
+
+    show = ZoneShow()
+    strip = fast_start.strip(show.led_count, LED_PIN, LED_FREQ_HZ, LED_DMA,
+                             LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
+    writer = FrameWriter(strip)
+
+    t = 0.0
+    while running:
+        t += TIME_STEP
+        writer.write(pack_grb(show.render(t), writer.buffer()))
+        strip.show()
+        heartbeat.frame()
+        time.sleep(FRAME_DELAY)
+
+    for i in range(show.led_count):
+        strip.setPixelColor(i, 0)
+    strip.show()
+    show.report()
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+    else:
+        main()